@@ -0,0 +1,245 @@
+"""
+Batch Analysis Module
+Path resolution, cross-document micro-batching and summaries for /analyze/batch
+"""
+
+import os
+import time
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+
+def _env_number(name: str, default: float) -> float:
+    """Read a positive number from the environment."""
+    try:
+        value = float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+# Directory that batch requests may reference files under (unset = paths disabled)
+BATCH_UPLOAD_ROOT = os.getenv("BATCH_UPLOAD_ROOT")
+
+# Most documents accepted in one batch
+BATCH_MAX_DOCUMENTS = int(_env_number("BATCH_MAX_DOCUMENTS", 500))
+
+# Documents of one batch analyzed at the same time
+BATCH_CONCURRENCY = int(_env_number("BATCH_CONCURRENCY", 8))
+
+# ML predictions are grouped into batches of up to this many documents,
+# waiting at most BATCH_ML_WAIT_SECONDS for a batch to fill
+BATCH_ML_SIZE = int(_env_number("BATCH_ML_SIZE", 32))
+BATCH_ML_WAIT_SECONDS = _env_number("BATCH_ML_WAIT_SECONDS", 0.1)
+
+# Files picked up when a batch path names a directory
+BATCH_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg", ".tif", ".tiff", ".bmp", ".webp")
+
+
+class BatchPathError(ValueError):
+    """Raised when a batch path is missing, unsupported or outside the upload root."""
+
+
+def _inside(root: str, path: str) -> bool:
+    return os.path.commonpath([root, path]) == root
+
+
+def resolve_batch_paths(paths: List[str], root: Optional[str] = BATCH_UPLOAD_ROOT) -> List[Tuple[str, str]]:
+    """
+    Resolve request paths to (absolute path, path relative to root) of files under the upload root.
+
+    Paths are relative to root. Symlinks are resolved before the
+    containment check, so neither '..' nor a link can escape the root.
+    A directory expands to the supported files below it, in sorted order.
+
+    Raises:
+        BatchPathError: if paths are disabled or any path is invalid
+    """
+    if not root:
+        raise BatchPathError("Batch paths are disabled (BATCH_UPLOAD_ROOT is not set)")
+    root = os.path.realpath(root)
+
+    files: List[str] = []
+    for requested in paths:
+        if not requested or "\x00" in requested:
+            raise BatchPathError(f"Invalid path: {requested!r}")
+        path = os.path.realpath(os.path.join(root, requested.lstrip("/\\")))
+        if not _inside(root, path):
+            raise BatchPathError(f"Path is outside the upload root: {requested}")
+
+        if os.path.isdir(path):
+            for directory, subdirectories, names in os.walk(path):
+                subdirectories.sort()
+                for name in sorted(names):
+                    candidate = os.path.realpath(os.path.join(directory, name))
+                    if (name.lower().endswith(BATCH_EXTENSIONS) and os.path.isfile(candidate)
+                            and _inside(root, candidate)):
+                        files.append(candidate)
+        elif os.path.isfile(path):
+            files.append(path)
+        else:
+            raise BatchPathError(f"No such file: {requested}")
+
+    # A file named twice (directly and through its directory) is analyzed once
+    return [(path, os.path.relpath(path, root)) for path in dict.fromkeys(files)]
+
+
+class MicroBatcher:
+    """
+    Groups items submitted concurrently into batches for one call.
+
+    submit() waits until its item has been processed. A batch is run when
+    max_size items are pending or max_wait seconds after the first one
+    arrived, whichever comes first. run_batch receives the items and must
+    return one result per item, in order; if it raises, every caller in
+    that batch gets the exception.
+    """
+
+    def __init__(self, run_batch: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_size: int = BATCH_ML_SIZE, max_wait: float = BATCH_ML_WAIT_SECONDS):
+        self.run_batch = run_batch
+        self.max_size = max(max_size, 1)
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        """Start a batch with everything pending."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if pending:
+            task = asyncio.create_task(self._run(pending))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, pending: List[Tuple[Any, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(pending)
+        try:
+            results = await self.run_batch([item for item, _ in pending])
+        except Exception as e:
+            for _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(pending, results):
+            if not future.done():
+                future.set_result(result)
+
+    def close(self):
+        """Cancel the pending timer and any running batches."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for task in list(self._tasks):
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "documents": self.items,
+            "meanBatchSize": round(self.items / self.batches, 2) if self.batches else 0.0
+        }
+
+
+def analyze_ml_batch_in_worker(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Run MLLegalAnalyzer over a batch of texts inside a pool worker.
+
+    ml_analyzer (scikit-learn, pandas) is imported on first use rather than
+    at service startup.
+    """
+    from ml_analyzer import analyze_documents_in_worker
+    return analyze_documents_in_worker(texts)
+
+
+def ml_overview(analysis: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of an MLLegalAnalyzer result reported next to a batch document's analysis."""
+    return {
+        "documentType": analysis.get("documentType"),
+        "documentTypeConfidence": analysis.get("documentTypeConfidence"),
+        "mlPowered": analysis.get("mlPowered", False),
+        "overallRiskScore": analysis.get("overallRiskScore"),
+        "clauses": analysis.get("clauses", [])
+    }
+
+
+def risk_band(score: Any) -> str:
+    """Bucket a 0-100 risk score the way recommendations do (>70 high, >50 medium)."""
+    if not isinstance(score, (int, float)):
+        return "unknown"
+    if score > 70:
+        return "high"
+    if score > 50:
+        return "medium"
+    return "low"
+
+
+class BatchSummary:
+    """Aggregates per-document outcomes into the closing line of a batch stream."""
+
+    # Riskiest documents listed in the summary
+    TOP_RISKS = 10
+
+    def __init__(self, total: int):
+        self.total = total
+        self.started = time.monotonic()
+        self.succeeded = 0
+        self.failed = 0
+        self.risk_bands: Counter = Counter()
+        self.document_types: Counter = Counter()
+        self.errors: Counter = Counter()
+        self.ml_errors: Counter = Counter()
+        self._risks: List[Dict[str, Any]] = []
+        self._risk_total = 0
+
+    def add_result(self, index: int, file_name: str, analysis: Dict[str, Any]):
+        self.succeeded += 1
+        score = analysis.get("overallRiskScore")
+        self.risk_bands[risk_band(score)] += 1
+        self.document_types[analysis.get("documentType") or "Unknown"] += 1
+        if isinstance(score, (int, float)):
+            self._risk_total += score
+            self._risks.append({"index": index, "fileName": file_name, "overallRiskScore": score})
+
+    def add_error(self, kind: str):
+        self.failed += 1
+        self.errors[kind] += 1
+
+    def add_ml_error(self, kind: str):
+        # The document still counts as succeeded; only its ML findings are missing
+        self.ml_errors[kind] += 1
+
+    def as_dict(self, ml_stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started
+        highest = sorted(self._risks, key=lambda item: item["overallRiskScore"], reverse=True)
+        return {
+            "type": "summary",
+            "documents": self.total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsedSeconds": round(elapsed, 3),
+            "documentsPerMinute": round(self.succeeded * 60 / elapsed, 2) if elapsed > 0 else 0.0,
+            "averageRiskScore": round(self._risk_total / len(self._risks), 1) if self._risks else None,
+            "riskDistribution": dict(self.risk_bands),
+            "documentTypes": dict(self.document_types),
+            "highestRisk": highest[:self.TOP_RISKS],
+            "errors": dict(self.errors),
+            "mlErrors": dict(self.ml_errors),
+            "mlBatching": ml_stats or {}
+        }
@@ -0,0 +1,4 @@
+"""
+Benchmarks Package
+Reproducible timings for the ai-service pipeline (see benchmarks.run)
+"""
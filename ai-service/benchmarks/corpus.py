@@ -0,0 +1,234 @@
+"""
+Benchmark Corpus Module
+Deterministic synthetic contracts rendered as text, text-layer PDFs and scanned PDFs
+"""
+
+import io
+import random
+import textwrap
+from typing import Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Named sizes in characters of contract text
+SIZES = {
+    "small": 6_000,
+    "medium": 30_000,
+    "large": 120_000,
+}
+
+# Text PDF layout: US Letter, 11pt Helvetica
+_PAGE_WIDTH = 612
+_PAGE_HEIGHT = 792
+_MARGIN = 72
+_FONT_SIZE = 11
+_LEADING = 14
+_LINE_CHARS = 90
+
+# Scanned pages are rendered at this resolution
+SCAN_DPI = 150
+
+_SECTION_TITLES = [
+    "DEFINITIONS", "SERVICES", "TERM", "COMPENSATION", "PAYMENT TERMS", "CONFIDENTIALITY",
+    "INTELLECTUAL PROPERTY", "LIABILITY LIMITATION", "INDEMNIFICATION", "NON-COMPETE",
+    "TERMINATION", "PENALTIES", "DISPUTE RESOLUTION", "GOVERNING LAW", "FORCE MAJEURE",
+    "NOTICES", "ASSIGNMENT", "WARRANTIES", "DATA PROTECTION", "MISCELLANEOUS"
+]
+
+
+def source_paragraphs(trainer) -> List[str]:
+    """
+    Paragraphs the synthetic contracts are assembled from.
+
+    Uses the service's sample contract and the synthetic training texts of
+    LegalMLTrainer, so benchmarks exercise the same vocabulary the
+    extractors and models were built for. trainer is a LegalMLTrainer.
+    """
+    from main import get_sample_legal_text
+
+    paragraphs = []
+    block: List[str] = []
+    for line in get_sample_legal_text().splitlines():
+        line = line.strip()
+        if line:
+            block.append(line)
+        elif block:
+            paragraphs.append(" ".join(block))
+            block = []
+    if block:
+        paragraphs.append(" ".join(block))
+
+    # Drop the section headings of the sample; sections are renumbered below
+    paragraphs = [p for p in paragraphs if len(p) > 60]
+
+    training = trainer.create_synthetic_training_data()
+    for frame, column in (("document_types", "text"), ("clause_risks", "clause_text"),
+                          ("clause_types", "clause_text")):
+        paragraphs.extend(training[frame][column].tolist())
+
+    # Keep the order stable across runs
+    return list(dict.fromkeys(paragraphs))
+
+
+def synthetic_contract(target_chars: int, paragraphs: List[str], seed: int = 0) -> str:
+    """Assemble a numbered contract of about target_chars characters."""
+    rng = random.Random(seed)
+    parts = [
+        "MASTER SERVICES AGREEMENT",
+        f"This Master Services Agreement is entered into as of January {rng.randint(1, 28)}, 2026, "
+        "by and between ABC Legal Services Pvt. Ltd. (\"Service Provider\") and XYZ Corporation (\"Client\")."
+    ]
+    length = sum(len(part) + 2 for part in parts)
+    section = 0
+    while length < target_chars:
+        section += 1
+        title = _SECTION_TITLES[(section - 1) % len(_SECTION_TITLES)]
+        body = " ".join(rng.sample(paragraphs, k=min(rng.randint(2, 4), len(paragraphs))))
+        heading = f"{section}. {title}"
+        parts.extend([heading, body])
+        length += len(heading) + len(body) + 4
+    return "\n\n".join(parts)
+
+
+def unique_variant(text: str, index: int) -> str:
+    """Append a reference line so repeated runs are not served from the result cache."""
+    return f"{text}\n\nReference: BENCH-{index:06d}"
+
+
+def _wrap(text: str, width: int) -> List[str]:
+    """Wrap paragraphs into lines, keeping blank lines between paragraphs."""
+    lines: List[str] = []
+    for paragraph in text.split("\n"):
+        lines.extend(textwrap.wrap(paragraph, width) or [""])
+    return lines
+
+
+def _paginate(lines: List[str], per_page: int) -> List[List[str]]:
+    return [lines[i:i + per_page] for i in range(0, len(lines), per_page)] or [[]]
+
+
+def _pdf_string(line: str) -> bytes:
+    """Encode a line as a PDF literal string (Latin-1, escaped)."""
+    escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return b"(" + escaped.encode("latin-1", "replace") + b")"
+
+
+def _write_pdf(objects: List[bytes]) -> bytes:
+    """Serialize numbered objects (1-based, catalog first) with an xref table."""
+    out = io.BytesIO()
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(out.tell())
+        out.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = out.tell()
+    out.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        out.write(b"%010d 00000 n \n" % offset)
+    out.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return out.getvalue()
+
+
+def text_pdf(text: str) -> Tuple[bytes, int]:
+    """
+    Render text as a PDF with a real text layer; returns (pdf, pages).
+
+    A minimal hand-written PDF (Helvetica, one content stream per page) so
+    no PDF library is needed to build the corpus.
+    """
+    per_page = (_PAGE_HEIGHT - 2 * _MARGIN) // _LEADING
+    pages = _paginate(_wrap(text, _LINE_CHARS), per_page)
+
+    # 1: catalog, 2: page tree, 3: font, then a page and a content stream per page
+    kids = b" ".join(b"%d 0 R" % (4 + 2 * i) for i in range(len(pages)))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(pages),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+    ]
+    for index, lines in enumerate(pages):
+        content = [b"BT /F1 %d Tf %d TL %d %d Td" % (_FONT_SIZE, _LEADING, _MARGIN, _PAGE_HEIGHT - _MARGIN)]
+        content.extend(_pdf_string(line) + b" '" for line in lines)
+        content.append(b"ET")
+        stream = b"\n".join(content)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] /Contents %d 0 R "
+            b"/Resources << /Font << /F1 3 0 R >> >> >>" % (_PAGE_WIDTH, _PAGE_HEIGHT, 5 + 2 * index)
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    return _write_pdf(objects), len(pages)
+
+
+def _scan_font(size: int):
+    """A TrueType font if one is available, else Pillow's built-in font."""
+    for name in ("DejaVuSans.ttf", "Arial.ttf", "LiberationSans-Regular.ttf"):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    try:
+        return ImageFont.load_default(size=size)
+    except TypeError:
+        # Pillow < 10.1 has a single fixed-size bitmap font
+        return ImageFont.load_default()
+
+
+def scanned_pages(text: str, dpi: int = SCAN_DPI, seed: int = 0,
+                  max_pages: Optional[int] = None) -> List[Image.Image]:
+    """
+    Render text onto grayscale page images that look like a scan.
+
+    Pages get a slight tilt and speckle noise so OCR preprocessing has
+    real work to do.
+    """
+    rng = random.Random(seed)
+    scale = dpi / 72
+    width, height = int(_PAGE_WIDTH * scale), int(_PAGE_HEIGHT * scale)
+    margin, leading = int(_MARGIN * scale), int(_LEADING * scale)
+    font = _scan_font(int(_FONT_SIZE * scale))
+
+    per_page = (height - 2 * margin) // leading
+    pages = _paginate(_wrap(text, _LINE_CHARS), per_page)
+    if max_pages:
+        pages = pages[:max_pages]
+
+    images = []
+    for lines in pages:
+        page = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(page)
+        for number, line in enumerate(lines):
+            draw.text((margin, margin + number * leading), line, fill=20, font=font)
+        for _ in range(width * height // 2000):
+            draw.point((rng.randrange(width), rng.randrange(height)), fill=rng.randint(0, 160))
+        images.append(page.rotate(rng.uniform(-0.8, 0.8), fillcolor=255, resample=Image.BICUBIC))
+    return images
+
+
+def scanned_pdf(text: str, dpi: int = SCAN_DPI, seed: int = 0,
+                max_pages: Optional[int] = None) -> Tuple[bytes, int]:
+    """Render text as an image-only PDF (no text layer); returns (pdf, pages)."""
+    images = scanned_pages(text, dpi, seed, max_pages)
+    out = io.BytesIO()
+    images[0].save(out, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    return out.getvalue(), len(images)
+
+
+def scanned_png(text: str, dpi: int = SCAN_DPI, seed: int = 0) -> bytes:
+    """Render the first page of text as a scanned PNG image."""
+    out = io.BytesIO()
+    scanned_pages(text, dpi, seed, max_pages=1)[0].save(out, "PNG")
+    return out.getvalue()
+
+
+def iter_sizes(names: Iterable[str]) -> List[Tuple[str, int]]:
+    """Resolve size names (or raw character counts) to (name, chars)."""
+    resolved = []
+    for name in names:
+        name = name.strip()
+        if name in SIZES:
+            resolved.append((name, SIZES[name]))
+        elif name.isdigit():
+            resolved.append((f"{name}chars", int(name)))
+        else:
+            raise ValueError(f"Unknown size '{name}' (use {', '.join(SIZES)} or a character count)")
+    return resolved
@@ -0,0 +1,311 @@
+"""
+Load Test
+Drives /analyze at fixed concurrency against a local mock LLM provider
+
+Run from ai-service/:
+    python -m benchmarks.load_test --concurrency 1,4,16 --duration 30 --llm-latency 2.0
+
+By default this starts benchmarks.mock_llm and the service itself (uvicorn,
+once per --server-workers value) on free local ports, with the OpenAI and
+Gemini base URLs pointed at the mock. Use --target to load an already
+running service instead (it must be configured for the mock, or you pay
+for real calls).
+
+Each level is a closed loop: `concurrency` clients send requests back to
+back for --duration seconds after --warmup seconds. Every request uploads
+a distinct copy of the document, so the result cache never answers. The
+report gives sustained req/s, latency, queueing delay (client latency
+minus the service's own processingTime, i.e. time spent waiting for
+admission, workers and the event loop) and error rate per level; demo
+fallback answers count as errors.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import socket
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+import httpx
+
+from benchmarks.corpus import iter_sizes, scanned_pdf, source_paragraphs, synthetic_contract, text_pdf
+from benchmarks.mock_llm import DISTRIBUTIONS
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of sorted values (0.0 if empty)."""
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "mean": round(sum(ordered) / len(ordered), 4) if ordered else 0.0,
+        "p50": round(_percentile(ordered, 0.50), 4),
+        "p95": round(_percentile(ordered, 0.95), 4),
+        "p99": round(_percentile(ordered, 0.99), 4),
+        "max": round(ordered[-1], 4) if ordered else 0.0
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_ready(url: str, timeout: float, process: Optional[subprocess.Popen] = None):
+    """Poll url until it answers 200."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} before becoming ready")
+        try:
+            if httpx.get(url, timeout=2.0).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout:.0f}s")
+
+
+@contextmanager
+def _process(command: List[str], env: Dict[str, str], ready_url: str,
+             timeout: float = 180.0) -> Iterator[subprocess.Popen]:
+    """Run a server process until the with-block exits."""
+    process = subprocess.Popen(command, cwd=SERVICE_DIR, env=env)
+    try:
+        _wait_until_ready(ready_url, timeout, process)
+        yield process
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def _document(kind: str, size: str, workdir: str) -> bytes:
+    """Build the uploaded document from the benchmark corpus."""
+    from ml_trainer import LegalMLTrainer
+
+    (_, chars), = iter_sizes([size])
+    trainer = LegalMLTrainer(models_dir=os.path.join(workdir, "models"))
+    text = synthetic_contract(chars, source_paragraphs(trainer))
+    if kind == "scanned-pdf":
+        return scanned_pdf(text, max_pages=5)[0]
+    return text_pdf(text)[0]
+
+
+async def run_level(target: str, document: bytes, concurrency: int,
+                    duration: float, warmup: float) -> Dict[str, Any]:
+    """Closed-loop load at one concurrency level."""
+    counter = iter(range(10 ** 9))
+    records: List[Dict[str, Any]] = []
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+
+    async def client_loop(client: httpx.AsyncClient):
+        while time.monotonic() < stop_at:
+            # A trailing PDF comment gives every request its own digest
+            body = document + b"%%LOAD-%09d\n" % next(counter)
+            payload = {
+                "file": base64.b64encode(body).decode("ascii"),
+                "fileName": "contract.pdf",
+                "fileType": "pdf"
+            }
+            sent = time.monotonic()
+            record: Dict[str, Any] = {"sent": sent}
+            try:
+                response = await client.post(f"{target}/analyze", json=payload)
+                record["status"] = response.status_code
+                if response.status_code == 200:
+                    result = response.json()
+                    record["processingTime"] = result.get("processingTime")
+                    if str(result.get("ocrText", "")).startswith("[Demo Mode]"):
+                        # /analyze hides pipeline failures behind a demo analysis
+                        record["status"] = "demo_fallback"
+            except httpx.HTTPError as e:
+                record["status"] = type(e).__name__
+            record["done"] = time.monotonic()
+            records.append(record)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=httpx.Timeout(600.0), limits=limits) as client:
+        await asyncio.gather(*(client_loop(client) for _ in range(concurrency)))
+
+    # Only requests sent inside the measurement window count
+    measured = [r for r in records if measure_from <= r["sent"] < stop_at]
+    window_end = max([stop_at] + [r["done"] for r in measured])
+    window = max(window_end - measure_from, 1e-9)
+    succeeded = [r for r in measured if r["status"] == 200]
+    statuses = Counter(str(r["status"]) for r in measured)
+
+    latencies = [r["done"] - r["sent"] for r in succeeded]
+    queue_delays = [
+        max(r["done"] - r["sent"] - r["processingTime"], 0.0)
+        for r in succeeded if isinstance(r.get("processingTime"), (int, float))
+    ]
+    return {
+        "concurrency": concurrency,
+        "requests": len(measured),
+        "succeeded": len(succeeded),
+        "requestsPerSecond": round(len(succeeded) / window, 3),
+        "errorRate": round(1 - len(succeeded) / len(measured), 4) if measured else 0.0,
+        "statusCounts": dict(statuses),
+        "latencySeconds": _summary(latencies),
+        "queueDelaySeconds": _summary(queue_delays),
+        "serviceTimeSeconds": _summary([r["processingTime"] for r in succeeded
+                                        if isinstance(r.get("processingTime"), (int, float))])
+    }
+
+
+def _mock_stats(mock_url: str) -> Optional[Dict[str, Any]]:
+    try:
+        return httpx.get(f"{mock_url}/stats", timeout=5.0).json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+def _print_level(server_workers: Any, level: Dict[str, Any]):
+    print(
+        f"   workers={server_workers} concurrency={level['concurrency']:>3}  "
+        f"{level['requestsPerSecond']:>7.2f} req/s  "
+        f"p50 {level['latencySeconds']['p50']:.3f}s  p95 {level['latencySeconds']['p95']:.3f}s  "
+        f"queue p95 {level['queueDelaySeconds']['p95']:.3f}s  errors {level['errorRate'] * 100:.1f}%"
+    )
+
+
+@contextmanager
+def _mock_server(args) -> Iterator[Optional[str]]:
+    """Start the mock provider unless one was given (or the target is external)."""
+    if args.mock_url or args.target:
+        yield args.mock_url
+        return
+
+    port = _free_port()
+    command = [
+        sys.executable, "-m", "benchmarks.mock_llm", "--port", str(port),
+        "--distribution", args.llm_distribution, "--latency", str(args.llm_latency),
+        "--spread", str(args.llm_spread), "--error-rate", str(args.llm_error_rate)
+    ]
+    url = f"http://127.0.0.1:{port}"
+    with _process(command, dict(os.environ), f"{url}/stats"):
+        yield url
+
+
+@contextmanager
+def _service(args, mock_url: str, workers: int, workdir: str) -> Iterator[str]:
+    """Start the service with its providers pointed at the mock."""
+    port = _free_port()
+    env = dict(os.environ)
+    env.pop("ANALYSIS_CACHE_DB", None)
+    env.update({
+        "OPENAI_API_KEY": "mock",
+        "OPENAI_BASE_URL": f"{mock_url}/v1",
+        "GEMINI_API_KEY": "mock",
+        "GEMINI_BASE_URL": mock_url,
+        "JOBS_DIR": os.path.join(workdir, f"jobs-{port}"),
+        "PROFILING_ENABLED": "0",
+    })
+    for item in args.service_env:
+        key, _, value = item.partition("=")
+        env[key] = value
+
+    command = [
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+        "--workers", str(workers), "--log-level", "warning"
+    ]
+    url = f"http://127.0.0.1:{port}"
+    print(f"🚀 Starting service with {workers} worker(s) on {url}")
+    with _process(command, env, f"{url}/health/ready"):
+        yield url
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test /analyze against a mock LLM provider")
+    parser.add_argument("--concurrency", default="1,4,16", help="comma-separated client counts")
+    parser.add_argument("--server-workers", default="1", help="comma-separated uvicorn worker counts")
+    parser.add_argument("--duration", type=float, default=30.0, help="measured seconds per level")
+    parser.add_argument("--warmup", type=float, default=5.0, help="unmeasured seconds per level")
+    parser.add_argument("--document", choices=("text-pdf", "scanned-pdf"), default="text-pdf")
+    parser.add_argument("--size", default="small", help="corpus size name or character count")
+    parser.add_argument("--target", help="URL of a running service (skips starting one)")
+    parser.add_argument("--mock-url", help="URL of a running mock provider (skips starting one)")
+    parser.add_argument("--llm-distribution", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--llm-latency", type=float, default=2.0, help="mean mock LLM latency in seconds")
+    parser.add_argument("--llm-spread", type=float, default=0.5)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--service-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra environment for the service (e.g. OCR_WORKERS=4)")
+    parser.add_argument("--output", default="load-test-results.json")
+    args = parser.parse_args(argv)
+
+    concurrency_levels = [int(value) for value in args.concurrency.split(",") if value.strip()]
+    worker_counts = [int(value) for value in args.server_workers.split(",") if value.strip()]
+    workdir = tempfile.mkdtemp(prefix="legalai-load-")
+    document = _document(args.document, args.size, workdir)
+    print(f"📄 {args.document} [{args.size}]: {len(document)} bytes")
+
+    with _mock_server(args) as mock_url:
+        results = []
+        if args.target:
+            for concurrency in concurrency_levels:
+                level = asyncio.run(run_level(args.target, document, concurrency, args.duration, args.warmup))
+                level["serverWorkers"] = None
+                _print_level("external", level)
+                results.append(level)
+        else:
+            for workers in worker_counts:
+                with _service(args, mock_url, workers, workdir) as target:
+                    for concurrency in concurrency_levels:
+                        level = asyncio.run(run_level(target, document, concurrency, args.duration, args.warmup))
+                        level["serverWorkers"] = workers
+                        _print_level(workers, level)
+                        results.append(level)
+        mock_stats = _mock_stats(mock_url) if mock_url else None
+
+    report = {
+        "createdAt": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "config": {
+            "document": args.document,
+            "documentBytes": len(document),
+            "size": args.size,
+            "durationSeconds": args.duration,
+            "warmupSeconds": args.warmup,
+            "llm": {
+                "distribution": args.llm_distribution,
+                "meanLatencySeconds": args.llm_latency,
+                "spread": args.llm_spread,
+                "errorRate": args.llm_error_rate
+            },
+            "serviceEnv": args.service_env
+        },
+        "results": results,
+        "mockProvider": mock_stats
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,266 @@
+"""
+Mock LLM Server
+Local stand-in for OpenAI chat completions and Gemini (stream)GenerateContent
+
+Run from ai-service/:
+    python -m benchmarks.mock_llm --port 8099 --distribution lognormal --latency 2.0 --error-rate 0.02
+
+then point the service at it:
+    OPENAI_BASE_URL=http://127.0.0.1:8099/v1 OPENAI_API_KEY=mock
+    GEMINI_BASE_URL=http://127.0.0.1:8099 GEMINI_API_KEY=mock
+
+Every request sleeps for a latency drawn from the configured distribution
+and then either answers with a canned contract analysis or fails with the
+configured error rate (a share of failures are 429s with Retry-After).
+With --truncate-rate, that share of answers is cut off part way through,
+as when a real model hits its output token limit.
+Streamed requests ("stream": true for chat completions, or
+streamGenerateContent?alt=sse) wait STREAM_FIRST_SHARE of the latency
+before the first chunk and spread the rest over STREAM_CHUNKS chunks.
+GET /stats reports request, error and latency counters.
+"""
+
+import json
+import math
+import time
+import random
+import asyncio
+import argparse
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+import uvicorn
+
+DISTRIBUTIONS = ("fixed", "uniform", "exponential", "lognormal")
+
+# Streamed responses: share of the latency before the first chunk, and chunk count
+STREAM_FIRST_SHARE = 0.3
+STREAM_CHUNKS = 20
+
+CANNED_ANALYSIS = {
+    "summary": "Service agreement between a provider and a client for legal consultation services.",
+    "documentType": "Service Agreement",
+    "clauses": [
+        {
+            "type": "Termination",
+            "content": "Either party may terminate this Agreement with 30 days written notice.",
+            "riskLevel": "medium",
+            "explanation": "Short notice period allows either side to exit quickly."
+        },
+        {
+            "type": "Liability",
+            "content": "Liability shall be limited to the fees paid in the preceding 12 months.",
+            "riskLevel": "high",
+            "explanation": "Caps recovery well below potential losses."
+        }
+    ],
+    "keyTerms": [{"term": "Retainer", "definition": "Monthly fee of INR 50,000 plus taxes."}],
+    "parties": [
+        {"name": "ABC Legal Services Pvt. Ltd.", "role": "Service Provider"},
+        {"name": "XYZ Corporation", "role": "Client"}
+    ],
+    "dates": {"effective": "2026-01-01", "expiry": "2026-12-31"},
+    "obligations": [{"party": "Client", "description": "Pay invoices within 15 days."}],
+    "penalties": [
+        {"condition": "Early termination by Client", "consequence": "Two months' fees.", "severity": "medium"}
+    ],
+    "overallRiskScore": 55,
+    "recommendations": ["Negotiate a higher liability cap."],
+    "expertSuggestions": {"negotiationPoints": [], "draftingTips": [], "legalTraps": []}
+}
+
+
+class LatencyModel:
+    """Draws per-request latencies (seconds) from a named distribution."""
+
+    def __init__(self, distribution: str = "lognormal", mean: float = 1.0,
+                 spread: float = 0.5, seed: Optional[int] = None):
+        if distribution not in DISTRIBUTIONS:
+            raise ValueError(f"Unknown distribution '{distribution}'")
+        self.distribution = distribution
+        self.mean = mean
+        self.spread = spread
+        self._random = random.Random(seed)
+
+    def sample(self) -> float:
+        """
+        One latency draw.
+
+        fixed: always mean; uniform: mean +/- spread; exponential: mean;
+        lognormal: mean is the mean, spread is sigma of the underlying normal.
+        """
+        if self.mean <= 0:
+            return 0.0
+        if self.distribution == "fixed":
+            return self.mean
+        if self.distribution == "uniform":
+            return max(self._random.uniform(self.mean - self.spread, self.mean + self.spread), 0.0)
+        if self.distribution == "exponential":
+            return self._random.expovariate(1.0 / self.mean)
+        mu = math.log(self.mean) - self.spread ** 2 / 2
+        return self._random.lognormvariate(mu, self.spread)
+
+
+def create_app(latency: LatencyModel, error_rate: float = 0.0, rate_limit_share: float = 0.5,
+               retry_after: float = 1.0, seed: Optional[int] = None,
+               truncate_rate: float = 0.0) -> FastAPI:
+    """Build the mock provider app."""
+    app = FastAPI(title="Mock LLM Provider")
+    rng = random.Random(seed)
+    canned = json.dumps(CANNED_ANALYSIS)
+    stats: Dict[str, Any] = {
+        "requests": 0, "inflight": 0, "maxInflight": 0,
+        "errors": {"429": 0, "500": 0}, "truncated": 0, "latencyTotalSeconds": 0.0,
+        "startedAt": time.time()
+    }
+
+    async def simulate(share: float = 1.0) -> Tuple[Optional[JSONResponse], float]:
+        """
+        Sleep for the drawn latency; return an error response if this call fails.
+
+        Only `share` of the latency is slept here; the rest is returned for
+        a streamed response to spread over its chunks.
+        """
+        stats["requests"] += 1
+        stats["inflight"] += 1
+        stats["maxInflight"] = max(stats["maxInflight"], stats["inflight"])
+        delay = latency.sample()
+        try:
+            await asyncio.sleep(delay * share)
+        finally:
+            stats["inflight"] -= 1
+            stats["latencyTotalSeconds"] += delay
+        remaining = delay * (1.0 - share)
+
+        if rng.random() >= error_rate:
+            return None, remaining
+        if rng.random() < rate_limit_share:
+            stats["errors"]["429"] += 1
+            return JSONResponse(
+                status_code=429,
+                content={"error": {"message": "Rate limit reached (mock)", "type": "rate_limit_error"}},
+                headers={"Retry-After": str(retry_after)}
+            ), remaining
+        stats["errors"]["500"] += 1
+        return JSONResponse(
+            status_code=500,
+            content={"error": {"message": "Internal error (mock)", "type": "server_error"}}
+        ), remaining
+
+    def answer() -> str:
+        """The canned analysis, cut short for a truncate_rate share of calls."""
+        if rng.random() >= truncate_rate:
+            return canned
+        stats["truncated"] += 1
+        return canned[:rng.randint(len(canned) // 3, len(canned) - 1)]
+
+    def stream_chunks(remaining: float, frame: Callable[[str], Dict[str, Any]],
+                      trailer: str = "") -> StreamingResponse:
+        """SSE response with the canned analysis split into frame(piece) events over `remaining` seconds."""
+        text = answer()
+        size = max(math.ceil(len(text) / STREAM_CHUNKS), 1)
+        pieces = [text[start:start + size] for start in range(0, len(text), size)]
+
+        async def events():
+            for piece in pieces:
+                await asyncio.sleep(remaining / len(pieces))
+                yield f"data: {json.dumps(frame(piece))}\n\n"
+            if trailer:
+                yield trailer
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        streamed = bool(body.get("stream"))
+        error, remaining = await simulate(STREAM_FIRST_SHARE if streamed else 1.0)
+        if error is not None:
+            return error
+        if streamed:
+            completion_id = f"chatcmpl-mock-{stats['requests']}"
+
+            def frame(piece: str) -> Dict[str, Any]:
+                return {
+                    "id": completion_id, "object": "chat.completion.chunk",
+                    "created": int(time.time()), "model": body.get("model", "mock"),
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]
+                }
+
+            return stream_chunks(remaining, frame, trailer="data: [DONE]\n\n")
+        return {
+            "id": f"chatcmpl-mock-{stats['requests']}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": answer()},
+                "finish_reason": "stop"
+            }],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }
+
+    @app.post("/v1beta/models/{model}:generateContent")
+    async def generate_content(model: str, request: Request):
+        await request.body()
+        error, _ = await simulate()
+        if error is not None:
+            return error
+        return {
+            "candidates": [{
+                "content": {"role": "model", "parts": [{"text": answer()}]},
+                "finishReason": "STOP",
+                "index": 0
+            }],
+            "modelVersion": model
+        }
+
+    @app.post("/v1beta/models/{model}:streamGenerateContent")
+    async def stream_generate_content(model: str, request: Request):
+        await request.body()
+        error, remaining = await simulate(STREAM_FIRST_SHARE)
+        if error is not None:
+            return error
+        return stream_chunks(remaining, lambda piece: {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": piece}]}, "index": 0}],
+            "modelVersion": model
+        })
+
+    @app.get("/stats")
+    async def get_stats():
+        served = stats["requests"] - stats["inflight"]
+        return dict(
+            stats,
+            meanLatencySeconds=round(stats["latencyTotalSeconds"] / served, 4) if served else 0.0
+        )
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mock OpenAI/Gemini provider for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="lognormal")
+    parser.add_argument("--latency", type=float, default=1.0, help="mean latency in seconds")
+    parser.add_argument("--spread", type=float, default=0.5,
+                        help="uniform half-width in seconds, or lognormal sigma")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests that fail")
+    parser.add_argument("--rate-limit-share", type=float, default=0.5, help="share of failures that are 429s")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="fraction of answers cut off part way through")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    app = create_app(
+        LatencyModel(args.distribution, args.latency, args.spread, args.seed),
+        args.error_rate, args.rate_limit_share, args.retry_after, args.seed, args.truncate_rate
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+Benchmark Runner
+Times OCR, local NLP, ML analysis and the /analyze endpoint on a synthetic corpus
+
+Run from ai-service/:
+    python -m benchmarks.run --sizes small,medium --iterations 5 --output bench.json
+    python -m benchmarks.run --output new.json --baseline bench.json
+
+Each case runs in a fresh process, so peak RSS is per case. LLM providers
+are disabled (--llm off) or replaced by canned responses after a fixed
+latency (--llm stub); no network calls are made. Cases that need
+Tesseract or poppler are reported as skipped when those are missing.
+"""
+
+import os
+import sys
+import json
+import time
+import base64
+import shutil
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.corpus import iter_sizes, scanned_pdf, scanned_png, source_paragraphs, synthetic_contract, text_pdf
+
+CASES = {
+    "ocr_text_pdf": "OCRProcessor.extract_text on a PDF with a text layer",
+    "ocr_scanned_pdf": "OCRProcessor.extract_text on an image-only PDF",
+    "ocr_image": "OCRProcessor.extract_text on a scanned PNG page",
+    "nlp_local": "NLPAnalyzer._analyze_local on contract text",
+    "ml_analyzer": "MLLegalAnalyzer.analyze_document on contract text",
+    "api_text_pdf": "POST /analyze with a text-layer PDF",
+    "api_scanned_pdf": "POST /analyze with an image-only PDF",
+}
+
+# Cases that cannot produce meaningful numbers without Tesseract/poppler
+_NEEDS_TESSERACT = {"ocr_scanned_pdf", "ocr_image"}
+_NEEDS_POPPLER = {"ocr_scanned_pdf"}
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    """Linearly interpolated percentile of sorted values."""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def _peak_rss_mb() -> Dict[str, Optional[float]]:
+    """Peak resident set size of this process and its reaped children."""
+    peak = None
+    try:
+        # VmHWM is reset by exec; ru_maxrss would include the parent's peak
+        # inherited through fork
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    peak = round(int(line.split()[1]) / 1024, 1)
+    except (OSError, ValueError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return {"peakRssMb": peak, "peakChildRssMb": None}
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    if peak is None:
+        peak = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor, 1)
+    return {
+        "peakRssMb": peak,
+        "peakChildRssMb": round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / divisor, 1),
+    }
+
+
+def _unique_pdf(pdf: bytes, index: int) -> bytes:
+    """Append a comment after %%EOF so each request has a distinct digest (no cache hits)."""
+    return pdf + b"%%BENCH-%06d\n" % index
+
+
+def _stage_breakdown() -> Dict[str, Dict[str, float]]:
+    """Mean time per pipeline stage recorded by the metrics module during the case."""
+    from metrics import STAGE_SECONDS
+
+    breakdown = {}
+    for (stage,), snapshot in sorted(STAGE_SECONDS.snapshots().items()):
+        if snapshot["count"]:
+            breakdown[stage] = {
+                "count": int(snapshot["count"]),
+                "meanSeconds": round(snapshot["sum"] / snapshot["count"], 6)
+            }
+    return breakdown
+
+
+def _configure_llms(mode: str, latency: float, canned: str):
+    """Disable the LLM providers, or replace their calls with a canned answer."""
+    from llm_providers import get_providers
+
+    providers = get_providers()
+    if mode == "off":
+        providers.openai.api_key = None
+        providers.gemini.api_key = None
+        return
+
+    async def chat(model, messages, deadline=None, fairness_key="", **params):
+        await asyncio.sleep(latency)
+        return canned
+
+    async def generate(model, prompt, inline_data=None, mime_type="application/pdf",
+                       deadline=None, content_digest=None):
+        await asyncio.sleep(latency)
+        return canned
+
+    providers.openai.api_key = providers.gemini.api_key = "benchmark-stub"
+    providers.openai.chat = chat
+    providers.gemini.generate = generate
+
+
+def _setup_case(spec: Dict[str, Any]) -> Tuple[Callable[[int], Any], Callable[[], None]]:
+    """Build the timed callable (called with the iteration index) and a teardown."""
+    case = spec["case"]
+    files = spec["files"]
+
+    if case.startswith("ocr_"):
+        from ocr_processor import OCRProcessor
+        processor = OCRProcessor()
+        path, file_type = {
+            "ocr_text_pdf": (files["textPdf"], "pdf"),
+            "ocr_scanned_pdf": (files["scannedPdf"], "pdf"),
+            "ocr_image": (files["scannedPng"], "image"),
+        }[case]
+        with open(path, "rb") as f:
+            data = f.read()
+        return (lambda index: processor.extract_text(data, file_type)), processor.shutdown
+
+    with open(files["text"], encoding="utf-8") as f:
+        text = f.read()
+
+    if case == "nlp_local":
+        from nlp_analyzer import NLPAnalyzer
+        analyzer = NLPAnalyzer()
+        analyzer.warm_up()
+        return (lambda index: analyzer._analyze_local(text)), (lambda: None)
+
+    if case == "ml_analyzer":
+        from ml_analyzer import MLLegalAnalyzer
+        analyzer = MLLegalAnalyzer(models_dir=spec["modelsDir"])
+        return (lambda index: analyzer.analyze_document(text)), (lambda: None)
+
+    # Full endpoint through the ASGI app
+    from fastapi.testclient import TestClient
+    import main
+
+    _configure_llms(
+        spec["llm"], spec["llmLatency"], json.dumps(main.nlp_component.get().get_demo_analysis())
+    )
+    client = TestClient(main.app)
+    client.__enter__()
+
+    with open(files["textPdf" if case == "api_text_pdf" else "scannedPdf"], "rb") as f:
+        pdf = f.read()
+    payloads = [
+        {
+            "file": base64.b64encode(_unique_pdf(pdf, index)).decode("ascii"),
+            "fileName": "contract.pdf",
+            "fileType": "pdf"
+        }
+        for index in range(spec["warmup"] + spec["iterations"])
+    ]
+
+    def call(index: int):
+        response = client.post("/analyze", json=payloads[index])
+        if response.status_code != 200:
+            raise RuntimeError(f"/analyze returned {response.status_code}: {response.text[:200]}")
+        return response
+
+    return call, (lambda: client.__exit__(None, None, None))
+
+
+def run_case(spec: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one case in this (fresh) process and return its statistics."""
+    call, teardown = _setup_case(spec)
+    try:
+        for index in range(spec["warmup"]):
+            call(index)
+
+        # Only report stages of measured iterations
+        from metrics import STAGE_SECONDS
+        STAGE_SECONDS.clear()
+
+        latencies = []
+        for index in range(spec["warmup"], spec["warmup"] + spec["iterations"]):
+            started = time.perf_counter()
+            call(index)
+            latencies.append(time.perf_counter() - started)
+        stages = _stage_breakdown()
+    finally:
+        teardown()
+
+    ordered = sorted(latencies)
+    total = sum(latencies) or 1e-9
+    result = {
+        "latencySeconds": {
+            "mean": round(total / len(latencies), 6),
+            "min": round(ordered[0], 6),
+            "p50": round(_percentile(ordered, 0.50), 6),
+            "p95": round(_percentile(ordered, 0.95), 6),
+            "p99": round(_percentile(ordered, 0.99), 6),
+            "max": round(ordered[-1], 6),
+        },
+        "throughput": {
+            "docsPerSecond": round(len(latencies) / total, 4),
+            "charsPerSecond": round(spec["chars"] * len(latencies) / total, 1),
+            "pagesPerSecond": round(spec["pages"] * len(latencies) / total, 4),
+        },
+        "stages": stages,
+    }
+    result.update(_peak_rss_mb())
+    return result
+
+
+def _skip_reason(case: str) -> Optional[str]:
+    """Why a case cannot run in this environment (None if it can)."""
+    if case in _NEEDS_TESSERACT:
+        from ocr_processor import OCRProcessor
+        if not OCRProcessor().is_available():
+            return "Tesseract not available"
+    if case in _NEEDS_POPPLER and not shutil.which("pdftoppm") and not os.getenv("POPPLER_PATH"):
+        return "poppler (pdftoppm) not available"
+    if case == "ml_analyzer":
+        from ml_trainer import SKLEARN_AVAILABLE
+        if not SKLEARN_AVAILABLE:
+            return "scikit-learn not installed"
+    return None
+
+
+def build_corpus(workdir: str, sizes: List[Tuple[str, int]], scan_pages: int,
+                 train_models: bool) -> Dict[str, Dict[str, Any]]:
+    """Write contracts for every size to workdir and return their file paths and sizes."""
+    from ml_trainer import LegalMLTrainer
+
+    trainer = LegalMLTrainer(models_dir=os.path.join(workdir, "models"))
+    if train_models:
+        trainer.train_all_models()
+    paragraphs = source_paragraphs(trainer)
+
+    corpus_dir = os.path.join(workdir, "corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    corpus = {}
+    for seed, (name, chars) in enumerate(sizes):
+        text = synthetic_contract(chars, paragraphs, seed=seed)
+        pdf, pages = text_pdf(text)
+        scanned, scanned_pages = scanned_pdf(text, seed=seed, max_pages=scan_pages)
+
+        files = {
+            "text": os.path.join(corpus_dir, f"{name}.txt"),
+            "textPdf": os.path.join(corpus_dir, f"{name}.pdf"),
+            "scannedPdf": os.path.join(corpus_dir, f"{name}.scanned.pdf"),
+            "scannedPng": os.path.join(corpus_dir, f"{name}.png"),
+        }
+        with open(files["text"], "w", encoding="utf-8") as f:
+            f.write(text)
+        with open(files["textPdf"], "wb") as f:
+            f.write(pdf)
+        with open(files["scannedPdf"], "wb") as f:
+            f.write(scanned)
+        with open(files["scannedPng"], "wb") as f:
+            f.write(scanned_png(text, seed=seed))
+
+        corpus[name] = {
+            "chars": len(text),
+            "pages": pages,
+            "scannedPages": scanned_pages,
+            "textPdfBytes": len(pdf),
+            "scannedPdfBytes": len(scanned),
+            "files": files
+        }
+    return corpus
+
+
+def _case_units(case: str, document: Dict[str, Any]) -> Tuple[int, int]:
+    """Characters and pages one iteration of a case processes."""
+    if case in ("ocr_scanned_pdf", "api_scanned_pdf"):
+        # Only the first scan_pages pages are rendered as a scan
+        return int(document["chars"] * document["scannedPages"] / document["pages"]), document["scannedPages"]
+    if case == "ocr_image":
+        return int(document["chars"] / document["pages"]), 1
+    return document["chars"], document["pages"]
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str, tolerance: float) -> List[str]:
+    """Return regressions: cases whose p50 or p95 grew by more than tolerance."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["size"]): r for r in json.load(f)["results"] if "latencySeconds" in r}
+
+    regressions = []
+    for result in results:
+        before = baseline.get((result["case"], result["size"]))
+        if before is None or "latencySeconds" not in result:
+            continue
+        for key in ("p50", "p95"):
+            old, new = before["latencySeconds"][key], result["latencySeconds"][key]
+            if old > 0 and new > old * (1 + tolerance):
+                regressions.append(
+                    f"{result['case']}[{result['size']}] {key}: {old:.4f}s -> {new:.4f}s (+{(new / old - 1) * 100:.0f}%)"
+                )
+    return regressions
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the ai-service pipeline")
+    parser.add_argument("--cases", default=",".join(CASES), help="comma-separated cases: " + ", ".join(CASES))
+    parser.add_argument("--sizes", default="small,medium,large", help="size names or character counts")
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--scan-pages", type=int, default=5, help="pages rendered for scanned cases")
+    parser.add_argument("--llm", choices=("off", "stub"), default="off", help="LLM providers for API cases")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="stubbed LLM latency in seconds")
+    parser.add_argument("--workdir", help="corpus and scratch directory (default: a temp dir)")
+    parser.add_argument("--output", default="benchmark-results.json")
+    parser.add_argument("--baseline", help="previous results to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs the baseline")
+    args = parser.parse_args(argv)
+
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    unknown = [case for case in cases if case not in CASES]
+    if unknown:
+        parser.error(f"unknown cases: {', '.join(unknown)}")
+    sizes = iter_sizes(args.sizes.split(","))
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="legalai-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    # Keep the service's job store and caches out of the working tree;
+    # children inherit this environment
+    os.environ.update({
+        "JOBS_DIR": os.path.join(workdir, "jobs"),
+        "WARMUP_ON_STARTUP": "0",
+        "PROFILING_ENABLED": "0",
+    })
+    os.environ.pop("ANALYSIS_CACHE_DB", None)
+
+    print(f"📁 Building corpus in {workdir}")
+    corpus = build_corpus(workdir, sizes, args.scan_pages, train_models="ml_analyzer" in cases)
+
+    results = []
+    context = multiprocessing.get_context("spawn")
+    for case in cases:
+        reason = _skip_reason(case)
+        for name, _ in sizes:
+            document = corpus[name]
+            chars, pages = _case_units(case, document)
+            entry = {"case": case, "size": name, "chars": chars, "pages": pages,
+                     "iterations": args.iterations}
+            if reason:
+                print(f"⏭️  {case}[{name}] skipped: {reason}")
+                results.append(dict(entry, skipped=reason))
+                continue
+
+            spec = dict(
+                entry, warmup=args.warmup, files=document["files"], llm=args.llm,
+                llmLatency=args.llm_latency, modelsDir=os.path.join(workdir, "models")
+            )
+            print(f"⏱️  {case}[{name}] ({chars} chars, {pages} pages)...")
+            try:
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                    entry.update(pool.submit(run_case, spec).result())
+            except Exception as e:
+                print(f"   ❌ {e}")
+                results.append(dict(entry, error=str(e)))
+                continue
+            latency = entry["latencySeconds"]
+            print(f"   p50 {latency['p50']:.4f}s  p95 {latency['p95']:.4f}s  "
+                  f"{entry['throughput']['docsPerSecond']:.2f} docs/s  peak RSS {entry['peakRssMb']} MB")
+            results.append(entry)
+
+    report = {
+        "createdAt": datetime.now().isoformat(),
+        "gitCommit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpuCount": os.cpu_count(),
+        "config": {
+            "iterations": args.iterations,
+            "warmup": args.warmup,
+            "scanPages": args.scan_pages,
+            "llm": args.llm,
+            "llmLatencySeconds": args.llm_latency if args.llm == "stub" else None,
+        },
+        "corpus": {name: {k: v for k, v in doc.items() if k != "files"} for name, doc in corpus.items()},
+        "results": results
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if not args.workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for line in regressions:
+            print(f"WARNING: regression {line}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
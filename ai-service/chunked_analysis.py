@@ -0,0 +1,256 @@
+"""
+Chunked Analysis Module
+Map-reduce analysis of documents longer than a single LLM prompt
+"""
+
+import os
+import re
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sentence_index import SentenceIndex
+
+
+# Section headings: "ARTICLE IV", "Section 7.", "12. TERMINATION", "SCHEDULE A", "GOVERNING LAW"
+_HEADING = re.compile(
+    r'^[ \t]*(?:'
+    r'(?:ARTICLE|Article|SECTION|Section|SCHEDULE|Schedule|ANNEXURE|Annexure|EXHIBIT|Exhibit|APPENDIX|Appendix)'
+    r'\s+[\dIVXLCA-Z]+\b[^\n]{0,80}'
+    r'|\d{1,2}(?:\.\d{1,2})*\.?[ \t]+[A-Z][A-Za-z ,&/\-]{1,80}'
+    r'|[A-Z][A-Z0-9 ,&/\-]{3,80}'
+    r')[ \t]*$',
+    re.MULTILINE
+)
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class Chunk(NamedTuple):
+    """A slice of the document sent to the LLM as one request."""
+    index: int
+    start: int
+    end: int
+    text: str
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer from the environment."""
+    try:
+        value = int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+def _section_bounds(text: str) -> List[int]:
+    """Offsets where sections start (always including 0 and len(text))."""
+    starts = {0, len(text)}
+    starts.update(match.start() for match in _HEADING.finditer(text))
+    return sorted(starts)
+
+
+def _split_long_span(text: str, sentences: SentenceIndex, start: int, end: int,
+                     max_chars: int) -> List[Tuple[int, int]]:
+    """Split [start, end) at sentence ends (or whitespace) into pieces of at most max_chars."""
+    pieces = []
+    while end - start > max_chars:
+        limit = start + max_chars
+        # Cut after the last sentence that ends inside the window
+        cut = start
+        if len(sentences):
+            index = sentences.index_at(limit)
+            if sentences.spans[index][1] <= limit:
+                cut = sentences.spans[index][1]
+            elif index > 0:
+                cut = sentences.spans[index - 1][1]
+        if cut <= start:
+            # A single sentence longer than the window: cut at whitespace
+            cut = text.rfind(' ', start + 1, limit)
+            if cut <= start:
+                cut = limit
+        pieces.append((start, cut))
+        start = cut
+    pieces.append((start, end))
+    return pieces
+
+
+def split_into_chunks(text: str, max_chars: Optional[int] = None,
+                      overlap_chars: Optional[int] = None) -> List[Chunk]:
+    """
+    Split a document into prompt-sized chunks.
+
+    Sections (split at headings) are packed greedily into chunks of up to
+    max_chars; sections that are too long on their own are split at
+    sentence boundaries. Every chunk after the first also repeats up to
+    overlap_chars of the preceding text, starting at a sentence boundary,
+    so a clause straddling a cut is seen whole by at least one request.
+    """
+    max_chars = max_chars or _env_int('LLM_CHUNK_CHARS', 12000)
+    overlap_chars = overlap_chars if overlap_chars is not None else _env_int('LLM_CHUNK_OVERLAP', 800)
+
+    if len(text) <= max_chars:
+        return [Chunk(0, 0, len(text), text)]
+
+    sentences = SentenceIndex(text)
+    bounds = _section_bounds(text)
+
+    pieces: List[Tuple[int, int]] = []
+    for start, end in zip(bounds, bounds[1:]):
+        pieces.extend(_split_long_span(text, sentences, start, end, max_chars))
+
+    # Greedily pack pieces into chunks
+    spans: List[Tuple[int, int]] = []
+    chunk_start, chunk_end = pieces[0]
+    for start, end in pieces[1:]:
+        if end - chunk_start <= max_chars:
+            chunk_end = end
+        else:
+            spans.append((chunk_start, chunk_end))
+            chunk_start, chunk_end = start, end
+    spans.append((chunk_start, chunk_end))
+
+    chunks = []
+    for index, (start, end) in enumerate(spans):
+        if index > 0 and overlap_chars:
+            overlap_start = max(start - overlap_chars, spans[index - 1][0])
+            # Begin the overlap at the next sentence start
+            sentence = sentences.index_at(overlap_start)
+            if sentence < len(sentences) and sentences.spans[sentence][0] < overlap_start:
+                sentence += 1
+            if sentence < len(sentences) and sentences.spans[sentence][0] < start:
+                start = sentences.spans[sentence][0]
+        chunks.append(Chunk(index, start, end, text[start:end]))
+    return chunks
+
+
+async def map_chunks(chunks: List[Chunk],
+                     analyze: Callable[[Chunk], Awaitable[Dict[str, Any]]],
+                     max_concurrency: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Analyze chunks concurrently, at most max_concurrency at a time.
+
+    Results are returned in chunk order. If any chunk fails the others are
+    cancelled and the error is raised, so callers never merge a partial
+    document.
+    """
+    limit = asyncio.Semaphore(max_concurrency or _env_int('LLM_CHUNK_CONCURRENCY', 4))
+
+    async def run(chunk: Chunk) -> Dict[str, Any]:
+        async with limit:
+            return await analyze(chunk)
+
+    tasks = [asyncio.create_task(run(chunk)) for chunk in chunks]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def _norm(value: Any, limit: int = 80) -> str:
+    """Normalize a field for duplicate detection."""
+    return _WHITESPACE.sub(' ', str(value or '')).strip().lower()[:limit]
+
+
+def _merge_items(partials: List[Dict[str, Any]], field: str, key_fields: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    """Concatenate a list field across chunks, dropping duplicates (first wins)."""
+    merged = []
+    seen = set()
+    for partial in partials:
+        for item in partial.get(field) or []:
+            if isinstance(item, dict):
+                key = tuple(_norm(item.get(name)) for name in key_fields)
+            else:
+                key = (_norm(item),)
+            if key in seen:
+                continue
+            seen.add(key)
+            merged.append(item)
+    return merged
+
+
+def _merge_strings(partials: List[Dict[str, Any]], getter: Callable[[Dict[str, Any]], Any]) -> List[str]:
+    """Union of string lists across chunks, preserving first-seen order."""
+    merged = []
+    seen = set()
+    for partial in partials:
+        for value in getter(partial) or []:
+            key = _norm(value, limit=200)
+            if key and key not in seen:
+                seen.add(key)
+                merged.append(value)
+    return merged
+
+
+def combined_risk_score(partials: List[Dict[str, Any]], weights: List[int]) -> int:
+    """
+    Combine per-chunk risk scores.
+
+    The length-weighted mean reflects the document as a whole, but a single
+    risky section should not be diluted by boilerplate, so the result is
+    the average of that mean and the highest chunk score.
+    """
+    scored = []
+    for partial, weight in zip(partials, weights):
+        try:
+            scored.append((float(partial.get('overallRiskScore')), weight))
+        except (TypeError, ValueError):
+            continue
+    if not scored:
+        return 50
+
+    total_weight = sum(weight for _, weight in scored) or 1
+    mean = sum(score * weight for score, weight in scored) / total_weight
+    highest = max(score for score, _ in scored)
+    return int(round(min(max((mean + highest) / 2, 0), 100)))
+
+
+def merge_analyses(partials: List[Dict[str, Any]], chunks: List[Chunk]) -> Dict[str, Any]:
+    """Reduce per-chunk analyses into one document analysis."""
+    if len(partials) == 1:
+        return partials[0]
+
+    first = partials[0]
+    document_types = Counter(p.get('documentType') for p in partials if p.get('documentType'))
+
+    dates: Dict[str, Any] = {"effective": None, "expiry": None}
+    for partial in partials:
+        partial_dates = partial.get('dates') or {}
+        for key in ("effective", "expiry"):
+            if dates[key] is None and partial_dates.get(key):
+                dates[key] = partial_dates[key]
+    important = _merge_items(
+        [{"important": (p.get('dates') or {}).get('important')} for p in partials],
+        'important', ('description', 'date')
+    )
+    if important:
+        dates["important"] = important
+
+    suggestions = {
+        key: _merge_strings(partials, lambda p, key=key: (p.get('expertSuggestions') or {}).get(key))
+        for key in ("negotiationPoints", "draftingTips", "legalTraps")
+    }
+
+    merged = dict(first)
+    merged.update({
+        "summary": first.get('summary', ''),
+        "documentType": document_types.most_common(1)[0][0] if document_types else first.get('documentType'),
+        "clauses": _merge_items(partials, 'clauses', ('type', 'content')),
+        "keyTerms": _merge_items(partials, 'keyTerms', ('term',)),
+        "parties": _merge_items(partials, 'parties', ('role', 'name')),
+        "dates": dates,
+        "obligations": _merge_items(partials, 'obligations', ('party', 'description')),
+        "penalties": _merge_items(partials, 'penalties', ('condition', 'consequence')),
+        "overallRiskScore": combined_risk_score(partials, [len(chunk.text) for chunk in chunks]),
+        "recommendations": _merge_strings(partials, lambda p: p.get('recommendations')),
+        "expertSuggestions": suggestions,
+        "chunksAnalyzed": len(partials)
+    })
+    # missingSections of the first chunk says nothing about the merge
+    merged.pop('missingSections', None)
+    if any(p.get('partial') for p in partials):
+        merged['partial'] = True
+    return merged
@@ -0,0 +1,197 @@
+"""
+Document Source Module
+Holds an uploaded document exactly once, in memory or spooled to disk
+"""
+
+import io
+import os
+import asyncio
+import time
+import hashlib
+import tempfile
+from typing import BinaryIO, List, Optional
+
+from metrics import observe_stage
+
+
+def _env_bytes(name: str, default: int) -> int:
+    """Read a positive byte count from the environment."""
+    try:
+        value = int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+# Bodies up to this size stay in memory; larger ones are spooled to disk
+SPOOL_MEMORY_LIMIT = _env_bytes("UPLOAD_SPOOL_MEMORY_BYTES", 8 * 1024 * 1024)
+
+# Uploads larger than this are rejected
+MAX_UPLOAD_BYTES = _env_bytes("MAX_UPLOAD_BYTES", 100 * 1024 * 1024)
+
+# Read size used when copying from an upload stream
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+    def __init__(self, limit: int):
+        super().__init__(f"Upload exceeds the {limit} byte limit")
+        self.limit = limit
+
+
+class DocumentSource:
+    """
+    A received document: either an in-memory buffer or a spool file path.
+
+    Consumers take whichever form they can use without copying - OCR reads
+    the buffer (PyPDF2 via BytesIO, OpenCV via imdecode) or the file path,
+    and only an LLM that needs inline bytes reads a spooled file back.
+
+    Spool files are owned and deleted by cleanup(); files the service only
+    reads in place (owned=False) are left alone.
+    """
+
+    def __init__(self, name: str, digest: str, size: int,
+                 data: Optional[bytes] = None, path: Optional[str] = None, owned: bool = True):
+        self.name = name
+        self.digest = digest
+        self.size = size
+        self.data = data
+        self.path = path
+        self.owned = owned
+
+    @classmethod
+    def from_bytes(cls, data: bytes, name: str) -> "DocumentSource":
+        """Wrap an already decoded document without copying it."""
+        return cls(name, hashlib.sha256(data).hexdigest(), len(data), data=data)
+
+    @classmethod
+    def from_path(cls, path: str, name: Optional[str] = None) -> "DocumentSource":
+        """Reference an existing file in place, hashing it in chunks; cleanup() keeps the file."""
+        digest = hashlib.sha256()
+        size = 0
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(UPLOAD_CHUNK_SIZE), b""):
+                digest.update(chunk)
+                size += len(chunk)
+        return cls(name or os.path.basename(path), digest.hexdigest(), size, path=path, owned=False)
+
+    @property
+    def in_memory(self) -> bool:
+        """Whether the document is held in memory rather than on disk."""
+        return self.data is not None
+
+    @property
+    def ocr_input(self):
+        """The buffer or path to hand to OCRProcessor.extract_text."""
+        return self.data if self.in_memory else self.path
+
+    def open(self) -> BinaryIO:
+        """Open the document for reading."""
+        if self.in_memory:
+            return io.BytesIO(self.data)
+        return open(self.path, 'rb')
+
+    def read_bytes(self) -> bytes:
+        """Return the document bytes (reads the spool file if on disk)."""
+        if self.in_memory:
+            return self.data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def cleanup(self):
+        """Delete the spool file, if any (never a file referenced with owned=False)."""
+        if self.owned and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+        self.path = None
+
+
+class DocumentSpooler:
+    """
+    Receives an upload chunk by chunk.
+
+    Chunks are hashed as they arrive. They are buffered in memory up to
+    SPOOL_MEMORY_LIMIT; beyond that the buffer is flushed to a temporary
+    file and later chunks are appended to it, so a large body is never
+    held in memory.
+    """
+
+    def __init__(self, name: str, suffix: str = "",
+                 memory_limit: int = SPOOL_MEMORY_LIMIT, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.name = name
+        self.suffix = suffix
+        self.memory_limit = memory_limit
+        self.max_bytes = max_bytes
+        self._hash = hashlib.sha256()
+        self._chunks: List[bytes] = []
+        self._buffered = 0
+        self._size = 0
+        self._file: Optional[BinaryIO] = None
+        self._write_seconds = 0.0
+
+    async def write(self, chunk: bytes):
+        """
+        Add a chunk of the upload.
+
+        Raises:
+            UploadTooLargeError: if the upload exceeds max_bytes
+        """
+        if not chunk:
+            return
+
+        self._size += len(chunk)
+        if self._size > self.max_bytes:
+            await asyncio.to_thread(self.discard)
+            raise UploadTooLargeError(self.max_bytes)
+
+        self._hash.update(chunk)
+
+        if self._file is not None:
+            await asyncio.to_thread(self._write_file, chunk)
+            return
+
+        self._chunks.append(chunk)
+        self._buffered += len(chunk)
+        if self._buffered > self.memory_limit:
+            await asyncio.to_thread(self._spill)
+
+    def _spill(self):
+        """Move buffered chunks to a spool file."""
+        self._file = tempfile.NamedTemporaryFile(delete=False, suffix=self.suffix)
+        for chunk in self._chunks:
+            self._write_file(chunk)
+        self._chunks = []
+        self._buffered = 0
+
+    def _write_file(self, chunk: bytes):
+        """Append a chunk to the spool file, accumulating the time spent."""
+        started = time.perf_counter()
+        self._file.write(chunk)
+        self._write_seconds += time.perf_counter() - started
+
+    async def finish(self) -> DocumentSource:
+        """Complete the upload and return its DocumentSource."""
+        digest = self._hash.hexdigest()
+
+        if self._file is not None:
+            path = self._file.name
+            await asyncio.to_thread(self._file.close)
+            self._file = None
+            observe_stage("spool_file_write", self._write_seconds)
+            return DocumentSource(self.name, digest, self._size, path=path)
+
+        data = self._chunks[0] if len(self._chunks) == 1 else b"".join(self._chunks)
+        self._chunks = []
+        return DocumentSource(self.name, digest, self._size, data=data)
+
+    def discard(self):
+        """Drop everything received so far."""
+        self._chunks = []
+        if self._file is not None:
+            path = self._file.name
+            self._file.close()
+            self._file = None
+            if os.path.exists(path):
+                os.remove(path)
@@ -0,0 +1,113 @@
+"""
+Extraction DAG Module
+Runs dependent extraction steps in dependency order, serially or on a pool
+"""
+
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from metrics import replay, run_captured, timed
+
+# Called as on_result(name, value) in the calling thread as each step finishes
+ResultCallback = Callable[[str, Any], None]
+
+
+class Step(NamedTuple):
+    """
+    One extraction step.
+
+    fn is called with the results of `requires`, in order, and its duration
+    is recorded as `stage`. Inline steps always run in the calling thread;
+    use that for steps cheaper than shipping their inputs to a worker.
+    """
+    name: str
+    fn: Callable[..., Any]
+    requires: Tuple[str, ...] = ()
+    stage: str = ""
+    inline: bool = False
+
+
+def _run_step(stage: str, fn: Callable[..., Any], *args: Any) -> Any:
+    """Run one step under its stage timer (module-level so process pools can pickle it)."""
+    with timed(stage):
+        return fn(*args)
+
+
+class ExtractionDAG:
+    """
+    A fixed set of steps and the dependencies between them.
+
+    run() without a pool executes the steps one by one in declaration
+    order (which must already respect the dependencies). With a pool,
+    every step whose inputs are ready is submitted at once and dependents
+    are submitted as their inputs finish, so independent steps overlap;
+    inline steps run in the calling thread meanwhile. Stage timings made
+    in pool workers are captured there and recorded by the caller, so
+    they survive a process boundary. Step functions must be picklable to
+    run on a process pool.
+    """
+
+    def __init__(self, steps: Iterable[Step], inputs: Iterable[str] = ()):
+        self.steps: List[Step] = list(steps)
+        self.inputs = tuple(inputs)
+
+        known = set(self.inputs)
+        for step in self.steps:
+            missing = [name for name in step.requires if name not in known]
+            if missing:
+                raise ValueError(f"Step '{step.name}' requires {missing}, which no earlier step provides")
+            if step.name in known:
+                raise ValueError(f"Step '{step.name}' is defined twice")
+            known.add(step.name)
+
+    def run(self, inputs: Dict[str, Any], pool: Optional[Executor] = None,
+            on_result: Optional[ResultCallback] = None) -> Dict[str, Any]:
+        """Run every step; returns the inputs plus each step's result by name."""
+        results = dict(inputs)
+        missing = [name for name in self.inputs if name not in results]
+        if missing:
+            raise ValueError(f"Missing DAG inputs: {missing}")
+
+        def finish(step: Step, value: Any):
+            results[step.name] = value
+            if on_result is not None:
+                on_result(step.name, value)
+
+        if pool is None:
+            for step in self.steps:
+                finish(step, _run_step(step.stage or step.name, step.fn, *self._args(step, results)))
+            return results
+
+        pending = list(self.steps)
+        running: Dict[Future, Step] = {}
+        try:
+            while pending or running:
+                ready = [step for step in pending if all(name in results for name in step.requires)]
+                pending = [step for step in pending if step not in ready]
+                for step in ready:
+                    if not step.inline:
+                        future = pool.submit(
+                            run_captured, _run_step, step.stage or step.name, step.fn, *self._args(step, results)
+                        )
+                        running[future] = step
+                inline = [step for step in ready if step.inline]
+                for step in inline:
+                    finish(step, _run_step(step.stage or step.name, step.fn, *self._args(step, results)))
+                if inline or not running:
+                    # Inline results may have unblocked more steps
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    step = running.pop(future)
+                    value, observations = future.result()
+                    replay(observations)
+                    finish(step, value)
+        finally:
+            for future in running:
+                future.cancel()
+        return results
+
+    @staticmethod
+    def _args(step: Step, results: Dict[str, Any]) -> List[Any]:
+        return [results[name] for name in step.requires]
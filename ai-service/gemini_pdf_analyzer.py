@@ -8,14 +8,27 @@ import os
 from typing import Dict, Any, Optional
 from pathlib import Path
 
-try:
-    import google.generativeai as genai
-    GEMINI_AVAILABLE = True
-except ImportError:
-    GEMINI_AVAILABLE = False
+from lazy_init import module_available
+from json_stream import SECTIONS, LLMSectionStream, SectionCallback, fill_missing_sections, recover_json
+from llm_providers import get_providers
+
+# google-generativeai is slow to import; it is loaded when an analyzer is built
+GEMINI_AVAILABLE = module_available("google.generativeai")
+if not GEMINI_AVAILABLE:
     print("⚠️  google-generativeai not installed")
     print("Install with: pip install google-generativeai")
 
+genai = None
+
+
+def _import_genai():
+    """Import google.generativeai on first use."""
+    global genai
+    if genai is None:
+        import google.generativeai as genai_module
+        genai = genai_module
+    return genai
+
 
 class GeminiPDFAnalyzer:
     """
@@ -23,6 +36,9 @@ class GeminiPDFAnalyzer:
     Supports native PDF processing without OCR.
     """
     
+    # Gemini 1.5 Pro for PDF support
+    MODEL_NAME = 'gemini-1.5-pro'
+    
     def __init__(self, api_key: Optional[str] = None):
         """Initialize Gemini PDF Analyzer."""
         self.api_key = api_key or os.getenv('GEMINI_API_KEY')
@@ -38,10 +54,10 @@ class GeminiPDFAnalyzer:
             return
         
         # Configure Gemini
+        _import_genai()
         genai.configure(api_key=self.api_key)
         
-        # Use Gemini 1.5 Pro for PDF support
-        self.model = genai.GenerativeModel('gemini-1.5-pro')
+        self.model = genai.GenerativeModel(self.MODEL_NAME)
         
         print("✅ Gemini PDF Analyzer initialized")
     
@@ -93,6 +109,9 @@ class GeminiPDFAnalyzer:
         """
         Analyze PDF from bytes (for smaller PDFs < 50MB).
         
+        Blocking SDK call for scripts; the service uses
+        analyze_pdf_inline_async.
+        
         Args:
             pdf_bytes: PDF file bytes
             filename: Original filename
@@ -130,6 +149,40 @@ class GeminiPDFAnalyzer:
             print(f"   ❌ Error: {e}")
             return {"error": str(e)}
     
+    async def analyze_pdf_inline_async(self, pdf_bytes: bytes, filename: str = "document.pdf",
+                                       digest: Optional[str] = None,
+                                       on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
+        """
+        Analyze PDF bytes through the shared async provider layer.
+        
+        Uses pooled connections, a per-call deadline, retries with jittered
+        backoff and the Gemini circuit breaker. Errors are returned as
+        {"error": ...} like analyze_pdf_inline. digest (SHA-256 of the bytes,
+        if the caller has it) identifies identical in-flight requests.
+        With on_section, the response is streamed and each section reported
+        as soon as its JSON is complete (clauses and obligations item by item).
+        """
+        provider = get_providers().gemini
+        if not provider.enabled:
+            return {"error": "Gemini API not configured"}
+        
+        print(f"📄 Analyzing PDF: {filename}")
+        
+        try:
+            print("   🤖 Generating analysis...")
+            response_text = await provider.generate(
+                self.MODEL_NAME, self._create_analysis_prompt(), inline_data=pdf_bytes,
+                content_digest=digest,
+                on_delta=LLMSectionStream(on_section, "gemini") if on_section else None
+            )
+            analysis = self._parse_gemini_response(response_text)
+            print("   ✅ Analysis complete!")
+            return analysis
+            
+        except Exception as e:
+            print(f"   ❌ Error: {e}")
+            return {"error": str(e)}
+    
     def _create_analysis_prompt(self) -> str:
         """Create comprehensive analysis prompt for legal documents."""
         return """
@@ -217,35 +270,19 @@ Return ONLY the JSON object, nothing else.
 """
     
     def _parse_gemini_response(self, response_text: str) -> Dict[str, Any]:
-        """Parse Gemini's response into structured data."""
-        import json
-        import re
+        """
+        Parse Gemini's response into structured data.
         
-        try:
-            # Remove markdown code blocks if present
-            cleaned = response_text.strip()
-            if cleaned.startswith('```'):
-                # Extract JSON from code block
-                match = re.search(r'```(?:json)?\s*(\{.*\})\s*```', cleaned, re.DOTALL)
-                if match:
-                    cleaned = match.group(1)
-                else:
-                    # Remove first and last lines
-                    lines = cleaned.split('\n')
-                    cleaned = '\n'.join(lines[1:-1])
-            
-            # Parse JSON
-            analysis = json.loads(cleaned)
-            
-            # Add metadata
-            analysis['mlPowered'] = False
-            analysis['geminiPowered'] = True
-            analysis['analysisMethod'] = 'Gemini PDF Native Processing'
-            
-            return analysis
-            
-        except json.JSONDecodeError as e:
-            print(f"⚠️  Failed to parse JSON: {e}")
+        Markdown fences and text around the JSON are ignored. A truncated
+        or partly malformed response keeps every section (and every whole
+        clause or obligation) that came before the damage; the sections it
+        never reached are filled with empty defaults, listed in
+        missingSections, and the analysis is marked partial.
+        """
+        analysis, complete = recover_json(response_text)
+        
+        if not isinstance(analysis, dict) or not any(section in analysis for section in SECTIONS):
+            print("⚠️  Failed to parse JSON from Gemini response")
             print(f"Response: {response_text[:500]}")
             
             # Return fallback structure
@@ -256,6 +293,19 @@ Return ONLY the JSON object, nothing else.
                 "error": "Failed to parse structured response",
                 "rawResponse": response_text
             }
+        
+        if not complete:
+            recovered = sum(section in analysis for section in SECTIONS)
+            analysis['partial'] = True
+            analysis['missingSections'] = fill_missing_sections(analysis)
+            print(f"⚠️  Gemini response was cut short, recovered {recovered} of {len(SECTIONS)} sections")
+        
+        # Add metadata
+        analysis['mlPowered'] = False
+        analysis['geminiPowered'] = True
+        analysis['analysisMethod'] = 'Gemini PDF Native Processing'
+        
+        return analysis
     
     def analyze_pdf_with_questions(self, pdf_path: str, questions: list) -> Dict[str, Any]:
         """
@@ -0,0 +1,113 @@
+"""
+Hedging Module
+Races analysis strategies with staggered starts and a latency SLA
+"""
+
+import os
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional, Tuple
+
+
+def _env_seconds(name: str, default: float) -> float:
+    """Read a non-negative number of seconds from the environment."""
+    try:
+        value = float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+# Start the next strategy if the previous one has not answered by then
+HEDGE_DELAY_SECONDS = _env_seconds("HEDGE_DELAY_SECONDS", 8.0)
+
+# After this, only the fallback strategy is waited for
+ANALYSIS_SLA_SECONDS = _env_seconds("ANALYSIS_SLA_SECONDS", 40.0)
+
+
+class Candidate(NamedTuple):
+    """
+    One strategy in a race.
+
+    start() returns the awaitable to run; it should raise if it cannot
+    produce a valid result. delay is when to start it, in seconds from the
+    beginning of the race. The fallback candidate is the one that is always
+    expected to succeed (e.g. local analysis); it is started at the SLA at
+    the latest and is the only one still awaited after the SLA.
+    """
+    name: str
+    start: Callable[[], Awaitable[Any]]
+    delay: float = 0.0
+    fallback: bool = False
+
+
+async def race(candidates: List[Candidate], sla: Optional[float] = None) -> Tuple[str, Any]:
+    """
+    Return (name, result) of the first candidate to succeed.
+
+    Candidates are started at their delay, or immediately once every
+    running candidate has failed. When the SLA elapses, non-fallback
+    candidates are cancelled and the fallback is started (if it has not
+    been) and awaited. Unfinished candidates are cancelled on return.
+
+    Raises the last error if every candidate fails.
+    """
+    sla = ANALYSIS_SLA_SECONDS if sla is None else sla
+    began = time.monotonic()
+    waiting = sorted(candidates, key=lambda c: c.delay)
+    running = {}
+    last_error: Optional[BaseException] = None
+    sla_passed = False
+
+    def launch(candidate: Candidate):
+        waiting.remove(candidate)
+        task = asyncio.ensure_future(candidate.start())
+        running[task] = candidate
+
+    try:
+        while waiting or running:
+            elapsed = time.monotonic() - began
+
+            if not sla_passed and elapsed >= sla:
+                sla_passed = True
+                for task, candidate in list(running.items()):
+                    if not candidate.fallback:
+                        task.cancel()
+                        del running[task]
+                waiting = [c for c in waiting if c.fallback]
+
+            # Start everything that is due, or the next one if nothing is running
+            for candidate in list(waiting):
+                if candidate.delay <= elapsed or (sla_passed and candidate.fallback):
+                    launch(candidate)
+            if not running and waiting:
+                launch(waiting[0])
+
+            timeout = None
+            if waiting:
+                timeout = max(waiting[0].delay - elapsed, 0)
+            if not sla_passed:
+                remaining = max(sla - elapsed, 0)
+                timeout = remaining if timeout is None else min(timeout, remaining)
+
+            done, _ = await asyncio.wait(
+                list(running), timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                candidate = running.pop(task)
+                try:
+                    return candidate.name, task.result()
+                except asyncio.CancelledError:
+                    continue
+                except Exception as e:
+                    print(f"WARNING: {candidate.name} strategy failed: {e}")
+                    last_error = e
+    finally:
+        for task in running:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Mark the outcome as retrieved
+                task.exception()
+
+    raise last_error or RuntimeError("No analysis strategy produced a result")
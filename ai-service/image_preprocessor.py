@@ -0,0 +1,172 @@
+"""
+Image Preprocessor Module
+OCR preprocessing with text-height normalization and reusable buffers
+"""
+
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a positive number from the environment."""
+    try:
+        value = float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+class ImagePreprocessor:
+    """
+    Prepares page images for Tesseract.
+
+    Pages are first rescaled so that text is about TARGET_TEXT_HEIGHT
+    pixels tall (an x-height of about 20px, i.e. 10-11pt text at 300 DPI),
+    where Tesseract is most accurate. Large print and high-DPI scans are shrunk,
+    so every later pass touches fewer pixels; low-resolution photos are
+    enlarged. Text height is measured on a small thumbnail from the
+    median height of glyph-sized connected components.
+
+    Then the page is blurred and adaptively thresholded. The threshold is
+    the same local Gaussian mean as cv2.adaptiveThreshold, computed with a
+    separable blur and one saturating compare, which is about twice as
+    fast for the 11px window. Morphological
+    cleanup only runs for kernels larger than 1x1 (a 1x1 open/close is an
+    identity). Intermediate buffers are kept per thread and reused while
+    page sizes repeat, which they do within a document.
+
+    OCR_OPENCV_THREADS sets cv2.setNumThreads (0 = single-threaded, which
+    avoids oversubscription when pages already run in a process pool);
+    unset leaves OpenCV's default.
+    """
+
+    # Median connected-component height (pixels) to normalize text to
+    TARGET_TEXT_HEIGHT = 30
+
+    # Rescale only when the page is off by more than this factor
+    RESCALE_TOLERANCE = 0.2
+
+    # Never shrink or enlarge beyond these factors
+    MIN_SCALE = 0.3
+    MAX_SCALE = 2.5
+
+    # Longest side of the thumbnail used to measure text height
+    PROBE_SIZE = 1000
+
+    # Fewer components than this means the measurement is not trustworthy
+    MIN_COMPONENTS = 30
+
+    # Adaptive threshold window (pixels) and offset below the local mean
+    THRESHOLD_BLOCK = 11
+    THRESHOLD_OFFSET = 2
+
+    def __init__(self, morph_kernel: Optional[int] = None, target_text_height: Optional[float] = None):
+        self.morph_kernel = int(morph_kernel or _env_float("OCR_MORPH_KERNEL", 1))
+        self.target_text_height = target_text_height or _env_float(
+            "OCR_TARGET_TEXT_HEIGHT", self.TARGET_TEXT_HEIGHT
+        )
+        self._kernel = (
+            np.ones((self.morph_kernel, self.morph_kernel), np.uint8) if self.morph_kernel > 1 else None
+        )
+        self._buffers = threading.local()
+
+        threads = os.getenv("OCR_OPENCV_THREADS")
+        if threads is not None and threads.strip().lstrip("-").isdigit():
+            cv2.setNumThreads(int(threads))
+        cv2.setUseOptimized(True)
+
+    def _buffer(self, name: str, shape: Tuple[int, ...]) -> np.ndarray:
+        """Return this thread's uint8 buffer for `name`, reallocating only when the shape changes."""
+        buffers: Dict[str, np.ndarray] = getattr(self._buffers, "arrays", None)
+        if buffers is None:
+            buffers = self._buffers.arrays = {}
+        array = buffers.get(name)
+        if array is None or array.shape != shape:
+            array = buffers[name] = np.empty(shape, np.uint8)
+        return array
+
+    def measure_text_height(self, gray: np.ndarray) -> Optional[float]:
+        """
+        Estimate the typical text height of a grayscale page in pixels.
+
+        Returns None for pages with too little text to measure.
+        """
+        height, width = gray.shape[:2]
+        probe_scale = min(self.PROBE_SIZE / max(height, width), 1.0)
+        if probe_scale < 1.0:
+            size = (max(int(width * probe_scale), 1), max(int(height * probe_scale), 1))
+            probe = cv2.resize(gray, size, dst=self._buffer("probe", size[::-1]), interpolation=cv2.INTER_LINEAR)
+        else:
+            probe = gray
+
+        _, ink = cv2.threshold(probe, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+        count, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+        if count <= 1:
+            return None
+
+        heights = stats[1:, cv2.CC_STAT_HEIGHT]
+        widths = stats[1:, cv2.CC_STAT_WIDTH]
+        areas = stats[1:, cv2.CC_STAT_AREA]
+        # Glyph-like components: not specks, not rules, lines or images
+        glyphs = heights[
+            (heights >= 2) & (areas >= 3)
+            & (heights < probe.shape[0] * 0.05) & (widths < heights * 8)
+        ]
+        if glyphs.size < self.MIN_COMPONENTS:
+            return None
+        return float(np.median(glyphs)) / probe_scale
+
+    def scale_for(self, gray: np.ndarray) -> float:
+        """Resize factor that brings the page's text to the target height (1.0 = leave as is)."""
+        text_height = self.measure_text_height(gray)
+        if not text_height:
+            return 1.0
+        scale = min(max(self.target_text_height / text_height, self.MIN_SCALE), self.MAX_SCALE)
+        return 1.0 if abs(scale - 1.0) <= self.RESCALE_TOLERANCE else scale
+
+    def preprocess(self, gray: np.ndarray) -> np.ndarray:
+        """Normalize, blur and binarize a grayscale page; returns a new binary image."""
+        return self.preprocess_scaled(gray)[0]
+
+    def preprocess_scaled(self, gray: np.ndarray) -> Tuple[np.ndarray, float]:
+        """
+        Like preprocess(), but also return the resize factor that was applied.
+
+        The page's effective resolution is its source DPI times that factor;
+        Tesseract should be told it, since it sizes its heuristics by DPI.
+        """
+        scale = self.scale_for(gray)
+        if scale != 1.0:
+            height, width = gray.shape[:2]
+            size = (max(int(round(width * scale)), 1), max(int(round(height * scale)), 1))
+            if scale >= 1.0:
+                interpolation = cv2.INTER_CUBIC
+            elif scale >= 0.5:
+                # Bilinear does not alias above 2:1 and is several times cheaper than INTER_AREA
+                interpolation = cv2.INTER_LINEAR
+            else:
+                interpolation = cv2.INTER_AREA
+            gray = cv2.resize(gray, size, dst=self._buffer("resized", size[::-1]), interpolation=interpolation)
+
+        # Reduce noise before thresholding
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0, dst=self._buffer("blurred", gray.shape))
+
+        # Local Gaussian mean minus the offset (uint8 subtraction saturates at 0)
+        block = (self.THRESHOLD_BLOCK, self.THRESHOLD_BLOCK)
+        local = cv2.GaussianBlur(
+            blurred, block, 0, dst=self._buffer("local", blurred.shape), borderType=cv2.BORDER_REPLICATE
+        )
+        cv2.subtract(local, self.THRESHOLD_OFFSET, dst=local)
+
+        # The result outlives this call (it goes to Tesseract), so it is not pooled
+        binary = cv2.compare(blurred, local, cv2.CMP_GT)
+
+        if self._kernel is not None:
+            cv2.morphologyEx(binary, cv2.MORPH_CLOSE, self._kernel, dst=binary)
+            cv2.morphologyEx(binary, cv2.MORPH_OPEN, self._kernel, dst=binary)
+
+        return binary, scale
@@ -0,0 +1,425 @@
+"""
+Job Queue Module
+Persistent priority queue for long-running document analysis jobs
+"""
+
+import os
+import json
+import time
+import uuid
+import shutil
+import asyncio
+import sqlite3
+import threading
+import urllib.request
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from worker_pool import StageSaturatedError
+
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+TERMINAL_STATES = (COMPLETED, FAILED)
+
+# Called as report(stage, **details) from any thread
+ProgressCallback = Callable[..., None]
+
+
+class JobStore:
+    """
+    SQLite-backed job table.
+
+    Jobs are claimed highest priority first, then oldest first. The
+    connection is shared between the event loop and worker threads, so
+    every statement runs under a lock.
+    """
+
+    def __init__(self, db_path: str):
+        """Open (or create) the job database."""
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                file_name TEXT NOT NULL,
+                file_type TEXT NOT NULL,
+                is_pdf INTEGER NOT NULL,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                document_path TEXT,
+                webhook_url TEXT,
+                progress TEXT,
+                result TEXT,
+                error TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+            """
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS idx_jobs_queue ON jobs (status, priority DESC, created_at)"
+        )
+        self._db.commit()
+
+    def create(self, job: Dict[str, Any]):
+        """Insert a new queued job."""
+        with self._lock:
+            self._db.execute(
+                """
+                INSERT INTO jobs (id, status, priority, file_name, file_type, is_pdf, digest,
+                                  size, document_path, webhook_url, progress, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    job["id"], QUEUED, job["priority"], job["file_name"], job["file_type"],
+                    int(job["is_pdf"]), job["digest"], job["size"], job["document_path"],
+                    job.get("webhook_url"), json.dumps({"stage": QUEUED}), time.time()
+                )
+            )
+            self._db.commit()
+
+    def claim_next(self) -> Optional[Dict[str, Any]]:
+        """Mark the next queued job as running and return it."""
+        with self._lock:
+            row = self._db.execute(
+                """
+                SELECT * FROM jobs WHERE status = ?
+                ORDER BY priority DESC, created_at ASC LIMIT 1
+                """,
+                (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, time.time(), row["id"])
+            )
+            self._db.commit()
+            job = dict(row)
+            job["status"] = RUNNING
+            return job
+
+    def requeue(self, job_id: str):
+        """Put a job back in the queue (e.g. when the pipeline is saturated)."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress = ? WHERE id = ?",
+                (QUEUED, json.dumps({"stage": QUEUED}), job_id)
+            )
+            self._db.commit()
+
+    def requeue_running(self) -> int:
+        """Requeue jobs left running by a previous process; returns how many."""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, progress = ? WHERE status = ?",
+                (QUEUED, json.dumps({"stage": QUEUED}), RUNNING)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def set_progress(self, job_id: str, progress: Dict[str, Any]):
+        """Record the latest progress event for a job."""
+        with self._lock:
+            self._db.execute(
+                "UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id)
+            )
+            self._db.commit()
+
+    def finish(self, job_id: str, status: str, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None):
+        """Mark a job completed or failed and release its document."""
+        with self._lock:
+            self._db.execute(
+                """
+                UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?,
+                                progress = ?, document_path = NULL
+                WHERE id = ?
+                """,
+                (
+                    status, json.dumps(result) if result is not None else None, error,
+                    time.time(), json.dumps({"stage": status}), job_id
+                )
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return a job row as a dict, or None."""
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def queue_position(self, job: Dict[str, Any]) -> int:
+        """Number of queued jobs that will be claimed before this one."""
+        with self._lock:
+            return self._db.execute(
+                """
+                SELECT COUNT(*) FROM jobs WHERE status = ? AND
+                    (priority > ? OR (priority = ? AND created_at < ?))
+                """,
+                (QUEUED, job["priority"], job["priority"], job["created_at"])
+            ).fetchone()[0]
+
+    def counts(self) -> Dict[str, int]:
+        """Return the number of jobs in each state."""
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, COMPLETED: 0, FAILED: 0}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+    def purge(self, older_than: float) -> List[str]:
+        """Delete finished jobs older than a timestamp; returns leftover document paths."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT document_path FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (older_than,)
+            ).fetchall()
+            self._db.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (older_than,)
+            )
+            self._db.commit()
+        return [row[0] for row in rows if row[0]]
+
+    def close(self):
+        """Close the database connection."""
+        with self._lock:
+            self._db.close()
+
+
+class JobQueue:
+    """
+    Runs analysis jobs in the background with bounded concurrency.
+
+    - Uploaded documents are moved into JOBS_DIR and jobs are recorded in
+      SQLite (JOBS_DB), so queued work survives a restart; jobs that were
+      running when the process stopped are requeued on start.
+    - JOB_WORKERS jobs run at once, highest priority first.
+    - JOB_QUEUE_LIMIT bounds the number of queued jobs (HTTP 429 beyond it).
+    - Progress reported by the pipeline is persisted and fanned out to
+      subscribers (the SSE endpoint); an optional webhook receives the
+      final job payload.
+    """
+
+    def __init__(self, runner: Callable[[Dict[str, Any], ProgressCallback], Awaitable[Dict[str, Any]]],
+                 jobs_dir: Optional[str] = None, workers: Optional[int] = None,
+                 queue_limit: Optional[int] = None):
+        """Configure the queue from arguments or environment."""
+        self.runner = runner
+        self.jobs_dir = jobs_dir or os.getenv('JOBS_DIR', 'jobs')
+        self.db_path = os.getenv('JOBS_DB', os.path.join(self.jobs_dir, 'jobs.db'))
+        self.workers = workers or max(int(os.getenv('JOB_WORKERS', 2)), 1)
+        self.queue_limit = queue_limit or max(int(os.getenv('JOB_QUEUE_LIMIT', 100)), 1)
+        self.retention_seconds = float(os.getenv('JOB_RETENTION_SECONDS', 7 * 24 * 3600))
+        self.webhook_timeout = float(os.getenv('JOB_WEBHOOK_TIMEOUT', 10))
+
+        self.store: Optional[JobStore] = None
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+
+    async def start(self):
+        """Open the store, recover interrupted jobs and start the workers."""
+        if self._tasks:
+            return
+        os.makedirs(self.jobs_dir, exist_ok=True)
+        self.store = await asyncio.to_thread(JobStore, self.db_path)
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+
+        recovered = await asyncio.to_thread(self.store.requeue_running)
+        if recovered:
+            print(f"[JOBS] Requeued {recovered} interrupted job(s)")
+        await asyncio.to_thread(self._purge_expired)
+
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"job-worker-{i}")
+            for i in range(self.workers)
+        ]
+        self._wakeup.set()
+
+    async def stop(self):
+        """Stop the workers; running jobs are requeued on the next start."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self.store is not None:
+            self.store.close()
+            self.store = None
+
+    async def submit(self, document_path: str, file_name: str, file_type: str, is_pdf: bool,
+                     digest: str, size: int, priority: int = 0,
+                     webhook_url: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Queue a spooled document for analysis, taking ownership of the file.
+
+        Raises:
+            StageSaturatedError: (HTTP 429) if the queue is full
+        """
+        counts = await asyncio.to_thread(self.store.counts)
+        if counts[QUEUED] >= self.queue_limit:
+            raise StageSaturatedError("jobs", status_code=429, retry_after=30)
+
+        job_id = uuid.uuid4().hex
+        stored_path = os.path.join(self.jobs_dir, job_id + os.path.splitext(file_name)[1].lower())
+        await asyncio.to_thread(shutil.move, document_path, stored_path)
+
+        await asyncio.to_thread(self.store.create, {
+            "id": job_id,
+            "priority": priority,
+            "file_name": file_name,
+            "file_type": file_type,
+            "is_pdf": is_pdf,
+            "digest": digest,
+            "size": size,
+            "document_path": stored_path,
+            "webhook_url": webhook_url
+        })
+        self._wakeup.set()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Return the public view of a job, or None if unknown."""
+        job = await asyncio.to_thread(self.store.get, job_id)
+        if job is None:
+            return None
+        view = self._public_view(job)
+        if job["status"] == QUEUED:
+            view["queuePosition"] = await asyncio.to_thread(self.store.queue_position, job)
+        return view
+
+    def subscribe(self, job_id: str) -> asyncio.Queue:
+        """Receive progress events for a job (call from the event loop)."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(job_id, []).append(queue)
+        return queue
+
+    def unsubscribe(self, job_id: str, queue: asyncio.Queue):
+        """Stop receiving progress events."""
+        queues = self._subscribers.get(job_id, [])
+        if queue in queues:
+            queues.remove(queue)
+        if not queues:
+            self._subscribers.pop(job_id, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue configuration and job counts."""
+        return {
+            "workers": self.workers,
+            "queueLimit": self.queue_limit,
+            "jobs": self.store.counts() if self.store is not None else None
+        }
+
+    def _reporter(self, job_id: str) -> ProgressCallback:
+        """Build a thread-safe progress callback for one job."""
+        def report(stage: str, **details: Any):
+            progress = {"stage": stage, **details, "updatedAt": time.time()}
+            self.store.set_progress(job_id, progress)
+            self._loop.call_soon_threadsafe(self._publish, job_id, {"status": RUNNING, "progress": progress})
+        return report
+
+    def _publish(self, job_id: str, event: Dict[str, Any]):
+        """Deliver an event to the job's subscribers (event loop only)."""
+        for queue in self._subscribers.get(job_id, []):
+            queue.put_nowait(event)
+
+    async def _worker(self):
+        """Claim and run jobs until cancelled."""
+        while True:
+            job = await asyncio.to_thread(self.store.claim_next)
+            if job is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            # Let other idle workers look for more work
+            self._wakeup.set()
+            await self._run(job)
+
+    async def _run(self, job: Dict[str, Any]):
+        """Run one job and record its outcome."""
+        job_id = job["id"]
+        print(f"[JOBS] Running job {job_id} ({job['file_name']})")
+
+        try:
+            result = await self.runner(job, self._reporter(job_id))
+        except StageSaturatedError as e:
+            # The pipeline is busy with synchronous requests; try again later
+            await asyncio.sleep(e.retry_after)
+            await asyncio.to_thread(self.store.requeue, job_id)
+            self._wakeup.set()
+            return
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[JOBS] Job {job_id} failed: {e}")
+            await self._finish(job, FAILED, error=str(e))
+            return
+
+        await self._finish(job, COMPLETED, result=result)
+
+    async def _finish(self, job: Dict[str, Any], status: str,
+                      result: Optional[Dict[str, Any]] = None, error: Optional[str] = None):
+        """Persist the outcome, drop the stored document and notify listeners."""
+        await asyncio.to_thread(self.store.finish, job["id"], status, result, error)
+        if job.get("document_path") and os.path.exists(job["document_path"]):
+            await asyncio.to_thread(os.remove, job["document_path"])
+
+        view = await self.get(job["id"])
+        self._publish(job["id"], view)
+
+        if job.get("webhook_url"):
+            await asyncio.to_thread(self._post_webhook, job["webhook_url"], view)
+
+    def _post_webhook(self, url: str, payload: Dict[str, Any]):
+        """POST the final job payload to a webhook, ignoring failures."""
+        try:
+            request = urllib.request.Request(
+                url,
+                data=json.dumps(payload).encode("utf-8"),
+                headers={"Content-Type": "application/json"},
+                method="POST"
+            )
+            with urllib.request.urlopen(request, timeout=self.webhook_timeout):
+                pass
+        except Exception as e:
+            print(f"WARNING: Webhook delivery to {url} failed: {e}")
+
+    def _purge_expired(self):
+        """Delete finished jobs past the retention period."""
+        for path in self.store.purge(time.time() - self.retention_seconds):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def _public_view(job: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a job row into the API representation."""
+        return {
+            "jobId": job["id"],
+            "status": job["status"],
+            "priority": job["priority"],
+            "fileName": job["file_name"],
+            "fileType": job["file_type"],
+            "progress": json.loads(job["progress"]) if job["progress"] else None,
+            "result": json.loads(job["result"]) if job["result"] else None,
+            "error": job["error"],
+            "attempts": job["attempts"],
+            "createdAt": job["created_at"],
+            "startedAt": job["started_at"],
+            "finishedAt": job["finished_at"]
+        }
@@ -0,0 +1,349 @@
+"""
+JSON Stream Module
+Incremental parsing of streamed LLM JSON into analysis sections
+"""
+
+import re
+import json
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Called as on_section(section, value, source) when a section of the
+# analysis is known; source names who produced it (local, openai, gemini,
+# cache). For an item of a streamed list section it is called as
+# on_section(section, item, source, index) before the whole list is known.
+SectionCallback = Callable[..., None]
+
+# Top-level AnalysisResult fields reported as sections
+SECTIONS = (
+    "summary", "documentType", "parties", "dates", "clauses", "keyTerms",
+    "obligations", "penalties", "overallRiskScore", "recommendations", "expertSuggestions"
+)
+
+# List sections whose items are reported one by one while streaming
+ITEM_SECTIONS = ("clauses", "obligations")
+
+# Values for sections a truncated response never reached
+_SECTION_DEFAULTS = {
+    "summary": "", "documentType": "Legal Document", "parties": [], "dates": {}, "clauses": [],
+    "keyTerms": [], "obligations": [], "penalties": [], "recommendations": []
+}
+
+_WHITESPACE = " \t\r\n"
+
+# New text containing one of these may complete a pending value
+_CLOSERS = frozenset('}]",')
+
+# LLMs put raw newlines and tabs inside strings; strict=False accepts them
+_DECODER = json.JSONDecoder(strict=False)
+
+_SCALAR = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null")
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+
+
+class ParseEvent(NamedTuple):
+    """A completed top-level field (index None) or one item of a streamed list field."""
+    key: str
+    value: Any
+    index: Optional[int] = None
+
+
+class TopLevelFieldParser:
+    """
+    Parses a JSON object that arrives in pieces, field by field.
+
+    feed() returns a ParseEvent for each top-level field completed by the
+    new text. Lists named in item_fields are decoded item by item instead:
+    every item gets an event with its index as soon as it closes, and the
+    whole list follows when the list does. Values are decoded with
+    json.JSONDecoder.raw_decode as soon as they are whole; a pending value
+    is only retried when the new text holds a character that could have
+    closed it. Anything before the opening brace (a ```json fence, a
+    sentence of preamble) is skipped, and consumed text is dropped from
+    the buffer.
+    """
+
+    def __init__(self, item_fields: Iterable[str] = ()):
+        self.item_fields = frozenset(item_fields)
+        self._buffer = ""
+        self._pos = -1  # index just past the last consumed token; -1 until '{' is seen
+        self._closed = False
+        self._list: Optional[Tuple[str, List[Any]]] = None  # streamed list being read
+
+    @property
+    def closed(self) -> bool:
+        """Whether the closing brace of the object has been seen."""
+        return self._closed
+
+    def _skip(self, pos: int, characters: str) -> int:
+        while pos < len(self._buffer) and self._buffer[pos] in characters:
+            pos += 1
+        return pos
+
+    def feed(self, text: str) -> List[ParseEvent]:
+        if self._closed or not text:
+            return []
+        if self._pos > 0:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        self._buffer += text
+
+        if self._pos < 0:
+            start = self._buffer.find("{")
+            if start < 0:
+                return []
+            self._pos = start + 1
+        elif not _CLOSERS.intersection(text):
+            # Nothing that could end the pending key or value arrived
+            return []
+
+        events = []
+        while True:
+            event = self._next_item() if self._list is not None else self._next_field()
+            if event is None:
+                break
+            events.append(event)
+        return events
+
+    def _decode(self, pos: int) -> Optional[Tuple[Any, int]]:
+        """Decode the value at pos if it is complete."""
+        try:
+            value, end = _DECODER.raw_decode(self._buffer, pos)
+        except json.JSONDecodeError:
+            return None
+        if end >= len(self._buffer) and not isinstance(value, (dict, list, str)):
+            # A number or literal at the very end may still be growing ("5" of "55")
+            return None
+        return value, end
+
+    def _next_field(self) -> Optional[ParseEvent]:
+        """Consume one complete field at the current position, if there is one."""
+        buffer = self._buffer
+        pos = self._skip(self._pos, _WHITESPACE + ",")
+        if pos >= len(buffer):
+            return None
+        if buffer[pos] == "}":
+            self._closed = True
+            self._pos = pos + 1
+            return None
+        try:
+            key, pos = _DECODER.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            return None
+        pos = self._skip(pos, _WHITESPACE)
+        if pos >= len(buffer) or buffer[pos] != ":":
+            return None
+        pos = self._skip(pos + 1, _WHITESPACE)
+        if pos >= len(buffer):
+            return None
+
+        if key in self.item_fields and buffer[pos] == "[":
+            self._list = (key, [])
+            self._pos = pos + 1
+            return self._next_item()
+        decoded = self._decode(pos)
+        if decoded is None:
+            return None
+        value, self._pos = decoded
+        return ParseEvent(key, value)
+
+    def _next_item(self) -> Optional[ParseEvent]:
+        """Consume one complete item of the streamed list, or the list's closing bracket."""
+        key, items = self._list
+        pos = self._skip(self._pos, _WHITESPACE + ",")
+        if pos >= len(self._buffer):
+            return None
+        if self._buffer[pos] == "]":
+            self._list = None
+            self._pos = pos + 1
+            return ParseEvent(key, items)
+        decoded = self._decode(pos)
+        if decoded is None:
+            return None
+        value, self._pos = decoded
+        items.append(value)
+        return ParseEvent(key, value, len(items) - 1)
+
+
+class LLMSectionStream:
+    """
+    Turns streamed LLM text into section callbacks.
+
+    Pass an instance as an LLM provider's on_delta(delta, attempt). Fields
+    of the streamed JSON that are analysis sections are reported once
+    complete, and items of ITEM_SECTIONS as each one closes; a new attempt
+    (after a retry) starts a fresh parse, so a section can be reported
+    again with the retried value.
+    """
+
+    def __init__(self, on_section: SectionCallback, source: str):
+        self.on_section = on_section
+        self.source = source
+        self._attempt = 0
+        self._parser = TopLevelFieldParser(ITEM_SECTIONS)
+
+    def __call__(self, delta: str, attempt: int):
+        if attempt != self._attempt:
+            self._attempt = attempt
+            self._parser = TopLevelFieldParser(ITEM_SECTIONS)
+        for key, value, index in self._parser.feed(delta):
+            if key not in SECTIONS:
+                continue
+            if index is None:
+                self.on_section(key, value, self.source)
+            else:
+                self.on_section(key, value, self.source, index)
+
+
+def emit_sections(on_section: Optional[SectionCallback], analysis: dict, source: str):
+    """Report every section of a finished analysis."""
+    if on_section is None:
+        return
+    for section in SECTIONS:
+        if section in analysis:
+            on_section(section, analysis[section], source)
+
+
+def recover_json(text: str) -> Tuple[Optional[Any], bool]:
+    """
+    Parse the JSON object in an LLM response, salvaging what it can.
+
+    Returns (value, complete). Text around the object (```json fences,
+    preamble, trailing remarks) is ignored. Trailing commas are dropped.
+    When the object is cut off (the response hit its token limit) or turns
+    malformed part way, value holds everything up to the last complete
+    value: finished top-level fields, plus the finished items of a list
+    that was still open. Objects nested below the top level are kept only
+    when whole, so every recovered clause or obligation is complete.
+    value is None when nothing before the damage can be recovered.
+    """
+    start = text.find("{")
+    if start < 0:
+        return None, False
+    try:
+        return _DECODER.raw_decode(text, start)[0], True
+    except json.JSONDecodeError:
+        pass
+
+    stack: List[str] = []   # open containers, '{' or '['
+    states: List[str] = []  # what each container expects next: key, colon, value or comma
+    dropped: List[int] = []  # positions of trailing commas
+    last_comma: Optional[int] = None
+    cut: Optional[Tuple[int, Tuple[str, ...]]] = None  # end of the last complete value, open containers there
+    complete_at: Optional[int] = None
+
+    def cut_here(end: int) -> Optional[Tuple[int, Tuple[str, ...]]]:
+        # Only cut where every open container below the root is a list
+        if all(container == "[" for container in stack[1:]):
+            return end, tuple(stack)
+        return cut
+
+    position = start
+    length = len(text)
+    while position < length:
+        character = text[position]
+        if character in _WHITESPACE:
+            position += 1
+            continue
+        state = states[-1] if states else "value"
+
+        if character in "{[":
+            if state != "value":
+                break
+            if states:
+                states[-1] = "comma"
+            stack.append(character)
+            states.append("key" if character == "{" else "value")
+            last_comma = None
+            cut = cut_here(position + 1)
+            position += 1
+        elif character in "}]":
+            if not stack or character != ("}" if stack[-1] == "{" else "]"):
+                break
+            if state in ("key", "value") and last_comma is not None:
+                dropped.append(last_comma)
+            elif state not in ("comma", "key", "value") or (stack[-1] == "{" and state == "value"):
+                break
+            stack.pop()
+            states.pop()
+            last_comma = None
+            position += 1
+            if not stack:
+                complete_at = position
+                break
+            cut = cut_here(position)
+        elif character == '"':
+            match = _STRING.match(text, position)
+            if match is None:
+                # Unterminated string
+                break
+            last_comma = None
+            if state == "key":
+                states[-1] = "colon"
+            elif state == "value":
+                states[-1] = "comma"
+                cut = cut_here(match.end())
+            else:
+                break
+            position = match.end()
+        elif character == ":":
+            if state != "colon":
+                break
+            states[-1] = "value"
+            position += 1
+        elif character == ",":
+            if state != "comma":
+                break
+            states[-1] = "key" if stack[-1] == "{" else "value"
+            last_comma = position
+            position += 1
+        else:
+            match = _SCALAR.match(text, position)
+            if match is None or state != "value" or match.end() >= length:
+                # Malformed, or a number that may have been cut short
+                break
+            states[-1] = "comma"
+            last_comma = None
+            position = match.end()
+            cut = cut_here(position)
+
+    if complete_at is not None:
+        end, closers = complete_at, ""
+    elif cut is not None:
+        end, closers = cut[0], "".join("}" if c == "{" else "]" for c in reversed(cut[1]))
+    else:
+        return None, False
+
+    pieces = []
+    previous = start
+    for comma in dropped:
+        if comma < end:
+            pieces.append(text[previous:comma])
+            previous = comma + 1
+    pieces.append(text[previous:end])
+    try:
+        value = _DECODER.decode("".join(pieces) + closers)
+    except json.JSONDecodeError:
+        return None, False
+    return value, complete_at is not None
+
+
+def fill_missing_sections(analysis: Dict[str, Any]) -> List[str]:
+    """
+    Give a partially recovered analysis every required section.
+
+    Missing lists become empty, and a missing overallRiskScore is estimated
+    from the recovered clauses (base 30, +8 per high-risk and +4 per
+    medium-risk clause, as local analysis weighs them). Returns the names
+    of the sections that were filled in.
+    """
+    missing = []
+    for section, default in _SECTION_DEFAULTS.items():
+        if not isinstance(analysis.get(section), type(default)):
+            analysis[section] = type(default)(default)
+            missing.append(section)
+    if not isinstance(analysis.get("overallRiskScore"), (int, float)):
+        levels = [clause.get("riskLevel") for clause in analysis["clauses"] if isinstance(clause, dict)]
+        score = 30 + 8 * levels.count("high") + 4 * levels.count("medium")
+        analysis["overallRiskScore"] = min(max(score, 10), 95)
+        missing.append("overallRiskScore")
+    return missing
@@ -0,0 +1,177 @@
+"""
+Lazy Initialization Module
+Deferred component construction, warm-up and startup timing for the AI service
+"""
+
+import time
+import threading
+import importlib.util
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+
+def module_available(name: str) -> bool:
+    """Return whether a module can be imported, without importing it."""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyComponent:
+    """
+    A component that is built on first use, exactly once, across threads.
+
+    An optional warm callable runs after construction during warm-up to
+    load anything the component itself defers (models, corpora, clients).
+    """
+
+    def __init__(self, name: str, factory: Callable[[], Any],
+                 warm: Optional[Callable[[Any], None]] = None, required: bool = True):
+        self.name = name
+        self.required = required
+        self._factory = factory
+        self._warm = warm
+        self._instance: Any = None
+        self._initialized = False
+        self._warmed = False
+        self._init_seconds: Optional[float] = None
+        self._warm_seconds: Optional[float] = None
+        self._error: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def initialized(self) -> bool:
+        """Whether the component has been constructed."""
+        return self._initialized
+
+    def get(self) -> Any:
+        """Return the component, constructing it on first call."""
+        if self._initialized:
+            return self._instance
+
+        with self._lock:
+            if not self._initialized:
+                start = time.perf_counter()
+                try:
+                    self._instance = self._factory()
+                except Exception as e:
+                    self._error = str(e)
+                    self._instance = None
+                    print(f"WARNING: Failed to initialize {self.name}: {e}")
+                self._init_seconds = time.perf_counter() - start
+                self._initialized = True
+            return self._instance
+
+    def get_if_ready(self) -> Any:
+        """Return the component if it has been constructed, else None."""
+        return self._instance if self._initialized else None
+
+    def warm_up(self):
+        """Construct the component and run its warm-up hook."""
+        instance = self.get()
+        if self._warm is None or instance is None or self._warmed:
+            self._warmed = True
+            return
+
+        start = time.perf_counter()
+        try:
+            self._warm(instance)
+        except Exception as e:
+            print(f"WARNING: Warm-up of {self.name} failed: {e}")
+        self._warm_seconds = time.perf_counter() - start
+        self._warmed = True
+
+    def status(self) -> Dict[str, Any]:
+        """Return initialization state and timings."""
+        return {
+            "initialized": self._initialized,
+            "warmed": self._warmed,
+            "required": self.required,
+            "initSeconds": round(self._init_seconds, 4) if self._init_seconds is not None else None,
+            "warmSeconds": round(self._warm_seconds, 4) if self._warm_seconds is not None else None,
+            "error": self._error
+        }
+
+
+class ComponentSet:
+    """The service's lazy components plus readiness tracking."""
+
+    def __init__(self):
+        self._components: Dict[str, LazyComponent] = {}
+        self._warm_up_thread: Optional[threading.Thread] = None
+        self._warm_up_enabled = False
+
+    def add(self, name: str, factory: Callable[[], Any],
+            warm: Optional[Callable[[Any], None]] = None, required: bool = True) -> LazyComponent:
+        """Register a component and return its lazy handle."""
+        component = LazyComponent(name, factory, warm=warm, required=required)
+        self._components[name] = component
+        return component
+
+    def warm_up(self):
+        """Initialize and warm every component, in registration order."""
+        for component in self._components.values():
+            component.warm_up()
+        print("SUCCESS: Warm-up complete")
+
+    def start_background_warm_up(self):
+        """Warm components on a daemon thread so the server can accept requests."""
+        self._warm_up_enabled = True
+        if self._warm_up_thread is None:
+            self._warm_up_thread = threading.Thread(
+                target=self.warm_up, name="warm-up", daemon=True
+            )
+            self._warm_up_thread.start()
+
+    def is_ready(self) -> bool:
+        """
+        Whether the service should receive traffic.
+
+        With background warm-up enabled, ready once every required component
+        is warmed. Without it, components initialize on demand, so the
+        service is always ready.
+        """
+        if not self._warm_up_enabled:
+            return True
+        return all(
+            c.status()["warmed"] for c in self._components.values() if c.required
+        )
+
+    def status(self) -> Dict[str, Any]:
+        """Return per-component status."""
+        return {name: c.status() for name, c in self._components.items()}
+
+
+class ImportBudget:
+    """Records module import times against a startup time budget."""
+
+    def __init__(self, budget_seconds: float):
+        self.budget_seconds = budget_seconds
+        self._started = time.perf_counter()
+        self._finished: Optional[float] = None
+        self._timings: List[Dict[str, Any]] = []
+
+    @contextmanager
+    def measure(self, name: str) -> Iterator[None]:
+        """Time the imports executed inside the block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._timings.append({"module": name, "seconds": round(time.perf_counter() - start, 4)})
+
+    def finish(self):
+        """Mark the end of module-level startup work."""
+        self._finished = time.perf_counter()
+
+    def report(self) -> Dict[str, Any]:
+        """Return import timings and whether startup stayed within budget."""
+        end = self._finished if self._finished is not None else time.perf_counter()
+        total = end - self._started
+        return {
+            "totalSeconds": round(total, 4),
+            "budgetSeconds": self.budget_seconds,
+            "withinBudget": total <= self.budget_seconds,
+            "imports": sorted(self._timings, key=lambda t: t["seconds"], reverse=True)
+        }
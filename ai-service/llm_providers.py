@@ -0,0 +1,591 @@
+"""
+LLM Providers Module
+Shared async clients for OpenAI and Gemini with deadlines, retries and circuit breakers
+"""
+
+import os
+import json
+import time
+import base64
+import hashlib
+import random
+import asyncio
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from lazy_init import module_available
+from rate_limiter import Coalescer, RateLimiter
+from metrics import LLM_QUEUE_WAIT_SECONDS, LLM_REQUEST_SECONDS
+
+OPENAI_AVAILABLE = module_available("openai")
+HTTPX_AVAILABLE = module_available("httpx")
+
+# Called as on_delta(text, attempt) for each streamed piece of a response;
+# attempt (1-based) changes when a retry starts the response over
+DeltaCallback = Callable[[str, int], None]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for rate limiting (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a positive float from the environment."""
+    try:
+        value = float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+class ProviderError(Exception):
+    """A provider call failed."""
+
+    def __init__(self, provider: str, message: str, retryable: bool = False,
+                 retry_after: Optional[float] = None):
+        super().__init__(f"{provider}: {message}")
+        self.provider = provider
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class ProviderUnavailableError(ProviderError):
+    """The provider is not configured, or its circuit breaker is open."""
+
+    def __init__(self, provider: str, message: str):
+        super().__init__(provider, message, retryable=False)
+
+
+class CircuitBreaker:
+    """
+    Classic closed / open / half-open breaker.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    are rejected without touching the network. After reset_timeout one trial
+    call is let through: success closes the circuit, failure reopens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._rejected = 0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed (reserving the half-open trial)."""
+        with self._lock:
+            if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+
+            self._rejected += 1
+            return False
+
+    def is_open(self) -> bool:
+        """Return whether calls are currently being short-circuited."""
+        with self._lock:
+            return self.state == self.OPEN and time.monotonic() - self._opened_at < self.reset_timeout
+
+    def record_success(self):
+        """Close the circuit."""
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def release(self):
+        """Give back a half-open trial slot without recording an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Count a failure, opening the circuit at the threshold."""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    print(f"WARNING: {self.name} circuit opened after {self._failures} failure(s)")
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Return breaker state and counters."""
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutiveFailures": self._failures,
+                "rejected": self._rejected
+            }
+
+
+class RetryPolicy:
+    """
+    Jittered exponential backoff within an overall deadline.
+
+    Each attempt gets the time left until the deadline; sleeps use "full
+    jitter" (uniform between 0 and the capped exponential delay), or the
+    provider's Retry-After when it asks for longer.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.5,
+                 max_delay: float = 8.0, deadline: float = 90.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        """Build a policy from LLM_* environment variables."""
+        return cls(
+            max_attempts=max(int(_env_float("LLM_MAX_ATTEMPTS", 3)), 1),
+            base_delay=_env_float("LLM_BACKOFF_BASE", 0.5),
+            max_delay=_env_float("LLM_BACKOFF_MAX", 8.0),
+            deadline=_env_float("LLM_DEADLINE_SECONDS", 90.0)
+        )
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Delay before retry number `attempt` (1-based)."""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if retry_after:
+            delay = max(delay, min(retry_after, self.max_delay))
+        return delay
+
+    async def run(self, provider: str, call: Callable[[], Awaitable[Any]],
+                  deadline: Optional[float] = None) -> Any:
+        """Run call() with retries until it succeeds, fails permanently or time runs out."""
+        budget = deadline if deadline is not None else self.deadline
+        ends_at = time.monotonic() + budget
+        attempt = 0
+
+        while True:
+            attempt += 1
+            remaining = ends_at - time.monotonic()
+            if remaining <= 0:
+                raise ProviderError(provider, f"deadline of {budget:.1f}s exceeded")
+
+            try:
+                return await asyncio.wait_for(call(), timeout=remaining)
+            except asyncio.TimeoutError:
+                raise ProviderError(provider, f"deadline of {budget:.1f}s exceeded")
+            except ProviderError as e:
+                if not e.retryable or attempt >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt, e.retry_after)
+                if time.monotonic() + delay >= ends_at:
+                    raise
+                print(f"WARNING: {provider} attempt {attempt} failed ({e}), retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+
+
+class _Provider:
+    """Shared breaker/retry/rate-limit bookkeeping for a provider."""
+
+    name = "provider"
+
+    # Default <NAME>_RPM / <NAME>_TPM limits
+    DEFAULT_RPM = 0
+    DEFAULT_TPM = 0
+
+    # Tokens assumed for a response when reserving rate-limit capacity
+    RESPONSE_TOKENS = 1500
+
+    def __init__(self, retry: RetryPolicy, breaker: CircuitBreaker):
+        self.retry = retry
+        self.breaker = breaker
+        self.limiter = RateLimiter.from_env(self.name, self.DEFAULT_RPM, self.DEFAULT_TPM)
+        self.coalescer = Coalescer()
+        self.max_connections = max(int(_env_float("LLM_MAX_CONNECTIONS", 20)), 1)
+        self._calls = 0
+        self._failures = 0
+
+    @property
+    def enabled(self) -> bool:
+        """Whether the provider is configured (subclasses override this)."""
+        return False
+
+    def available(self) -> bool:
+        """Whether a call would be attempted right now."""
+        return self.enabled and not self.breaker.is_open()
+
+    async def _guarded(self, call: Callable[[], Awaitable[Any]], deadline: Optional[float] = None,
+                       tokens: int = 0, fairness_key: str = "",
+                       coalesce_key: Optional[str] = None) -> Any:
+        """
+        Run a call through coalescing, the circuit breaker, the retry policy
+        and the rate limiter.
+
+        Concurrent calls with the same coalesce_key share one upstream
+        request. Every attempt waits its turn in the rate limiter's fair
+        queue (keyed by fairness_key) for one request and `tokens` tokens;
+        that wait counts against the deadline.
+        """
+        if not self.enabled:
+            raise ProviderUnavailableError(self.name, "not configured")
+        return await self.coalescer.run(
+            coalesce_key, lambda: self._call_upstream(call, deadline, tokens, fairness_key)
+        )
+
+    async def _call_upstream(self, call: Callable[[], Awaitable[Any]], deadline: Optional[float],
+                             tokens: int, fairness_key: str) -> Any:
+        """One logical upstream call, with retries."""
+        if not self.breaker.allow():
+            raise ProviderUnavailableError(self.name, "circuit open")
+
+        async def limited() -> Any:
+            waited = await self.limiter.acquire(tokens + self.RESPONSE_TOKENS, fairness_key)
+            LLM_QUEUE_WAIT_SECONDS.observe(waited, provider=self.name)
+            try:
+                return await call()
+            except ProviderError as e:
+                if e.retry_after is not None:
+                    # Hold everyone back, not just this caller
+                    self.limiter.throttle(e.retry_after or 1.0)
+                raise
+
+        self._calls += 1
+        started = time.perf_counter()
+        try:
+            result = await self.retry.run(self.name, limited, deadline)
+        except asyncio.CancelledError:
+            # A cancelled call says nothing about provider health
+            self.breaker.release()
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=self.name, outcome="cancelled")
+            raise
+        except Exception:
+            self._failures += 1
+            self.breaker.record_failure()
+            LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=self.name, outcome="error")
+            raise
+        self.breaker.record_success()
+        LLM_REQUEST_SECONDS.observe(time.perf_counter() - started, provider=self.name, outcome="success")
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """Return call counters, breaker state, rate limiting and coalescing."""
+        return {
+            "enabled": self.enabled,
+            "calls": self._calls,
+            "failures": self._failures,
+            "circuit": self.breaker.stats(),
+            "rateLimit": self.limiter.stats(),
+            "coalescing": self.coalescer.stats()
+        }
+
+
+class OpenAIProvider(_Provider):
+    """Chat completions through a pooled AsyncOpenAI client (OPENAI_BASE_URL to override)."""
+
+    name = "openai"
+
+    DEFAULT_RPM = 500
+    DEFAULT_TPM = 200000
+
+    def __init__(self, retry: RetryPolicy, breaker: CircuitBreaker):
+        super().__init__(retry, breaker)
+        api_key = os.getenv("OPENAI_API_KEY")
+        self.api_key = api_key if api_key and not api_key.startswith("YOUR_") else None
+        self.base_url = os.getenv("OPENAI_BASE_URL") or None
+        self._client = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(OPENAI_AVAILABLE and self.api_key)
+
+    def _get_client(self):
+        """Create the AsyncOpenAI client on first use."""
+        if self._client is None:
+            import httpx
+            import openai
+
+            http_client = openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+            # Retries and deadlines are handled by RetryPolicy
+            self._client = openai.AsyncOpenAI(
+                api_key=self.api_key,
+                base_url=self.base_url,
+                http_client=http_client,
+                max_retries=0
+            )
+        return self._client
+
+    async def chat(self, model: str, messages: List[Dict[str, str]],
+                   deadline: Optional[float] = None, fairness_key: str = "",
+                   on_delta: Optional[DeltaCallback] = None, **params: Any) -> str:
+        """
+        Return the content of a chat completion.
+
+        Identical concurrent requests (same model, messages and parameters)
+        are coalesced; fairness_key groups calls for fair queueing (e.g. all
+        chunks of one document). With on_delta the completion is streamed
+        and each piece is passed to it as it arrives; streamed calls are
+        not coalesced.
+        """
+        import openai
+
+        request_key = hashlib.sha256(
+            json.dumps([model, messages, params], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        tokens = sum(estimate_tokens(message.get("content", "")) for message in messages)
+        attempts = 0
+
+        async def call() -> str:
+            nonlocal attempts
+            attempts += 1
+            try:
+                if on_delta is None:
+                    response = await self._get_client().chat.completions.create(
+                        model=model, messages=messages, **params
+                    )
+                    return response.choices[0].message.content
+
+                stream = await self._get_client().chat.completions.create(
+                    model=model, messages=messages, stream=True, **params
+                )
+                pieces = []
+                async for event in stream:
+                    delta = event.choices[0].delta.content if event.choices else None
+                    if delta:
+                        pieces.append(delta)
+                        on_delta(delta, attempts)
+                return "".join(pieces)
+            except (openai.APITimeoutError, openai.APIConnectionError) as e:
+                raise ProviderError(self.name, str(e), retryable=True)
+            except openai.APIStatusError as e:
+                retryable = e.status_code == 429 or e.status_code >= 500
+                retry_after = _retry_after(e.response.headers if e.response is not None else {})
+                raise ProviderError(self.name, str(e), retryable=retryable, retry_after=retry_after)
+
+        return await self._guarded(
+            call, deadline, tokens=tokens,
+            fairness_key=fairness_key or request_key,
+            coalesce_key=request_key if on_delta is None else None
+        )
+
+    async def aclose(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.close()
+            self._client = None
+
+
+class GeminiProvider(_Provider):
+    """
+    Gemini generateContent over a pooled async HTTP client.
+
+    Talks to the REST API directly (GEMINI_BASE_URL to override) so
+    connection reuse, timeouts and retries are under our control.
+    """
+
+    name = "gemini"
+
+    DEFAULT_RPM = 150
+    DEFAULT_TPM = 2000000
+
+    # Gemini bills roughly this many tokens per PDF page
+    TOKENS_PER_PDF_PAGE = 258
+
+    DEFAULT_BASE_URL = "https://generativelanguage.googleapis.com"
+
+    def __init__(self, retry: RetryPolicy, breaker: CircuitBreaker):
+        super().__init__(retry, breaker)
+        self.api_key = os.getenv("GEMINI_API_KEY") or None
+        self.base_url = (os.getenv("GEMINI_BASE_URL") or self.DEFAULT_BASE_URL).rstrip("/")
+        self._client = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(HTTPX_AVAILABLE and self.api_key)
+
+    def _get_client(self):
+        """Create the HTTP client on first use."""
+        if self._client is None:
+            import httpx
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=httpx.Timeout(self.retry.deadline, connect=10.0)
+            )
+        return self._client
+
+    async def generate(self, model: str, prompt: str, inline_data: Optional[bytes] = None,
+                       mime_type: str = "application/pdf", deadline: Optional[float] = None,
+                       content_digest: Optional[str] = None,
+                       on_delta: Optional[DeltaCallback] = None) -> str:
+        """
+        Return the text of a generateContent response.
+
+        Identical concurrent requests (same model, prompt and inline data,
+        identified by content_digest when the caller already has one) are
+        coalesced into one upstream call. With on_delta the response is
+        streamed (streamGenerateContent over SSE) and each piece of text is
+        passed to it as it arrives; streamed calls are not coalesced.
+        """
+        import httpx
+
+        if inline_data is not None and content_digest is None:
+            content_digest = await asyncio.to_thread(lambda: hashlib.sha256(inline_data).hexdigest())
+        request_key = hashlib.sha256(
+            f"{model}\0{prompt}\0{mime_type}\0{content_digest or ''}".encode("utf-8")
+        ).hexdigest()
+
+        tokens = estimate_tokens(prompt)
+        if inline_data is not None:
+            # Page count is unknown here; assume ~50 KB per page
+            tokens += max(len(inline_data) // 50000, 1) * self.TOKENS_PER_PDF_PAGE
+
+        parts: List[Dict[str, Any]] = []
+        if inline_data is not None:
+            parts.append({
+                "inline_data": {
+                    "mime_type": mime_type,
+                    "data": base64.b64encode(inline_data).decode("ascii")
+                }
+            })
+        parts.append({"text": prompt})
+        payload = {"contents": [{"role": "user", "parts": parts}]}
+
+        def check(response) -> None:
+            if response.status_code != 200:
+                retryable = response.status_code == 429 or response.status_code >= 500
+                raise ProviderError(
+                    self.name, f"HTTP {response.status_code}: {response.text[:200]}",
+                    retryable=retryable, retry_after=_retry_after(response.headers)
+                )
+
+        async def call() -> str:
+            try:
+                response = await self._get_client().post(
+                    f"/v1beta/models/{model}:generateContent",
+                    params={"key": self.api_key},
+                    json=payload
+                )
+            except httpx.HTTPError as e:
+                raise ProviderError(self.name, str(e) or type(e).__name__, retryable=True)
+
+            check(response)
+            return _gemini_text(response.json())
+
+        attempts = 0
+
+        async def call_streaming() -> str:
+            nonlocal attempts
+            attempts += 1
+            pieces = []
+            try:
+                async with self._get_client().stream(
+                    "POST", f"/v1beta/models/{model}:streamGenerateContent",
+                    params={"key": self.api_key, "alt": "sse"},
+                    json=payload
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        check(response)
+                    async for line in response.aiter_lines():
+                        if not line.startswith("data:"):
+                            continue
+                        chunk = json.loads(line[5:])
+                        if not chunk.get("candidates"):
+                            # Usage-only chunks carry no text; a blocked prompt has none at all
+                            if chunk.get("promptFeedback", {}).get("blockReason"):
+                                _gemini_text(chunk)
+                            continue
+                        # The closing chunk may carry only a finishReason
+                        content = chunk["candidates"][0].get("content") or {}
+                        text = "".join(part.get("text", "") for part in content.get("parts", []))
+                        if text:
+                            pieces.append(text)
+                            on_delta(text, attempts)
+            except httpx.HTTPError as e:
+                raise ProviderError(self.name, str(e) or type(e).__name__, retryable=True)
+            except ValueError as e:
+                raise ProviderError(self.name, f"malformed stream chunk: {e}", retryable=True)
+            return "".join(pieces)
+
+        return await self._guarded(
+            call if on_delta is None else call_streaming, deadline, tokens=tokens,
+            fairness_key=content_digest or request_key,
+            coalesce_key=request_key if on_delta is None else None
+        )
+
+    async def aclose(self):
+        """Close pooled connections."""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def _retry_after(headers) -> Optional[float]:
+    """Parse a Retry-After header given in seconds."""
+    try:
+        value = headers.get("retry-after")
+        return float(value) if value is not None else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _gemini_text(body: Dict[str, Any]) -> str:
+    """Concatenate the text parts of the first candidate."""
+    try:
+        parts = body["candidates"][0]["content"]["parts"]
+    except (KeyError, IndexError, TypeError):
+        reason = (body.get("promptFeedback") or {}).get("blockReason") if isinstance(body, dict) else None
+        raise ProviderError("gemini", f"no candidates in response{f' ({reason})' if reason else ''}")
+    return "".join(part.get("text", "") for part in parts)
+
+
+class LLMProviders:
+    """The service's provider clients, sharing one retry policy."""
+
+    def __init__(self):
+        retry = RetryPolicy.from_env()
+        failures = max(int(_env_float("LLM_BREAKER_FAILURES", 5)), 1)
+        reset = _env_float("LLM_BREAKER_RESET_SECONDS", 30.0)
+        self.openai = OpenAIProvider(retry, CircuitBreaker("openai", failures, reset))
+        self.gemini = GeminiProvider(retry, CircuitBreaker("gemini", failures, reset))
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self.openai.aclose()
+        await self.gemini.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-provider stats."""
+        return {"openai": self.openai.stats(), "gemini": self.gemini.stats()}
+
+
+_providers: Optional[LLMProviders] = None
+_providers_lock = threading.Lock()
+
+
+def get_providers() -> LLMProviders:
+    """Return the process-wide provider layer."""
+    global _providers
+    with _providers_lock:
+        if _providers is None:
+            _providers = LLMProviders()
+        return _providers
@@ -5,26 +5,56 @@ OCR and NLP Pipeline for Agreement Analysis
 
 import os
 import io
+import json
+import asyncio
 import base64
-import tempfile
-from typing import Optional, List, Dict, Any
+from urllib.parse import unquote
+from typing import Optional, List, Dict, Any, Tuple, AsyncIterator, Awaitable, Callable
 from datetime import datetime
 
+from lazy_init import ComponentSet, ImportBudget
+
+# Startup import timings, reported on /health/startup
+import_budget = ImportBudget(float(os.getenv("IMPORT_BUDGET_SECONDS", 1.0)))
+
 # Load environment variables from .env file
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException, UploadFile, File
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-import uvicorn
+with import_budget.measure("fastapi"):
+    from fastapi import FastAPI, HTTPException, UploadFile, File, Request
+    from fastapi.middleware.cors import CORSMiddleware
+    from fastapi.responses import JSONResponse, Response, StreamingResponse
+    from pydantic import BaseModel
+    import uvicorn
+
+with import_budget.measure("ocr_processor"):
+    from ocr_processor import OCRProcessor, extract_text_in_worker, shutdown_worker_processor
+
+with import_budget.measure("nlp_analyzer"):
+    from nlp_analyzer import NLPAnalyzer
 
-from ocr_processor import OCRProcessor
-from nlp_analyzer import NLPAnalyzer
+from worker_pool import StageExecutor, StageSaturatedError
+from result_cache import AnalysisCache
+from document_source import (
+    DocumentSource, DocumentSpooler, UploadTooLargeError, MAX_UPLOAD_BYTES, SPOOL_MEMORY_LIMIT,
+    UPLOAD_CHUNK_SIZE
+)
+from job_queue import JobQueue, ProgressCallback, TERMINAL_STATES
+from llm_providers import get_providers
+from hedging import Candidate, HEDGE_DELAY_SECONDS, race
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, STRATEGY_TOTAL, timed
+from profiling import ProfileStore, profiling_requested
+from json_stream import SectionCallback, emit_sections
+from batch_analysis import (
+    BATCH_CONCURRENCY, BATCH_MAX_DOCUMENTS, BatchPathError, BatchSummary, MicroBatcher,
+    analyze_ml_batch_in_worker, ml_overview, resolve_batch_paths
+)
 
 # Try to import Gemini PDF analyzer
 try:
-    from gemini_pdf_analyzer import GeminiPDFAnalyzer
+    with import_budget.measure("gemini_pdf_analyzer"):
+        from gemini_pdf_analyzer import GeminiPDFAnalyzer
     GEMINI_AVAILABLE = True
 except ImportError:
     GEMINI_AVAILABLE = False
@@ -46,18 +76,29 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize processors
-ocr_processor = OCRProcessor()
-nlp_analyzer = NLPAnalyzer()
+def create_gemini_analyzer() -> Optional["GeminiPDFAnalyzer"]:
+    """Initialize Gemini PDF analyzer if available."""
+    if not GEMINI_AVAILABLE:
+        return None
+    analyzer = GeminiPDFAnalyzer()
+    print("SUCCESS: Gemini PDF Analyzer initialized")
+    return analyzer
 
-# Initialize Gemini PDF analyzer if available
-gemini_analyzer = None
-if GEMINI_AVAILABLE:
-    try:
-        gemini_analyzer = GeminiPDFAnalyzer()
-        print("SUCCESS: Gemini PDF Analyzer initialized")
-    except Exception as e:
-        print(f"WARNING: Failed to initialize Gemini: {e}")
+
+# Processors are built lazily (on first use or by the background warm-up)
+components = ComponentSet()
+ocr_component = components.add("ocr", OCRProcessor)
+nlp_component = components.add("nlp", NLPAnalyzer, warm=lambda nlp: nlp.warm_up())
+gemini_component = components.add("gemini", create_gemini_analyzer, required=False)
+
+# Bounded pools for blocking OCR / NLP / LLM work
+stage_executor = StageExecutor()
+
+# Content-addressed cache of analysis results
+analysis_cache = AnalysisCache()
+profile_store = ProfileStore()
+
+import_budget.finish()
 
 
 class DocumentAnalysisRequest(BaseModel):
@@ -102,6 +143,8 @@ class AnalysisResult(BaseModel):
     overallRiskScore: int
     recommendations: List[str]
     expertSuggestions: Optional[Dict[str, List[str]]] = None
+    partial: bool = False  # recovered from a cut-off LLM response
+    missingSections: List[str] = []
 
 
 class DocumentAnalysisResponse(BaseModel):
@@ -111,6 +154,11 @@ class DocumentAnalysisResponse(BaseModel):
     processingTime: float
 
 
+class BatchAnalysisRequest(BaseModel):
+    documents: List[DocumentAnalysisRequest] = []
+    paths: List[str] = []  # Files or directories under BATCH_UPLOAD_ROOT
+
+
 @app.get("/")
 async def root():
     return {
@@ -118,25 +166,331 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "health": "/health",
-            "analyze": "/analyze (POST)"
+            "metrics": "/metrics",
+            "liveness": "/health/live",
+            "readiness": "/health/ready",
+            "startup": "/health/startup",
+            "analyze": "/analyze (POST)",
+            "upload": "/analyze/upload (POST, streamed body)",
+            "stream": "/analyze/stream (POST, server-sent events)",
+            "batch": "/analyze/batch (POST, NDJSON stream)",
+            "jobs": "/jobs (POST), /jobs/{id}, /jobs/{id}/events",
+            "profiles": "/profiles/{id} (when PROFILING_ENABLED=1)"
         }
     }
 
 
+@app.on_event("startup")
+async def start_workers():
+    stage_executor.start()
+    await job_queue.start()
+    if os.getenv("WARMUP_ON_STARTUP", "1") == "1":
+        components.start_background_warm_up()
+
+
+@app.on_event("shutdown")
+async def stop_workers():
+    await job_queue.stop()
+    stage_executor.shutdown()
+    ocr_processor = ocr_component.get_if_ready()
+    if ocr_processor is not None:
+        ocr_processor.shutdown()
+    shutdown_worker_processor()
+    nlp_analyzer = nlp_component.get_if_ready()
+    if nlp_analyzer is not None:
+        nlp_analyzer.shutdown()
+    await get_providers().aclose()
+
+
 @app.get("/health")
 async def health_check():
+    # Never force initialization here; report None until a component is built
+    ocr_processor = ocr_component.get_if_ready()
+    nlp_analyzer = nlp_component.get_if_ready()
+    # stats() may read the SQLite store; keep it off the event loop
+    cache_stats = await asyncio.to_thread(analysis_cache.stats)
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
+        "ready": components.is_ready(),
         "components": {
-            "ocr": ocr_processor.is_available(),
-            "nlp": nlp_analyzer.is_available()
-        }
+            "ocr": ocr_processor.is_available() if ocr_processor else None,
+            "nlp": nlp_analyzer.is_available() if nlp_analyzer else None
+        },
+        "workers": stage_executor.stats(),
+        "cache": cache_stats,
+        "llm": get_providers().stats(),
+        "jobs": job_queue.stats()
+    }
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus-style stage timings and strategy counters."""
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+@app.get("/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "collapsed"):
+    """
+    Fetch a stored request profile.
+
+    format=collapsed (default) returns collapsed stacks for flamegraph.pl
+    or speedscope; format=speedscope returns a speedscope JSON document.
+    """
+    profile = None
+    if profile_store.enabled:
+        profile = await asyncio.to_thread(profile_store.get, profile_id, format)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "speedscope":
+        return JSONResponse(
+            content=profile,
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.speedscope.json"'}
+        )
+    return Response(content=profile, media_type="text/plain; charset=utf-8")
+
+
+@app.get("/health/live")
+async def liveness_check():
+    """Liveness: the process is up and the event loop is responsive."""
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness: required components are initialized and warmed."""
+    ready = components.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"ready": ready, "components": components.status()}
+    )
+
+
+@app.get("/health/startup")
+async def startup_report():
+    """Import-time budget report and component initialization timings."""
+    return {
+        "imports": import_budget.report(),
+        "components": components.status()
     }
 
 
+def gemini_configured(gemini_analyzer: Optional["GeminiPDFAnalyzer"]) -> bool:
+    """Whether Gemini would actually be called (the analyzer exists without an API key)."""
+    return gemini_analyzer is not None and get_providers().gemini.enabled
+
+
+def analysis_version(file_type: str) -> str:
+    """Version component of cache keys: service, models and strategy inputs."""
+    gemini_model = GeminiPDFAnalyzer.MODEL_NAME if gemini_configured(gemini_component.get()) else "none"
+    openai_model = NLPAnalyzer.OPENAI_MODEL if nlp_component.get().openai_enabled else "none"
+    return f"{app.version}|gemini={gemini_model}|openai={openai_model}|type={file_type}"
+
+
+# ocrText of Gemini results, which never extract the text themselves
+GEMINI_OCR_TEXT = "[Gemini Native PDF Processing - No OCR Required]"
+
+
+def _ignore_progress(stage: str, **details: Any):
+    """Progress callback used when nobody is listening."""
+
+
+async def run_analysis_pipeline(document: DocumentSource, file_type: str, is_pdf: bool,
+                                progress: Optional[ProgressCallback] = None,
+                                on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
+    """
+    Analyze a received document, serving repeat uploads from the result cache.
+
+    progress, if given, is called as progress(stage, **details) when the
+    pipeline enters a stage (cache, llm, ocr with page counts, nlp).
+    on_section, if given, is called as on_section(section, value, source)
+    as soon as any strategy knows a section of the analysis; it may be
+    called from worker threads.
+
+    Raises StageSaturatedError when a stage cannot accept more work.
+    """
+    start_time = datetime.now()
+    progress = progress or _ignore_progress
+
+    # Building the version may initialize components, so it runs off the loop
+    version = await asyncio.to_thread(analysis_version, file_type)
+    cache_key = AnalysisCache.key_for_digest(document.digest, version)
+    progress("cache")
+    cached = await asyncio.to_thread(analysis_cache.get, cache_key)
+    if cached is not None:
+        print(f"[CACHE] Serving cached analysis for: {document.name}")
+        STRATEGY_TOTAL.inc(strategy="cache")
+        emit_sections(on_section, cached["analysis"], "cache")
+        return {
+            "success": True,
+            "ocrText": cached["ocrText"],
+            "analysis": cached["analysis"],
+            "processingTime": (datetime.now() - start_time).total_seconds()
+        }
+
+    with timed("analysis_strategies"):
+        result, cacheable = await run_analysis_strategies(document, file_type, is_pdf, progress, on_section)
+    if cacheable:
+        await asyncio.to_thread(
+            analysis_cache.put, cache_key,
+            {"ocrText": result["ocrText"], "analysis": result["analysis"]}
+        )
+
+    result["processingTime"] = (datetime.now() - start_time).total_seconds()
+    return result
+
+
+async def run_analysis_strategies(document: DocumentSource, file_type: str, is_pdf: bool,
+                                  progress: ProgressCallback,
+                                  on_section: Optional[SectionCallback] = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    Run the analysis strategies for a received document.
+
+    For PDFs, Gemini and OCR + NLP are hedged: OCR + NLP starts once Gemini
+    has not answered within HEDGE_DELAY_SECONDS (or as soon as it fails),
+    the first valid result wins and the other is cancelled. Past
+    ANALYSIS_SLA_SECONDS only OCR + NLP is awaited.
+
+    Blocking work is dispatched to the stage executor so the event loop
+    stays free for other requests. Returns the result and whether it is
+    a genuine analysis worth caching (not demo/sample output). A fallback
+    that stood in for a configured LLM (OCR + NLP for Gemini, local NLP
+    for OpenAI; the LLM was slow, failed, timed out or was skipped by its
+    circuit breaker) is not cached, since the cache key names that model
+    and the next upload should get another chance at it.
+    """
+    # First use may build a component; keep that off the event loop too
+    gemini_analyzer = await asyncio.to_thread(gemini_component.get)
+    ocr_processor = await asyncio.to_thread(ocr_component.get)
+    nlp_analyzer = await asyncio.to_thread(nlp_component.get)
+
+    candidates = []
+    gemini_applicable = is_pdf and gemini_configured(gemini_analyzer)
+
+    # STRATEGY 1: Use Gemini for PDFs (Best accuracy, no OCR needed)
+    # (skipped while Gemini is unconfigured or its circuit breaker is open)
+    if gemini_applicable and get_providers().gemini.available():
+        candidates.append(Candidate(
+            "gemini", lambda: analyze_with_gemini(gemini_analyzer, document, progress, on_section)
+        ))
+
+    # STRATEGY 2: Use OCR + NLP (Fallback for images or if Gemini fails)
+    candidates.append(Candidate(
+        "ocr+nlp",
+        lambda: analyze_with_ocr_nlp(
+            ocr_processor, nlp_analyzer, document, file_type, is_pdf, progress, on_section
+        ),
+        delay=HEDGE_DELAY_SECONDS if candidates else 0.0,
+        fallback=True
+    ))
+
+    winner, outcome = await race(candidates)
+    if winner == "ocr+nlp" and len(candidates) > 1:
+        print(f"[OCR] Using OCR + NLP result for: {document.name} (Gemini failed or was slower)")
+
+    if winner == "gemini":
+        STRATEGY_TOTAL.inc(strategy="gemini")
+    elif outcome[1]:
+        STRATEGY_TOTAL.inc(strategy="ocr_nlp")
+    else:
+        # Nothing usable was extracted; the sample text was analyzed instead
+        STRATEGY_TOTAL.inc(strategy="sample_text")
+
+    if winner != "gemini" and gemini_applicable:
+        return outcome[0], False
+    return outcome
+
+
+async def analyze_with_gemini(gemini_analyzer: "GeminiPDFAnalyzer", document: DocumentSource,
+                              progress: ProgressCallback,
+                              on_section: Optional[SectionCallback] = None) -> Tuple[Dict[str, Any], bool]:
+    """Analyze a PDF directly with Gemini; raises if no valid analysis comes back."""
+    print(f"[PDF] Using Gemini native PDF processing for: {document.name}")
+    progress("llm", provider="gemini")
+
+    # Analyze PDF directly with Gemini (no OCR!)
+    pdf_bytes = await asyncio.to_thread(document.read_bytes)
+    analysis = await gemini_analyzer.analyze_pdf_inline_async(
+        pdf_bytes, document.name, document.digest, on_section
+    )
+    del pdf_bytes
+
+    if "error" in analysis:
+        raise RuntimeError(f"Gemini analysis failed: {analysis['error']}")
+
+    return {
+        "success": True,
+        "ocrText": GEMINI_OCR_TEXT,
+        "analysis": analysis
+    }, not analysis.get("partial")
+
+
+async def analyze_with_ocr_nlp(ocr_processor: OCRProcessor, nlp_analyzer: NLPAnalyzer,
+                               document: DocumentSource, file_type: str, is_pdf: bool,
+                               progress: ProgressCallback,
+                               on_section: Optional[SectionCallback] = None) -> Tuple[Dict[str, Any], bool]:
+    """Extract text (text layer / OCR) and analyze it with NLP."""
+    print(f"[OCR] Using OCR + NLP processing for: {document.name}")
+
+    # Step 1: OCR Processing (reads the upload buffer or spool file directly)
+    progress("ocr")
+    if ocr_processor.is_available() or is_pdf:
+        # Thread workers share the service's processor; process workers
+        # build their own, and page callbacks cannot cross that boundary
+        extract, page_progress = extract_text_in_worker, None
+        if stage_executor.stage_kind("ocr") == "thread":
+            extract = ocr_processor.extract_text
+            page_progress = lambda done, total: progress("ocr", pagesDone=done, pagesTotal=total)
+        with timed("text_extraction"):
+            ocr_text = await stage_executor.run(
+                "ocr", extract, document.ocr_input, file_type, page_progress
+            )
+    else:
+        ocr_text = ""
+
+    cacheable = True
+    if not ocr_text or len(ocr_text.strip()) < 50:
+        # If OCR fails or returns too little text, use sample text for demo
+        ocr_text = get_sample_legal_text()
+        cacheable = False
+
+    # Step 2: NLP Analysis
+    progress("nlp")
+    # Section callbacks cannot cross a process boundary either
+    if stage_executor.stage_kind("nlp") != "thread":
+        local_sections = None
+    else:
+        local_sections = on_section
+    with timed("text_analysis"):
+        analysis, engine = await nlp_analyzer.analyze_async(
+            ocr_text,
+            run_local=lambda fn, text, _: stage_executor.run("nlp", fn, text, local_sections),
+            on_section=on_section
+        )
+    if engine == "local" and nlp_analyzer.openai_enabled:
+        # Local analysis stood in for OpenAI, which the cache key names
+        cacheable = False
+
+    # A cut-off LLM response is worth returning, but not worth keeping
+    return {
+        "success": True,
+        "ocrText": ocr_text,
+        "analysis": analysis
+    }, cacheable and not analysis.get("partial")
+
+
+def saturation_response(error: StageSaturatedError) -> HTTPException:
+    """Convert a saturation error into a 429/503 response with Retry-After."""
+    return HTTPException(
+        status_code=error.status_code,
+        detail=str(error),
+        headers={"Retry-After": str(error.retry_after)}
+    )
+
+
 @app.post("/analyze", response_model=DocumentAnalysisResponse)
-async def analyze_document(request: DocumentAnalysisRequest):
+async def analyze_document(request: DocumentAnalysisRequest, http_request: Request, response: Response):
     """
     Analyze a legal document using the best available method:
     - PDFs: Gemini native PDF processing (no OCR needed!)
@@ -144,78 +498,45 @@ async def analyze_document(request: DocumentAnalysisRequest):
     
     Gemini provides superior accuracy for PDFs by understanding the document
     structure, layout, and context without needing OCR.
+
+    With PROFILING_ENABLED=1, an X-Profile: 1 header (or ?profile=1) samples
+    the request; the X-Profile-Id response header names the stored profile.
     """
     start_time = datetime.now()
-    
+
     try:
-        # Decode base64 file
-        file_bytes = base64.b64decode(request.file)
-        
-        # Determine if this is a PDF
-        is_pdf = request.fileType == "pdf" or request.fileName.lower().endswith('.pdf')
-        
-        # STRATEGY 1: Use Gemini for PDFs (Best accuracy, no OCR needed)
-        if is_pdf and gemini_analyzer:
-            print(f"[PDF] Using Gemini native PDF processing for: {request.fileName}")
-            
-            try:
-                # Analyze PDF directly with Gemini (no OCR!)
-                analysis = gemini_analyzer.analyze_pdf_inline(file_bytes, request.fileName)
-                
-                if "error" not in analysis:
-                    processing_time = (datetime.now() - start_time).total_seconds()
-                    
-                    return DocumentAnalysisResponse(
-                        success=True,
-                        ocrText="[Gemini Native PDF Processing - No OCR Required]",
-                        analysis=analysis,
-                        processingTime=processing_time
-                    )
-                else:
-                    print(f"WARNING: Gemini analysis failed: {analysis['error']}")
-                    print("   Falling back to OCR + NLP...")
-                    
-            except Exception as e:
-                print(f"WARNING: Gemini error: {e}")
-                print("   Falling back to OCR + NLP...")
-        
-        # STRATEGY 2: Use OCR + NLP (Fallback for images or if Gemini fails)
-        print(f"[OCR] Using OCR + NLP processing for: {request.fileName}")
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=get_extension(request.fileName)) as tmp_file:
-            tmp_file.write(file_bytes)
-            tmp_path = tmp_file.name
-        
-        try:
-            # Step 1: OCR Processing
-            ocr_text = ocr_processor.extract_text(tmp_path, request.fileType)
-            
-            if not ocr_text or len(ocr_text.strip()) < 50:
-                # If OCR fails or returns too little text, use sample text for demo
-                ocr_text = get_sample_legal_text()
-            
-            # Step 2: NLP Analysis
-            analysis = nlp_analyzer.analyze(ocr_text)
-            
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            return DocumentAnalysisResponse(
-                success=True,
-                ocrText=ocr_text,
-                analysis=analysis,
-                processingTime=processing_time
-            )
+        stage_executor.admit_request()
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+
+    profile = profile_store.session(
+        request.fileName, profiling_requested(http_request.headers, http_request.query_params)
+    )
+    try:
+        async with profile as profile_id:
+            if profile_id:
+                response.headers["X-Profile-Id"] = profile_id
+
+            # Decode base64 file
+            with timed("base64_decode"):
+                file_bytes = base64.b64decode(request.file)
+            document = await asyncio.to_thread(DocumentSource.from_bytes, file_bytes, request.fileName)
             
-        finally:
-            # Clean up temp file
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-                
+            # Determine if this is a PDF
+            is_pdf = request.fileType == "pdf" or request.fileName.lower().endswith('.pdf')
+
+            result = await run_analysis_pipeline(document, request.fileType, is_pdf)
+            return DocumentAnalysisResponse(**result)
+
+    except StageSaturatedError as e:
+        raise saturation_response(e)
     except Exception as e:
         # Return demo analysis on error
         print(f"Analysis error: {str(e)}")
+        STRATEGY_TOTAL.inc(strategy="demo_fallback")
         
+        # The component may not be built yet; keep that off the event loop
+        nlp_analyzer = await asyncio.to_thread(nlp_component.get)
         demo_analysis = nlp_analyzer.get_demo_analysis()
         processing_time = (datetime.now() - start_time).total_seconds()
         
@@ -225,6 +546,8 @@ async def analyze_document(request: DocumentAnalysisRequest):
             analysis=demo_analysis,
             processingTime=processing_time
         )
+    finally:
+        stage_executor.release_request()
 
 
 @app.post("/analyze-file")
@@ -233,69 +556,517 @@ async def analyze_uploaded_file(file: UploadFile = File(...)):
     Analyze an uploaded file directly (alternative endpoint).
     Uses Gemini for PDFs, OCR+NLP for images.
     """
-    start_time = datetime.now()
-    
     try:
-        # Read file content
-        content = await file.read()
+        stage_executor.admit_request()
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+
+    spooler = None
+    document = None
+    try:
+        # Copy the upload in chunks rather than reading it whole
+        spooler = DocumentSpooler(file.filename, suffix=get_extension(file.filename))
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            await spooler.write(chunk)
+        document = await spooler.finish()
         
         # Determine file type
         is_pdf = file.filename.lower().endswith('.pdf')
         file_type = "pdf" if is_pdf else "image"
-        
-        # STRATEGY 1: Use Gemini for PDFs
-        if is_pdf and gemini_analyzer:
-            print(f"[PDF] Using Gemini native PDF processing for: {file.filename}")
-            
+
+        return await run_analysis_pipeline(document, file_type, is_pdf)
+
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if document is not None:
+            await asyncio.to_thread(document.cleanup)
+        elif spooler is not None:
+            await asyncio.to_thread(spooler.discard)
+        stage_executor.release_request()
+
+
+async def receive_upload(request: Request,
+                         memory_limit: int = SPOOL_MEMORY_LIMIT) -> Tuple[DocumentSource, str, bool]:
+    """
+    Receive a streamed document and return it with its file type and PDF flag.
+
+    The body is either raw bytes, with the file name and type in the
+    X-File-Name (URL-encoded) and X-File-Type headers or the fileName and
+    fileType query parameters, or multipart/form-data with a "file" field.
+    Chunks are hashed as they arrive and spooled to disk past memory_limit.
+
+    Raises HTTPException (400/413) for empty or oversized uploads.
+    """
+    file_name = unquote(
+        request.headers.get("x-file-name") or request.query_params.get("fileName") or "document"
+    )
+    file_type = request.headers.get("x-file-type") or request.query_params.get("fileType") or ""
+
+    spooler = None
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            upload = form.get("file")
+            if not hasattr(upload, "read"):
+                raise HTTPException(status_code=400, detail="Missing 'file' field")
+            file_name = upload.filename or file_name
+            spooler = DocumentSpooler(file_name, suffix=get_extension(file_name), memory_limit=memory_limit)
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                await spooler.write(chunk)
+            await form.close()
+        else:
+            spooler = DocumentSpooler(file_name, suffix=get_extension(file_name), memory_limit=memory_limit)
+            async for chunk in request.stream():
+                await spooler.write(chunk)
+        document = await spooler.finish()
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        if spooler is not None:
+            await asyncio.to_thread(spooler.discard)
+        raise
+
+    if document.size == 0:
+        await asyncio.to_thread(document.cleanup)
+        raise HTTPException(status_code=400, detail="Empty upload")
+
+    is_pdf = file_type == "pdf" or file_name.lower().endswith('.pdf')
+    if not file_type:
+        file_type = "pdf" if is_pdf else "image"
+    return document, file_type, is_pdf
+
+
+@app.post("/analyze/upload", response_model=DocumentAnalysisResponse)
+async def analyze_streamed_upload(request: Request, response: Response):
+    """
+    Analyze a document streamed as the request body.
+
+    Avoids the base64 round trip of /analyze: the body is hashed as it is
+    received and spooled to disk past UPLOAD_SPOOL_MEMORY_BYTES, so at most
+    one copy of the document exists. See receive_upload for the accepted
+    body formats. Supports the same opt-in profiling as /analyze.
+    """
+    try:
+        stage_executor.admit_request()
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+
+    document = None
+    profile = profile_store.session(
+        unquote(request.headers.get("x-file-name") or "upload"),
+        profiling_requested(request.headers, request.query_params)
+    )
+    try:
+        async with profile as profile_id:
+            if profile_id:
+                response.headers["X-Profile-Id"] = profile_id
+            document, file_type, is_pdf = await receive_upload(request)
+            result = await run_analysis_pipeline(document, file_type, is_pdf)
+            return DocumentAnalysisResponse(**result)
+
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        if document is not None:
+            await asyncio.to_thread(document.cleanup)
+        stage_executor.release_request()
+
+
+def _cleanup_documents(documents: List[DocumentSource]):
+    for document in documents:
+        document.cleanup()
+
+
+# Loads one batch document as (document, file type, is PDF)
+BatchLoader = Callable[[], Awaitable[Tuple[DocumentSource, str, bool]]]
+
+
+def _batch_file_type(file_name: str) -> Tuple[str, bool]:
+    is_pdf = file_name.lower().endswith('.pdf')
+    return ("pdf" if is_pdf else "image"), is_pdf
+
+
+async def receive_batch(request: Request) -> Tuple[List[Tuple[str, BatchLoader]], List[DocumentSource]]:
+    """
+    Parse a batch request into (file name, loader) pairs.
+
+    The body is either JSON ({"documents": [<as for /analyze>], "paths": [...]})
+    or multipart/form-data with repeated "files" and "paths" fields. Paths
+    name files or directories under BATCH_UPLOAD_ROOT and are read in place.
+    Multipart files are spooled to disk up front, so a large batch is not
+    held in memory; they are returned as well so the caller can clean them
+    up. A JSON body is read in chunks and rejected past MAX_UPLOAD_BYTES.
+
+    Raises HTTPException (400/413/422) for invalid, empty or oversized batches.
+    """
+    items: List[Tuple[str, BatchLoader]] = []
+    spooled: List[DocumentSource] = []
+
+    try:
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            paths = [value for value in form.getlist("paths") if isinstance(value, str)]
+            for upload in form.getlist("files"):
+                if not hasattr(upload, "read"):
+                    continue
+                file_name = upload.filename or "document"
+                spooler = DocumentSpooler(file_name, suffix=get_extension(file_name), memory_limit=0)
+                while True:
+                    chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    await spooler.write(chunk)
+                document = await spooler.finish()
+                spooled.append(document)
+
+                async def load_spooled(document=document):
+                    return (document, *_batch_file_type(document.name))
+                items.append((file_name, load_spooled))
+            await form.close()
+        else:
+            raw = bytearray()
+            async for chunk in request.stream():
+                raw += chunk
+                if len(raw) > MAX_UPLOAD_BYTES:
+                    raise UploadTooLargeError(MAX_UPLOAD_BYTES)
+            try:
+                body = BatchAnalysisRequest(**json.loads(raw))
+            except (ValueError, TypeError) as e:
+                raise HTTPException(status_code=422, detail=f"Invalid batch request: {e}")
+            paths = body.paths
+            for entry in body.documents:
+                async def load_encoded(entry=entry):
+                    with timed("base64_decode"):
+                        file_bytes = base64.b64decode(entry.file)
+                    document = await asyncio.to_thread(DocumentSource.from_bytes, file_bytes, entry.fileName)
+                    return document, entry.fileType, entry.fileType == "pdf" or entry.fileName.lower().endswith('.pdf')
+                items.append((entry.fileName, load_encoded))
+
+        if paths:
+            for path, file_name in await asyncio.to_thread(resolve_batch_paths, paths):
+                async def load_path(path=path, file_name=file_name):
+                    document = await asyncio.to_thread(DocumentSource.from_path, path, file_name)
+                    return (document, *_batch_file_type(path))
+                items.append((file_name, load_path))
+    except BatchPathError as e:
+        await asyncio.to_thread(_cleanup_documents, spooled)
+        raise HTTPException(status_code=400, detail=str(e))
+    except UploadTooLargeError as e:
+        await asyncio.to_thread(_cleanup_documents, spooled)
+        raise HTTPException(status_code=413, detail=str(e))
+    except BaseException:
+        await asyncio.to_thread(_cleanup_documents, spooled)
+        raise
+
+    if not items or len(items) > BATCH_MAX_DOCUMENTS:
+        await asyncio.to_thread(_cleanup_documents, spooled)
+        if not items:
+            raise HTTPException(status_code=400, detail="Batch contains no documents")
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {BATCH_MAX_DOCUMENTS} documents")
+    return items, spooled
+
+
+# Times a batch document is retried when a stage is saturated
+BATCH_SATURATION_RETRIES = 3
+
+
+async def analyze_batch_document(document: DocumentSource, file_type: str, is_pdf: bool) -> Dict[str, Any]:
+    """Run the analysis pipeline for one batch document, waiting out stage saturation."""
+    for attempt in range(BATCH_SATURATION_RETRIES + 1):
+        try:
+            return await run_analysis_pipeline(document, file_type, is_pdf)
+        except StageSaturatedError as e:
+            if attempt == BATCH_SATURATION_RETRIES:
+                raise
+            await asyncio.sleep(e.retry_after)
+
+
+def ml_input_text(result: Dict[str, Any]) -> str:
+    """Text for the ML analyzer: the extracted text, or Gemini's findings when nothing was extracted."""
+    if result["ocrText"] != GEMINI_OCR_TEXT:
+        return result["ocrText"]
+    analysis = result["analysis"]
+    parts = [analysis.get("summary", "")]
+    parts.extend(clause.get("content", "") for clause in analysis.get("clauses", []))
+    parts.extend(item.get("description", "") for item in analysis.get("obligations", []))
+    return "\n".join(part for part in parts if part)
+
+
+async def stream_batch(items: List[Tuple[str, BatchLoader]],
+                       spooled: List[DocumentSource]) -> AsyncIterator[str]:
+    """
+    Analyze batch documents concurrently and yield NDJSON lines as each finishes.
+
+    Up to BATCH_CONCURRENCY documents run through the pipeline at once (the
+    stage pools still bound OCR/NLP/LLM work). Finished documents are
+    grouped for ML predictions, so the models score many documents per call.
+    The request slot reserved by the endpoint is released at the end.
+    """
+    summary = BatchSummary(len(items))
+    batcher = MicroBatcher(lambda texts: stage_executor.run("ml", analyze_ml_batch_in_worker, texts))
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+    lines: asyncio.Queue = asyncio.Queue()
+
+    async def process(index: int, file_name: str, load: BatchLoader):
+        document = None
+        try:
+            async with semaphore:
+                document, file_type, is_pdf = await load()
+                result = await analyze_batch_document(document, file_type, is_pdf)
+            response = DocumentAnalysisResponse(**result).model_dump()
+            summary.add_result(index, file_name, response["analysis"])
+            line = {"type": "result", "index": index, "fileName": file_name, **response}
             try:
-                analysis = gemini_analyzer.analyze_pdf_inline(content, file.filename)
-                
-                if "error" not in analysis:
-                    processing_time = (datetime.now() - start_time).total_seconds()
-                    
-                    return {
-                        "success": True,
-                        "ocrText": "[Gemini Native PDF Processing - No OCR Required]",
-                        "analysis": analysis,
-                        "processingTime": processing_time
-                    }
+                line["ml"] = ml_overview(await batcher.submit(ml_input_text(result)))
             except Exception as e:
-                print(f"WARNING: Gemini error: {e}, falling back to OCR+NLP")
-        
-        # STRATEGY 2: Use OCR + NLP
-        print(f"[OCR] Using OCR + NLP processing for: {file.filename}")
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp_file:
-            tmp_file.write(content)
-            tmp_path = tmp_file.name
-        
+                # The analysis itself succeeded; report it without ML findings
+                print(f"Batch ML prediction error for {file_name}: {str(e)}")
+                summary.add_ml_error(type(e).__name__)
+                line["ml"] = ml_overview({})
+                line["mlError"] = str(e)
+        except Exception as e:
+            print(f"Batch analysis error for {file_name}: {str(e)}")
+            summary.add_error(type(e).__name__)
+            line = {"type": "error", "index": index, "fileName": file_name, "error": str(e)}
+        finally:
+            if document is not None:
+                await asyncio.to_thread(document.cleanup)
+        await lines.put(line)
+
+    tasks = [
+        asyncio.create_task(process(index, file_name, load))
+        for index, (file_name, load) in enumerate(items)
+    ]
+    try:
+        for _ in tasks:
+            yield json.dumps(await lines.get()) + "\n"
+        yield json.dumps(summary.as_dict(batcher.stats())) + "\n"
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        batcher.close()
+        await asyncio.to_thread(_cleanup_documents, spooled)
+        stage_executor.release_request()
+
+
+@app.post("/analyze/batch")
+async def analyze_batch(request: Request):
+    """
+    Analyze many documents in one request, streaming results as NDJSON.
+
+    Accepts base64 documents (as for /analyze), multipart files and/or
+    paths under BATCH_UPLOAD_ROOT (see receive_batch). Emits one line per
+    document as it finishes - {"type": "result", "index", "fileName", ...
+    the /analyze response ..., "ml": <ML model findings>} or {"type":
+    "error", ...} - and a closing {"type": "summary"} line with counts,
+    throughput, risk distribution and the riskiest documents. If only the
+    ML prediction fails, the result line carries empty ML findings and an
+    "mlError" message.
+    """
+    try:
+        stage_executor.admit_request()
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+
+    try:
+        items, spooled = await receive_batch(request)
+    except BaseException:
+        stage_executor.release_request()
+        raise
+
+    return StreamingResponse(
+        stream_batch(items, spooled),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.post("/analyze/stream")
+async def analyze_document_stream(request: DocumentAnalysisRequest):
+    """
+    Analyze a document like /analyze, streaming partial results as server-sent events.
+
+    Events, in order of availability:
+    - stage: {"stage", ...} when the pipeline enters a stage
+    - section: {"section", "value", "source"} as soon as one part of the
+      analysis (summary, clauses, overallRiskScore, ...) is known, parsed
+      from the LLM output while it is still being generated or reported by
+      the local extractors. While engines are hedged, the same section can
+      arrive from more than one source.
+    - item: {"section", "index", "value", "source"} for each clause or
+      obligation of a streamed LLM response as soon as it is complete,
+      ahead of the section event with the whole list
+    - result: the complete /analyze response, which is authoritative
+    - error: {"detail", "status"?, "retryAfter"?}; the stream ends after it
+    """
+    try:
+        stage_executor.admit_request()
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+
+    def push(event: str, payload: Dict[str, Any]):
+        # Serialize in the calling (possibly worker) thread, hand over to the loop
+        message = f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+        loop.call_soon_threadsafe(events.put_nowait, message)
+
+    def progress(stage: str, **details):
+        push("stage", {"stage": stage, **details})
+
+    def on_section(section: str, value: Any, source: str, index: Optional[int] = None):
+        if index is None:
+            push("section", {"section": section, "value": value, "source": source})
+        else:
+            push("item", {"section": section, "index": index, "value": value, "source": source})
+
+    async def analyze():
+        document = None
         try:
-            # OCR Processing
-            ocr_text = ocr_processor.extract_text(tmp_path, file_type)
-            
-            if not ocr_text or len(ocr_text.strip()) < 50:
-                ocr_text = get_sample_legal_text()
-            
-            # NLP Analysis
-            analysis = nlp_analyzer.analyze(ocr_text)
-            
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            return {
-                "success": True,
-                "ocrText": ocr_text,
-                "analysis": analysis,
-                "processingTime": processing_time
-            }
-            
+            with timed("base64_decode"):
+                file_bytes = base64.b64decode(request.file)
+            document = await asyncio.to_thread(DocumentSource.from_bytes, file_bytes, request.fileName)
+            is_pdf = request.fileType == "pdf" or request.fileName.lower().endswith('.pdf')
+            result = await run_analysis_pipeline(document, request.fileType, is_pdf, progress, on_section)
+            push("result", DocumentAnalysisResponse(**result).model_dump())
+        except StageSaturatedError as e:
+            push("error", {"detail": str(e), "status": e.status_code, "retryAfter": e.retry_after})
+        except Exception as e:
+            print(f"Streaming analysis error: {str(e)}")
+            push("error", {"detail": str(e)})
         finally:
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
-                
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+            if document is not None:
+                await asyncio.to_thread(document.cleanup)
+            loop.call_soon_threadsafe(events.put_nowait, None)
+
+    async def stream() -> AsyncIterator[str]:
+        task = asyncio.create_task(analyze())
+        try:
+            while True:
+                try:
+                    message = await asyncio.wait_for(events.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+            stage_executor.release_request()
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+async def run_job(job: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    """Run the analysis pipeline for a queued job's stored document."""
+    document = DocumentSource(
+        job["file_name"], job["digest"], job["size"], path=job["document_path"]
+    )
+    return await run_analysis_pipeline(
+        document, job["file_type"], bool(job["is_pdf"]), progress
+    )
+
+
+# Background analysis jobs (persistent priority queue)
+job_queue = JobQueue(run_job)
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: Request):
+    """
+    Queue a document for background analysis and return its job id.
 
+    Accepts the same bodies as /analyze/upload. Optional X-Priority header
+    or priority query parameter (higher runs first) and X-Webhook-Url
+    header or webhookUrl query parameter (receives the finished job as a
+    JSON POST). Poll GET /jobs/{id} or follow GET /jobs/{id}/events.
+    """
+    try:
+        priority = int(request.headers.get("x-priority") or request.query_params.get("priority") or 0)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="priority must be an integer")
+    webhook_url = request.headers.get("x-webhook-url") or request.query_params.get("webhookUrl")
+    if webhook_url and not webhook_url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="webhookUrl must be an http(s) URL")
+
+    # Jobs outlive the request, so always spool the body to disk
+    document, file_type, is_pdf = await receive_upload(request, memory_limit=0)
+    try:
+        return await job_queue.submit(
+            document.path, document.name, file_type, is_pdf,
+            document.digest, document.size, priority=priority, webhook_url=webhook_url
+        )
+    except StageSaturatedError as e:
+        raise saturation_response(e)
+    finally:
+        await asyncio.to_thread(document.cleanup)
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Return a job's status, stage progress and, once finished, its result."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/events")
+async def stream_job_events(job_id: str):
+    """Server-sent events with a job's progress, ending with the final job."""
+    job = await job_queue.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def events():
+        queue = job_queue.subscribe(job_id)
+        try:
+            # Snapshot after subscribing so no transition is missed
+            current = await job_queue.get(job_id)
+            yield f"event: job\ndata: {json.dumps(current)}\n\n"
+            if current["status"] in TERMINAL_STATES:
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                name = "job" if "jobId" in event else "progress"
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+                if event.get("status") in TERMINAL_STATES:
+                    return
+        finally:
+            job_queue.unsubscribe(job_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 def get_extension(filename: str) -> str:
     """Get file extension from filename."""
@@ -0,0 +1,277 @@
+"""
+Metrics Module
+Minimal Prometheus-style counters and histograms for the analysis pipeline
+"""
+
+import math
+import time
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds: sub-millisecond extractors up to multi-minute OCR runs
+DEFAULT_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 25.0, 60.0, 120.0, 300.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value the way the text exposition format expects."""
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    """Escape a label value."""
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _label_string(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    """Render {name="value",...} (empty if there are no labels)."""
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """Common bookkeeping for a metric family with optional labels."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def clear(self):
+        """Drop all recorded values."""
+        with self._lock:
+            self._values.clear()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        """Return the exposition lines for this family."""
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}"
+        ]
+
+
+class Counter(_Metric):
+    """A monotonically increasing count per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        """Add `amount` to the counter for these labels."""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the current count for these labels."""
+        with self._lock:
+            return self._values.get(self._key(labels), 0.0)
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_string(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count per label set."""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        """Record one observation."""
+        key = self._key(labels)
+        with self._lock:
+            series = self._values.get(key)
+            if series is None:
+                series = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def snapshot(self, **labels: str) -> Dict[str, float]:
+        """Return count and sum for these labels."""
+        with self._lock:
+            series = self._values.get(self._key(labels))
+            if series is None:
+                return {"count": 0, "sum": 0.0}
+            return {"count": sum(series[:-1]), "sum": series[-1]}
+
+    def snapshots(self) -> Dict[Tuple[str, ...], Dict[str, float]]:
+        """Return count and sum for every label set seen so far."""
+        with self._lock:
+            return {
+                key: {"count": sum(series[:-1]), "sum": series[-1]}
+                for key, series in self._values.items()
+            }
+
+    def render(self) -> List[str]:
+        lines = super().render()
+        with self._lock:
+            for key, series in sorted(self._values.items()):
+                cumulative = 0.0
+                for bound, count in zip(self.buckets + (math.inf,), series[:-1]):
+                    cumulative += count
+                    labels = _label_string(self.labelnames, key, f'le="{_format_value(bound)}"')
+                    lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+                labels = _label_string(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    """A named collection of metric families rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric family (names must be unique)."""
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """Create and register a counter."""
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Create and register a histogram."""
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Return all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "legalai_stage_duration_seconds",
+    "Time spent in each analysis pipeline stage",
+    ("stage",)
+)
+
+STRATEGY_TOTAL = REGISTRY.counter(
+    "legalai_analysis_strategy_total",
+    "Analyses served, by the strategy that produced the result",
+    ("strategy",)
+)
+
+NLP_ENGINE_TOTAL = REGISTRY.counter(
+    "legalai_nlp_engine_total",
+    "Text analyses, by the engine that produced the result (openai or local)",
+    ("engine",)
+)
+
+LLM_REQUEST_SECONDS = REGISTRY.histogram(
+    "legalai_llm_request_seconds",
+    "Duration of logical LLM calls including retries",
+    ("provider", "outcome")
+)
+
+LLM_QUEUE_WAIT_SECONDS = REGISTRY.histogram(
+    "legalai_llm_queue_wait_seconds",
+    "Time LLM calls waited for rate-limit capacity",
+    ("provider",)
+)
+
+
+# Observations made while capture() is active on this thread are buffered
+# instead of recorded, so work done in a process pool can ship its timings
+# back to the parent with its result.
+_capture = threading.local()
+
+
+def observe_stage(stage: str, seconds: float):
+    """Record the duration of a pipeline stage."""
+    buffer = getattr(_capture, "buffer", None)
+    if buffer is not None:
+        buffer.append((stage, seconds))
+    else:
+        STAGE_SECONDS.observe(seconds, stage=stage)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the body of a with-block as one observation of `stage`."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(stage, time.perf_counter() - started)
+
+
+@contextmanager
+def capture() -> Iterator[List[Tuple[str, float]]]:
+    """Buffer stage observations made on this thread; yields the buffer."""
+    previous = getattr(_capture, "buffer", None)
+    buffer: List[Tuple[str, float]] = []
+    _capture.buffer = buffer
+    try:
+        yield buffer
+    finally:
+        _capture.buffer = previous
+
+
+def replay(observations: Optional[List[Tuple[str, float]]]):
+    """Record observations buffered by capture() (possibly in another process)."""
+    for stage, seconds in observations or ():
+        observe_stage(stage, seconds)
+
+
+def run_captured(fn, *args):
+    """
+    Call fn(*args) with stage timings captured.
+
+    Module-level so it can be pickled for process pools; returns
+    (result, observations) for the parent to replay().
+    """
+    with capture() as observations:
+        result = fn(*args)
+    return result, observations
@@ -5,7 +5,8 @@ Uses trained machine learning models for document analysis
 
 import os
 import re
-from typing import Dict, List, Any
+import threading
+from typing import Dict, List, Any, Optional
 from pathlib import Path
 
 # Import the trainer (which also handles predictions)
@@ -16,6 +17,9 @@ except ImportError:
     ML_AVAILABLE = False
     print("⚠️  ML Trainer not available")
 
+from sentence_index import SentenceIndex
+from metrics import timed
+
 
 class MLLegalAnalyzer:
     """
@@ -47,20 +51,57 @@ class MLLegalAnalyzer:
         if not text or len(text.strip()) < 50:
             return self._get_demo_analysis()
         
+        return self.analyze_documents([text])[0]
+    
+    def analyze_documents(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Analyze many documents, batching the ML predictions across them.
+        
+        Document types are predicted with one model call for all documents,
+        and the clause candidates of every document are classified together,
+        so per-call vectorizer and model overhead is paid once per batch.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        valid = []
+        for index, text in enumerate(texts):
+            if not text or len(text.strip()) < 50:
+                results[index] = self._get_demo_analysis()
+            else:
+                valid.append(index)
+        
         # Use ML models if available
         if self.ml_trainer and self.ml_trainer.doc_type_model:
-            return self._analyze_with_ml(text)
+            analyses = self._analyze_batch_with_ml([texts[index] for index in valid])
         else:
-            return self._analyze_with_rules(text)
+            analyses = [self._analyze_with_rules(texts[index]) for index in valid]
+        
+        for index, analysis in zip(valid, analyses):
+            results[index] = analysis
+        return results
     
     def _analyze_with_ml(self, text: str) -> Dict[str, Any]:
         """Analyze document using trained ML models."""
+        return self._analyze_batch_with_ml([text])[0]
+    
+    def _analyze_batch_with_ml(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Analyze documents using trained ML models, one model call per prediction type."""
+        if not texts:
+            return []
         
-        # 1. Predict Document Type
-        doc_type_pred = self.ml_trainer.predict_document_type(text)
+        # 1. Predict Document Types
+        with timed("ml_document_type"):
+            doc_type_preds = self.ml_trainer.predict_document_types_batch(texts)
         
         # 2. Extract and classify clauses
-        clauses = self._extract_clauses_ml(text)
+        clauses_per_document = self._extract_clauses_ml_batch(texts)
+        
+        return [
+            self._assemble_ml_analysis(text, doc_type_pred, clauses)
+            for text, doc_type_pred, clauses in zip(texts, doc_type_preds, clauses_per_document)
+        ]
+    
+    def _assemble_ml_analysis(self, text: str, doc_type_pred: Dict, clauses: List[Dict]) -> Dict[str, Any]:
+        """Combine one document's ML predictions with the rule-based extractors."""
         
         # 3. Extract other components
         parties = self._extract_parties(text)
@@ -103,39 +144,54 @@ class MLLegalAnalyzer:
     
     def _extract_clauses_ml(self, text: str) -> List[Dict[str, Any]]:
         """Extract and classify clauses using ML models."""
+        return self._extract_clauses_ml_batch([text])[0]
+    
+    def _extract_clauses_ml_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Extract clauses from several documents and classify all of them together."""
+        # Keep sentences that look like a legal clause
+        candidates_per_document = [
+            [
+                sentence for sentence in self._split_sentences(text)
+                if 30 <= len(sentence) <= 500 and self._is_likely_clause(sentence)
+            ]
+            for text in texts
+        ]
+        candidates = [sentence for document in candidates_per_document for sentence in document]
+        
+        # Classify all candidates in one batch per model
+        with timed("ml_clause_type"):
+            type_preds = self.ml_trainer.predict_clause_types_batch(candidates)
+        with timed("ml_clause_risk"):
+            risk_preds = self.ml_trainer.predict_clause_risks_batch(candidates)
+        
+        results = []
+        offset = 0
+        for document in candidates_per_document:
+            end = offset + len(document)
+            results.append(self._select_clauses(document, type_preds[offset:end], risk_preds[offset:end]))
+            offset = end
+        return results
+    
+    def _select_clauses(self, candidates: List[str], type_preds: List[Dict],
+                        risk_preds: List[Dict]) -> List[Dict[str, Any]]:
+        """Turn one document's clause predictions into its top clauses."""
         clauses = []
-        
-        # Split into sentences
-        sentences = self._split_sentences(text)
-        
-        # Analyze each sentence that looks like a clause
-        for sentence in sentences:
-            if len(sentence) < 30 or len(sentence) > 500:
-                continue
-            
-            # Check if it looks like a legal clause
-            if self._is_likely_clause(sentence):
-                # Predict clause type
-                clause_type_pred = self.ml_trainer.predict_clause_type(sentence)
-                
-                # Predict risk level
-                risk_pred = self.ml_trainer.predict_clause_risk(sentence)
-                
-                # Only include if confidence is reasonable
-                if clause_type_pred['confidence'] > 0.3:
-                    clauses.append({
-                        "type": clause_type_pred['clause_type'],
-                        "content": sentence[:300],
-                        "riskLevel": risk_pred['risk_level'],
-                        "confidence": clause_type_pred['confidence'],
-                        "riskConfidence": risk_pred['confidence'],
-                        "explanation": self._explain_clause_ml(
-                            clause_type_pred['clause_type'],
-                            risk_pred['risk_level'],
-                            sentence
-                        ),
-                        "mlPredicted": True
-                    })
+        for sentence, clause_type_pred, risk_pred in zip(candidates, type_preds, risk_preds):
+            # Only include if confidence is reasonable
+            if clause_type_pred['confidence'] > 0.3:
+                clauses.append({
+                    "type": clause_type_pred['clause_type'],
+                    "content": sentence[:300],
+                    "riskLevel": risk_pred['risk_level'],
+                    "confidence": clause_type_pred['confidence'],
+                    "riskConfidence": risk_pred['confidence'],
+                    "explanation": self._explain_clause_ml(
+                        clause_type_pred['clause_type'],
+                        risk_pred['risk_level'],
+                        sentence
+                    ),
+                    "mlPredicted": True
+                })
         
         # Sort by risk level (high first)
         risk_order = {'high': 0, 'medium': 1, 'low': 2}
@@ -271,8 +327,7 @@ class MLLegalAnalyzer:
     # Helper methods (reused from NLP analyzer)
     def _split_sentences(self, text: str) -> List[str]:
         """Split text into sentences."""
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip() and len(s.strip()) > 20]
+        return [s for s in SentenceIndex(text) if len(s) > 20]
     
     def _extract_parties(self, text: str) -> List[Dict[str, str]]:
         """Extract party information."""
@@ -403,6 +458,30 @@ class MLLegalAnalyzer:
         }
 
 
+# Per-process analyzer used by worker pools
+_worker_analyzer: Optional[MLLegalAnalyzer] = None
+_worker_analyzer_lock = threading.Lock()
+
+
+def _get_worker_analyzer() -> MLLegalAnalyzer:
+    """Return this process's MLLegalAnalyzer, creating it once."""
+    global _worker_analyzer
+    with _worker_analyzer_lock:
+        if _worker_analyzer is None:
+            _worker_analyzer = MLLegalAnalyzer()
+        return _worker_analyzer
+
+
+def analyze_documents_in_worker(texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Analyze a batch of document texts inside a pool worker.
+
+    Module-level so it can be pickled for process pools; each worker loads
+    the models once and reuses them.
+    """
+    return _get_worker_analyzer().analyze_documents(texts)
+
+
 # Test the analyzer
 if __name__ == "__main__":
     print("\n🤖 Testing ML-Powered Legal Analyzer\n")
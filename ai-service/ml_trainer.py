@@ -8,7 +8,7 @@ import json
 import pickle
 import numpy as np
 import pandas as pd
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from pathlib import Path
 
@@ -34,6 +34,23 @@ except ImportError:
     SENTENCE_TRANSFORMERS_AVAILABLE = False
     print("⚠️  sentence-transformers not available. Install with: pip install sentence-transformers")
 
+from model_registry import ModelRegistry, get_registry
+
+
+class _RegistryArtifact:
+    """Trainer attribute stored in (and lazily loaded from) the model registry."""
+    
+    def __set_name__(self, owner, name):
+        self.name = name
+    
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        return obj.registry.get(self.name)
+    
+    def __set__(self, obj, value):
+        obj.registry.put(self.name, value)
+
 
 class LegalMLTrainer:
     """
@@ -44,29 +61,37 @@ class LegalMLTrainer:
     2. Clause Risk Classifier - Predicts risk level of clauses
     3. Clause Type Classifier - Identifies clause types
     4. Semantic Embeddings - For similarity search
+    
+    Models live in a process-wide ModelRegistry: they are loaded lazily
+    (memory-mapped where possible) on first use and shared by every
+    trainer/analyzer instance pointing at the same models directory.
     """
     
-    def __init__(self, models_dir: str = "models"):
+    # Model storage
+    doc_type_model = _RegistryArtifact()
+    doc_type_vectorizer = _RegistryArtifact()
+    doc_type_encoder = _RegistryArtifact()
+    
+    clause_risk_model = _RegistryArtifact()
+    clause_risk_vectorizer = _RegistryArtifact()
+    
+    clause_type_model = _RegistryArtifact()
+    clause_type_vectorizer = _RegistryArtifact()
+    clause_type_encoder = _RegistryArtifact()
+    
+    embedding_model = _RegistryArtifact()
+    
+    def __init__(self, models_dir: str = "models", registry: Optional[ModelRegistry] = None):
         """Initialize the trainer."""
         self.models_dir = Path(models_dir)
         self.models_dir.mkdir(exist_ok=True)
         
-        # Model storage
-        self.doc_type_model = None
-        self.doc_type_vectorizer = None
-        self.doc_type_encoder = None
-        
-        self.clause_risk_model = None
-        self.clause_risk_vectorizer = None
-        
-        self.clause_type_model = None
-        self.clause_type_vectorizer = None
-        self.clause_type_encoder = None
+        # Shared, lazily loaded models
+        self.registry = registry or get_registry(models_dir)
+        self.registry.register_loader('embedding_model', self._load_embedding_model)
         
-        self.embedding_model = None
-        
-        # Load existing models if available
-        self.load_models()
+        # Decoded label arrays, keyed by model attribute name
+        self._label_arrays: Dict[str, Tuple[Any, np.ndarray]] = {}
     
     def create_synthetic_training_data(self) -> Dict[str, pd.DataFrame]:
         """
@@ -415,119 +440,164 @@ class LegalMLTrainer:
     def _save_model(self, name: str, model: Any):
         """Save a model to disk."""
         path = self.models_dir / f"{name}.pkl"
-        joblib.dump(model, path)
+        # Write then rename so memory-mapped copies of the old file stay valid
+        tmp_path = path.with_suffix('.pkl.tmp')
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, path)
         print(f"   💾 Saved: {name}")
     
     def load_models(self):
-        """Load trained models from disk."""
+        """
+        Eagerly load all trained models from disk.
+        
+        Not needed for normal use (models load on first access); call it
+        before forking workers so they share the loaded models.
+        """
         try:
-            self.doc_type_model = self._load_model('doc_type_model')
-            self.doc_type_vectorizer = self._load_model('doc_type_vectorizer')
-            self.doc_type_encoder = self._load_model('doc_type_encoder')
-            
-            self.clause_risk_model = self._load_model('clause_risk_model')
-            self.clause_risk_vectorizer = self._load_model('clause_risk_vectorizer')
-            
-            self.clause_type_model = self._load_model('clause_type_model')
-            self.clause_type_vectorizer = self._load_model('clause_type_vectorizer')
-            self.clause_type_encoder = self._load_model('clause_type_encoder')
-            
-            # Load embedding model if info exists
-            info_path = self.models_dir / 'embedding_model_info.json'
-            if info_path.exists() and SENTENCE_TRANSFORMERS_AVAILABLE:
-                with open(info_path, 'r') as f:
-                    info = json.load(f)
-                self.embedding_model = SentenceTransformer(info['model_name'])
-            
+            self.registry.preload()
             print("✅ Loaded existing ML models")
         except Exception as e:
             print(f"ℹ️  No existing models found: {e}")
     
-    def _load_model(self, name: str) -> Any:
-        """Load a model from disk."""
-        path = self.models_dir / f"{name}.pkl"
-        if path.exists():
-            return joblib.load(path)
-        return None
+    def _load_embedding_model(self) -> Any:
+        """Build the sentence transformer recorded by train_embedding_model."""
+        info_path = self.models_dir / 'embedding_model_info.json'
+        if not info_path.exists() or not SENTENCE_TRANSFORMERS_AVAILABLE:
+            return None
+        
+        with open(info_path, 'r') as f:
+            info = json.load(f)
+        return SentenceTransformer(info['model_name'])
     
-    def predict_document_type(self, text: str) -> Dict[str, Any]:
-        """Predict document type for given text."""
+    def model_stats(self) -> Dict[str, Any]:
+        """Return per-model load time and resident memory statistics."""
+        return self.registry.stats()
+    
+    def _labels(self, name: str, model: Any, encoder: Any = None) -> np.ndarray:
+        """
+        Return decoded labels aligned with a model's predict_proba columns.
+        
+        Computed once per model instance so predictions can decode with a
+        plain array index instead of LabelEncoder.inverse_transform.
+        """
+        cached = self._label_arrays.get(name)
+        if cached is not None and cached[0] is model:
+            return cached[1]
+        
+        labels = np.asarray(model.classes_)
+        if encoder is not None:
+            labels = encoder.classes_[labels]
+        labels = labels.astype(object)
+        
+        self._label_arrays[name] = (model, labels)
+        return labels
+    
+    def predict_document_types_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Predict document types for many documents at once.
+        
+        All documents are vectorized into one sparse matrix and scored with
+        a single predict_proba call.
+        """
         if not self.doc_type_model:
-            return {"error": "Model not trained"}
+            return [{"error": "Model not trained"} for _ in texts]
+        if not texts:
+            return []
         
         # Vectorize
-        text_vec = self.doc_type_vectorizer.transform([text])
+        text_vecs = self.doc_type_vectorizer.transform(texts)
         
         # Predict
-        prediction = self.doc_type_model.predict(text_vec)[0]
-        probabilities = self.doc_type_model.predict_proba(text_vec)[0]
+        probabilities = self.doc_type_model.predict_proba(text_vecs)
+        best = probabilities.argmax(axis=1)
         
         # Decode
-        doc_type = self.doc_type_encoder.inverse_transform([prediction])[0]
-        
-        # Get confidence
-        confidence = float(max(probabilities))
+        labels = self._labels('doc_type', self.doc_type_model, self.doc_type_encoder)
         
-        return {
-            "document_type": doc_type,
-            "confidence": confidence,
-            "all_probabilities": {
-                self.doc_type_encoder.inverse_transform([i])[0]: float(prob)
-                for i, prob in enumerate(probabilities)
+        return [
+            {
+                "document_type": labels[index],
+                "confidence": row[index],
+                "all_probabilities": dict(zip(labels, row))
             }
-        }
+            for row, index in zip(probabilities.tolist(), best.tolist())
+        ]
     
-    def predict_clause_risk(self, clause_text: str) -> Dict[str, Any]:
-        """Predict risk level for a clause."""
+    def predict_document_type(self, text: str) -> Dict[str, Any]:
+        """Predict document type for given text."""
+        return self.predict_document_types_batch([text])[0]
+    
+    def predict_clause_risks_batch(self, clause_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Predict risk levels for many clauses at once.
+        
+        All clauses are vectorized into one sparse matrix and scored with a
+        single predict_proba call.
+        """
         if not self.clause_risk_model:
-            return {"error": "Model not trained"}
+            return [{"error": "Model not trained"} for _ in clause_texts]
+        if not clause_texts:
+            return []
         
         # Vectorize
-        text_vec = self.clause_risk_vectorizer.transform([clause_text])
+        text_vecs = self.clause_risk_vectorizer.transform(clause_texts)
         
         # Predict
-        prediction = self.clause_risk_model.predict(text_vec)[0]
-        probabilities = self.clause_risk_model.predict_proba(text_vec)[0]
-        
-        # Get confidence
-        confidence = float(max(probabilities))
-        
-        return {
-            "risk_level": prediction,
-            "confidence": confidence,
-            "probabilities": {
-                "high": float(probabilities[0]) if len(probabilities) > 0 else 0,
-                "low": float(probabilities[1]) if len(probabilities) > 1 else 0,
-                "medium": float(probabilities[2]) if len(probabilities) > 2 else 0
-            }
-        }
+        probabilities = self.clause_risk_model.predict_proba(text_vecs)
+        best = probabilities.argmax(axis=1)
+        labels = self._labels('clause_risk', self.clause_risk_model)
+        
+        results = []
+        for row, index in zip(probabilities.tolist(), best.tolist()):
+            by_label = dict(zip(labels, row))
+            results.append({
+                "risk_level": labels[index],
+                "confidence": row[index],
+                "probabilities": {
+                    "high": by_label.get("high", 0),
+                    "low": by_label.get("low", 0),
+                    "medium": by_label.get("medium", 0)
+                }
+            })
+        
+        return results
     
-    def predict_clause_type(self, clause_text: str) -> Dict[str, Any]:
-        """Predict clause type."""
+    def predict_clause_types_batch(self, clause_texts: List[str]) -> List[Dict[str, Any]]:
+        """
+        Predict clause types for many clauses at once.
+        
+        All clauses are vectorized into one sparse matrix and scored with a
+        single predict_proba call.
+        """
         if not self.clause_type_model:
-            return {"error": "Model not trained"}
+            return [{"error": "Model not trained"} for _ in clause_texts]
+        if not clause_texts:
+            return []
         
         # Vectorize
-        text_vec = self.clause_type_vectorizer.transform([clause_text])
+        text_vecs = self.clause_type_vectorizer.transform(clause_texts)
         
         # Predict
-        prediction = self.clause_type_model.predict(text_vec)[0]
-        probabilities = self.clause_type_model.predict_proba(text_vec)[0]
-        
-        # Decode
-        clause_type = self.clause_type_encoder.inverse_transform([prediction])[0]
-        
-        # Get confidence
-        confidence = float(max(probabilities))
-        
-        return {
-            "clause_type": clause_type,
-            "confidence": confidence,
-            "all_probabilities": {
-                self.clause_type_encoder.inverse_transform([i])[0]: float(prob)
-                for i, prob in enumerate(probabilities)
+        probabilities = self.clause_type_model.predict_proba(text_vecs)
+        best = probabilities.argmax(axis=1)
+        labels = self._labels('clause_type', self.clause_type_model, self.clause_type_encoder)
+        
+        return [
+            {
+                "clause_type": labels[index],
+                "confidence": row[index],
+                "all_probabilities": dict(zip(labels, row))
             }
-        }
+            for row, index in zip(probabilities.tolist(), best.tolist())
+        ]
+    
+    def predict_clause_risk(self, clause_text: str) -> Dict[str, Any]:
+        """Predict risk level for a clause."""
+        return self.predict_clause_risks_batch([clause_text])[0]
+    
+    def predict_clause_type(self, clause_text: str) -> Dict[str, Any]:
+        """Predict clause type."""
+        return self.predict_clause_types_batch([clause_text])[0]
     
     def get_semantic_embedding(self, text: str) -> np.ndarray:
         """Get semantic embedding for text."""
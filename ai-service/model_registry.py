@@ -0,0 +1,171 @@
+"""
+Model Registry Module
+Process-wide, lazily loaded store for trained model artifacts
+"""
+
+import gc
+import os
+import time
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Optional
+
+try:
+    import joblib
+    JOBLIB_AVAILABLE = True
+except ImportError:
+    JOBLIB_AVAILABLE = False
+
+
+_MISSING = object()
+
+
+def _resident_bytes() -> int:
+    """Return the resident set size of this process in bytes (0 if unknown)."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+        # ru_maxrss is a high-water mark in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except Exception:
+        return 0
+
+
+class ModelRegistry:
+    """
+    Lazily loads model artifacts on first use and shares them process-wide.
+
+    - Pickled artifacts (<name>.pkl) are loaded with joblib.load(mmap_mode='r')
+      so their numpy arrays are backed by the page cache instead of private
+      memory.
+    - Artifacts with custom construction (e.g. the sentence transformer)
+      register a loader function.
+    - preload() loads everything and freezes the GC so workers forked
+      afterwards (gunicorn --preload) share the pages copy-on-write.
+
+    Per-model load time and resident memory growth are recorded in stats().
+    """
+
+    def __init__(self, models_dir: str, mmap_mode: Optional[str] = 'r'):
+        """Create an empty registry for a models directory."""
+        self.models_dir = Path(models_dir)
+        self.mmap_mode = mmap_mode
+        self._objects: Dict[str, Any] = {}
+        self._loaders: Dict[str, Callable[[], Any]] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def register_loader(self, name: str, loader: Callable[[], Any]):
+        """Use a custom loader for an artifact instead of <name>.pkl."""
+        self._loaders[name] = loader
+
+    def get(self, name: str) -> Any:
+        """Return an artifact, loading it on first access (None if unavailable)."""
+        obj = self._objects.get(name, _MISSING)
+        if obj is not _MISSING:
+            return obj
+
+        with self._lock:
+            lock = self._locks.setdefault(name, threading.Lock())
+
+        with lock:
+            obj = self._objects.get(name, _MISSING)
+            if obj is _MISSING:
+                obj = self._load(name)
+                self._objects[name] = obj
+            return obj
+
+    def put(self, name: str, obj: Any):
+        """Register an in-memory artifact (e.g. a freshly trained model)."""
+        self._objects[name] = obj
+        self._stats[name] = {"loaded": obj is not None, "source": "memory"}
+
+    def refresh(self):
+        """Forget loaded artifacts so they are re-read from disk on next use."""
+        with self._lock:
+            self._objects.clear()
+            self._stats.clear()
+
+    def available(self) -> Iterable[str]:
+        """Names of artifacts that exist on disk or have a custom loader."""
+        names = {path.stem for path in self.models_dir.glob('*.pkl')}
+        return sorted(names | set(self._loaders))
+
+    def preload(self, names: Optional[Iterable[str]] = None):
+        """
+        Load artifacts eagerly, then freeze the GC.
+
+        Call before forking workers so every worker shares the loaded pages
+        copy-on-write instead of loading its own copy.
+        """
+        for name in (names if names is not None else self.available()):
+            self.get(name)
+        gc.collect()
+        if hasattr(gc, 'freeze'):
+            gc.freeze()
+
+    def _load(self, name: str) -> Any:
+        """Load one artifact and record how long it took and what it cost."""
+        loader = self._loaders.get(name)
+        path = self.models_dir / f"{name}.pkl"
+
+        if loader is None and (not JOBLIB_AVAILABLE or not path.exists()):
+            return None
+
+        rss_before = _resident_bytes()
+        start = time.perf_counter()
+        mmapped = False
+
+        try:
+            if loader is not None:
+                obj = loader()
+            else:
+                try:
+                    obj = joblib.load(path, mmap_mode=self.mmap_mode)
+                    mmapped = self.mmap_mode is not None
+                except (ValueError, OSError):
+                    # Compressed or otherwise non-mappable pickles
+                    obj = joblib.load(path)
+        except Exception as e:
+            print(f"⚠️  Failed to load {name}: {e}")
+            self._stats[name] = {"loaded": False, "error": str(e)}
+            return None
+
+        elapsed = time.perf_counter() - start
+        rss_delta = max(_resident_bytes() - rss_before, 0)
+        self._stats[name] = {
+            "loaded": obj is not None,
+            "source": "loader" if loader is not None else "disk",
+            "mmapped": mmapped,
+            "loadSeconds": round(elapsed, 4),
+            "rssDeltaBytes": rss_delta
+        }
+        print(f"   📦 Loaded {name} in {elapsed:.2f}s (+{rss_delta / (1024 * 1024):.1f} MB)")
+        return obj
+
+    def stats(self) -> Dict[str, Any]:
+        """Return per-model load statistics and current resident memory."""
+        return {
+            "models": {name: dict(info) for name, info in self._stats.items()},
+            "residentBytes": _resident_bytes()
+        }
+
+
+_registries: Dict[str, ModelRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(models_dir: str = "models") -> ModelRegistry:
+    """Return the process-wide registry for a models directory."""
+    key = str(Path(models_dir).resolve())
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = ModelRegistry(models_dir)
+            _registries[key] = registry
+        return registry
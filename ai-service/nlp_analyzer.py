@@ -4,37 +4,149 @@ Performs legal document analysis using NLP techniques
 """
 
 import re
-import json
 import os
-from typing import Dict, List, Any, Optional
+import asyncio
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, Iterator, List, Any, Optional, Set, Tuple
 from datetime import datetime
 import random
 
-# Try to import NLP libraries
-try:
-    import spacy
-    SPACY_AVAILABLE = True
-except ImportError:
-    SPACY_AVAILABLE = False
+from chunked_analysis import Chunk, map_chunks, merge_analyses, split_into_chunks
+from extraction_dag import ExtractionDAG, Step
+from hedging import Candidate, HEDGE_DELAY_SECONDS, race
+from lazy_init import module_available
+from json_stream import SECTIONS, LLMSectionStream, SectionCallback, emit_sections, fill_missing_sections, recover_json
+from llm_providers import get_providers
+from metrics import NLP_ENGINE_TOTAL, timed
+from sentence_index import SentenceIndex, _get_punkt_tokenizer
+from shared_text import SharedText
 
-try:
-    import nltk
-    from nltk.tokenize import sent_tokenize, word_tokenize
-    from nltk.corpus import stopwords
-    NLTK_AVAILABLE = True
-except ImportError:
-    NLTK_AVAILABLE = False
+# NLP libraries are slow to import; check for them now, import on first use
+SPACY_AVAILABLE = module_available("spacy")
+NLTK_AVAILABLE = module_available("nltk")
 
-try:
-    from openai import OpenAI
-    OPENAI_AVAILABLE = True
-except ImportError:
-    OPENAI_AVAILABLE = False
+
+class PatternSet:
+    """
+    A group of regexes matched in a single pass over the text.
+    
+    The leading literal of every pattern is folded into one trie-shaped
+    prefilter regex, so the text is scanned once regardless of how many
+    patterns there are. Full patterns are only tried at positions where one
+    of their literals starts. Patterns without a literal prefix are scanned
+    individually.
+    """
+    
+    _META_CHARS = set('\\.^$*+?{}[]|()')
+    _QUANTIFIERS = set('?*{')
+    
+    def __init__(self, patterns: List[str]):
+        """Compile patterns and build the literal prefilter."""
+        self.patterns = [re.compile(p) for p in patterns]
+        
+        by_anchor: Dict[str, List[int]] = {}
+        self._unanchored: List[int] = []
+        for i, pattern in enumerate(patterns):
+            anchor = self._literal_prefix(pattern)
+            if anchor:
+                by_anchor.setdefault(anchor, []).append(i)
+            else:
+                self._unanchored.append(i)
+        
+        # A prefilter hit on an anchor also means every shorter anchor that
+        # is a prefix of it starts at the same position
+        self._candidates = {
+            anchor: sorted(i for other, ids in by_anchor.items() if anchor.startswith(other) for i in ids)
+            for anchor in by_anchor
+        }
+        self._prefilter = re.compile(self._trie_regex(list(by_anchor))) if by_anchor else None
+    
+    @classmethod
+    def _literal_prefix(cls, pattern: str) -> str:
+        """Return the literal text every match of a pattern must start with."""
+        prefix = []
+        for i, ch in enumerate(pattern):
+            if ch in cls._META_CHARS:
+                # A quantifier makes the preceding character optional
+                if ch in cls._QUANTIFIERS and prefix:
+                    prefix.pop()
+                break
+            prefix.append(ch)
+        return ''.join(prefix)
+    
+    @staticmethod
+    def _trie_regex(words: List[str]) -> str:
+        """Build a regex that matches the longest of the given literals."""
+        trie: Dict[str, Any] = {}
+        for word in words:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[''] = True
+        
+        def build(node: Dict[str, Any]) -> str:
+            branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+            if '' in node:
+                return ('(?:' + body + ')' if len(branches) == 1 else body) + '?'
+            return body
+        
+        return build(trie)
+    
+    def finditer(self, text: str) -> Iterator[Tuple[int, 're.Match']]:
+        """
+        Yield (pattern index, match) pairs.
+        
+        Per pattern, matches are exactly those re.finditer would produce
+        (non-overlapping, left to right). Anchored patterns are yielded in
+        text order, followed by any unanchored ones.
+        """
+        next_start = [0] * len(self.patterns)
+        
+        if self._prefilter is not None:
+            search = self._prefilter.search
+            pos = 0
+            while True:
+                hit = search(text, pos)
+                if hit is None:
+                    break
+                start = hit.start()
+                for i in self._candidates[hit.group()]:
+                    if start >= next_start[i]:
+                        match = self.patterns[i].match(text, start)
+                        if match:
+                            next_start[i] = max(match.end(), start + 1)
+                            yield i, match
+                pos = start + 1
+        
+        for i in self._unanchored:
+            for match in self.patterns[i].finditer(text):
+                yield i, match
+    
+    def search(self, text: str) -> bool:
+        """Return whether any pattern matches the text."""
+        return next(self.finditer(text), None) is not None
+    
+    def matching(self, text: str) -> Set[int]:
+        """Return the indices of all patterns that match the text."""
+        found: Set[int] = set()
+        for i, _ in self.finditer(text):
+            found.add(i)
+            if len(found) == len(self.patterns):
+                break
+        return found
 
 
 class NLPAnalyzer:
     """Analyzes legal documents using NLP techniques."""
     
+    OPENAI_MODEL = "gpt-3.5-turbo-0125"
+    
     # Legal clause patterns (kept for fallback)
     CLAUSE_PATTERNS = {
         'Liability Limitation': [
@@ -120,46 +232,85 @@ class NLPAnalyzer:
         r'cure\s+period'
     ]
     
+    # Precompiled single-pass matchers for the patterns above
+    _CLAUSE_PATTERN_TYPES = [clause_type for clause_type, patterns in CLAUSE_PATTERNS.items() for _ in patterns]
+    _CLAUSE_MATCHER = PatternSet([p for patterns in CLAUSE_PATTERNS.values() for p in patterns])
+    _HIGH_RISK_MATCHER = PatternSet(HIGH_RISK_PATTERNS)
+    _MEDIUM_RISK_MATCHER = PatternSet(MEDIUM_RISK_PATTERNS)
+    
     def __init__(self):
-        """Initialize NLP analyzer."""
+        """
+        Initialize NLP analyzer.
+        
+        Construction only reads configuration. The async OpenAI client is
+        built by the shared provider layer on first use, and spaCy/NLTK
+        resources are loaded by warm_up().
+        """
         self._nlp = None
         self._available = False
-        self.openai_client = None
-        
-        # Initialize OpenAI if key is present
-        api_key = os.getenv("OPENAI_API_KEY")
-        if OPENAI_AVAILABLE and api_key and not api_key.startswith("YOUR_"):
-            try:
-                self.openai_client = OpenAI(api_key=api_key)
-                print("OpenAI Client Initialized")
-            except Exception as e:
-                print(f"Failed to initialize OpenAI: {e}")
-        
-        # Try to load spaCy model
-        if SPACY_AVAILABLE:
+        self._init_lock = threading.Lock()
+        self.llm = get_providers()
+        
+        # Local extraction: serial, thread, process or auto (processes for
+        # texts of at least NLP_PARALLEL_MIN_CHARS on multi-core hosts)
+        self.extraction_mode = os.getenv('NLP_EXTRACTION_MODE', 'auto').lower()
+        self.parallel_min_chars = max(int(os.getenv('NLP_PARALLEL_MIN_CHARS', 500_000)), 0)
+        self.extraction_workers = max(int(os.getenv('NLP_EXTRACTION_WORKERS', min(os.cpu_count() or 1, 4))), 1)
+        self._extraction_pool: Optional[Executor] = None
+        self._extraction_pool_lock = threading.Lock()
+        self._local_dag = self._build_local_dag()
+        self._in_pool_worker = False
+    
+    def __reduce__(self):
+        # Locks, provider clients and spaCy cannot be pickled; a pool worker
+        # uses its own analyzer instead, so bound methods can go to processes
+        return (_get_worker_analyzer, ())
+    
+    @property
+    def openai_enabled(self) -> bool:
+        """Whether OpenAI analysis is configured (OPENAI_API_KEY)."""
+        return self.llm.openai.enabled
+    
+    def warm_up(self):
+        """Load the spaCy model and NLTK data ahead of traffic."""
+        self._load_spacy()
+        self._ensure_nltk_data()
+        _get_punkt_tokenizer(retry=True)
+    
+    def _load_spacy(self):
+        """Try to load the spaCy model, downloading it if needed."""
+        if not SPACY_AVAILABLE or self._nlp is not None:
+            return
+        
+        import spacy
+        try:
+            self._nlp = spacy.load("en_core_web_sm")
+            self._available = True
+        except Exception:
             try:
+                # Try downloading the model
+                import subprocess
+                subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
                 self._nlp = spacy.load("en_core_web_sm")
                 self._available = True
             except Exception:
-                try:
-                    # Try downloading the model
-                    import subprocess
-                    subprocess.run(["python", "-m", "spacy", "download", "en_core_web_sm"])
-                    self._nlp = spacy.load("en_core_web_sm")
-                    self._available = True
-                except Exception:
-                    pass
-        
-        # Download NLTK data if available
-        if NLTK_AVAILABLE:
+                pass
+    
+    def _ensure_nltk_data(self):
+        """Download NLTK data if available."""
+        if not NLTK_AVAILABLE:
+            return
+        
+        import nltk
+        try:
+            nltk.data.find('tokenizers/punkt')
+        except LookupError:
             try:
-                nltk.data.find('tokenizers/punkt')
-            except LookupError:
-                try:
-                    nltk.download('punkt', quiet=True)
-                    nltk.download('stopwords', quiet=True)
-                except Exception:
-                    pass
+                nltk.download('punkt', quiet=True)
+                nltk.download('punkt_tab', quiet=True)
+                nltk.download('stopwords', quiet=True)
+            except Exception:
+                pass
     
     def is_available(self) -> bool:
         """Return whether NLP is available."""
@@ -167,7 +318,9 @@ class NLPAnalyzer:
     
     def analyze(self, text: str) -> Dict[str, Any]:
         """
-        Analyze legal document text.
+        Analyze legal document text locally (blocking).
+        
+        LLM-backed analysis runs on the event loop; use analyze_async.
         
         Args:
             text: The document text to analyze
@@ -177,26 +330,127 @@ class NLPAnalyzer:
         """
         if not text or len(text.strip()) < 50:
             return self.get_demo_analysis()
-            
-        # Try OpenAI Analysis first
-        if self.openai_client:
-            try:
-                print("Attempting OpenAI analysis...")
-                return self._analyze_with_gpt(text)
-            except Exception as e:
-                print(f"OpenAI analysis failed, falling back to local NLP: {e}")
         
-        # Fallback to local NLP
         return self._analyze_local(text)
+    
+    async def analyze_async(
+        self,
+        text: str,
+        run_local: Optional[Callable[..., Awaitable[Any]]] = None,
+        on_section: Optional[SectionCallback] = None
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Analyze legal document text, preferring OpenAI.
+        
+        Returns (analysis, engine), where engine is "openai", "local" or
+        "demo" (text too short to analyze), so callers can tell a local
+        result that stood in for OpenAI from a genuine one.
+        
+        OpenAI and local NLP are hedged: local analysis starts once OpenAI
+        has not answered within HEDGE_DELAY_SECONDS (or as soon as it fails),
+        and whichever finishes first wins. Past ANALYSIS_SLA_SECONDS only the
+        local result is awaited. Local analysis runs alone when OpenAI is not
+        configured or its circuit breaker is open. run_local(fn, *args) runs
+        the blocking local analysis (defaults to a worker thread).
+        
+        on_section(section, value, source), if given, is called as each
+        section becomes known: by local extractors as they finish (from the
+        worker thread, so it must be thread-safe) and from OpenAI's streamed
+        output as its fields complete. Sections from both engines may arrive
+        while they race; the returned analysis is authoritative.
+        """
+        if not text or len(text.strip()) < 50:
+            demo = self.get_demo_analysis()
+            emit_sections(on_section, demo, "demo")
+            return demo, "demo"
+        
+        if run_local is None:
+            run_local = asyncio.to_thread
+        
+        candidates = [
+            Candidate("local", lambda: run_local(self._analyze_local, text, on_section), fallback=True)
+        ]
+        
+        # Try OpenAI Analysis first
+        if self.llm.openai.available():
+            print("Attempting OpenAI analysis...")
+            candidates = [
+                Candidate("openai", lambda: self._analyze_with_gpt(text, on_section)),
+                candidates[0]._replace(delay=HEDGE_DELAY_SECONDS)
+            ]
+        
+        winner, analysis = await race(candidates)
+        NLP_ENGINE_TOTAL.inc(engine=winner)
+        if winner == "local" and len(candidates) > 1:
+            print("Using local NLP result (OpenAI failed or was slower)")
+        return analysis, winner
 
-    def _analyze_with_gpt(self, text: str) -> Dict[str, Any]:
-        """Analyze document using OpenAI GPT."""
+    async def _analyze_with_gpt(self, text: str, on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
+        """
+        Analyze document using OpenAI GPT.
+        
+        Documents longer than one prompt (LLM_CHUNK_CHARS) are split at
+        headings and sentence boundaries, analyzed chunk by chunk
+        concurrently, and the partial analyses are merged.
+        
+        With on_section, a single-chunk analysis is streamed and its
+        sections reported as they complete; chunked analyses only report
+        sections once merged, since partial chunks are not final.
+        """
+        chunks = await asyncio.to_thread(split_into_chunks, text)
+        if len(chunks) > 1:
+            print(f"Analyzing {len(chunks)} chunks with OpenAI...")
+        
+        # All chunks of one document share a slot in the rate limiter's fair queue
+        document_key = hashlib.sha256(text.encode('utf-8')).hexdigest()
+        if len(chunks) == 1 and on_section is not None:
+            return await self._analyze_gpt_chunk(
+                chunks[0], 1, document_key, on_delta=LLMSectionStream(on_section, "openai")
+            )
+        
+        partials = await map_chunks(
+            chunks, lambda chunk: self._analyze_gpt_chunk(chunk, len(chunks), document_key)
+        )
+        analysis = merge_analyses(partials, chunks)
+        emit_sections(on_section, analysis, "openai")
+        return analysis
+    
+    async def _analyze_gpt_chunk(self, chunk: Chunk, total: int, document_key: str = "",
+                                 on_delta: Optional[LLMSectionStream] = None) -> Dict[str, Any]:
+        """Analyze one chunk of a document with GPT (streamed when on_delta is given)."""
+        content = await self.llm.openai.chat(
+            self.OPENAI_MODEL,
+            self._gpt_messages(chunk.text, chunk.index, total),
+            fairness_key=document_key,
+            on_delta=on_delta,
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+        analysis, complete = recover_json(content)
+        if not isinstance(analysis, dict):
+            raise ValueError(f"GPT returned no parseable JSON: {content[:200]!r}")
+        if not complete:
+            # Cut off at the token limit: keep what came back
+            analysis['partial'] = True
+            analysis['missingSections'] = fill_missing_sections(analysis)
+            print(f"⚠️  GPT response was cut short (missing: {', '.join(analysis['missingSections'])})")
+        return analysis
+    
+    def _gpt_messages(self, text: str, part: int = 0, total: int = 1) -> List[Dict[str, str]]:
+        """Build the chat messages for a GPT analysis request."""
+        scope = ""
+        if total > 1:
+            scope = (
+                f"This is part {part + 1} of {total} of a longer document (parts overlap slightly). "
+                "Report only what appears in this part."
+            )
         
         prompt = f"""
         You are an expert legal AI assistant. Analyze the following legal document text and provide a structured JSON response.
+        {scope}
         
         Text to analyze:
-        {text[:15000]}  # Limit text length to avoid token limits
+        {text}
         
         Return a JSON object with this EXACT structure:
         {{
@@ -239,56 +493,112 @@ class NLPAnalyzer:
         IMPORTANT: Ensure valid JSON output. Do not include markdown formatting (like ```json).
         """
         
-        response = self.openai_client.chat.completions.create(
-            model="gpt-3.5-turbo-0125",
-            messages=[
-                {"role": "system", "content": "You are a legal expert AI. Output valid JSON only."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.1,
-            response_format={"type": "json_object"}
-        )
-        
-        content = response.choices[0].message.content
-        return json.loads(content)
+        return [
+            {"role": "system", "content": "You are a legal expert AI. Output valid JSON only."},
+            {"role": "user", "content": prompt}
+        ]
 
-    def _analyze_local(self, text: str) -> Dict[str, Any]:
-        """Local regex-based analysis (fallback)."""
-        # Normalize text
-        text = self._normalize_text(text)
-        
-        # Extract various components
-        clauses = self._extract_clauses(text)
-        parties = self._extract_parties(text)
-        dates = self._extract_dates(text)
-        obligations = self._extract_obligations(text)
-        penalties = self._extract_penalties(text)
-        key_terms = self._extract_key_terms(text)
-        
-        # Calculate risk score
-        risk_score = self._calculate_risk_score(text, clauses)
-        
-        # Generate summary and recommendations
-        summary = self._generate_summary(text, clauses)
-        doc_type = self._identify_document_type(text)
-        recommendations = self._generate_recommendations(clauses, risk_score)
-        
-        # Generate expert suggestions
-        expert_suggestions = self._generate_expert_suggestions(doc_type, clauses, risk_score)
+    def _build_local_dag(self) -> ExtractionDAG:
+        """
+        Local analysis as a DAG over the normalized text (input "text").
+        
+        Sentence-aware extractors wait for the sentence index; the risk
+        score, summary, recommendations and expert suggestions wait for the
+        clauses. Everything else only needs the text. Steps that take a few
+        milliseconds run inline rather than on the extraction pool. Run
+        serially, steps go in the order listed, which puts the clauses and
+        the sections derived from them first.
+        """
+        return ExtractionDAG([
+            Step("documentType", self._identify_document_type, ("text",), "nlp_document_type", inline=True),
+            Step("keyTerms", self._extract_key_terms, ("text",), "nlp_key_terms", inline=True),
+            Step("sentences", SentenceIndex, ("text",), "nlp_sentences"),
+            Step("clauses", self._extract_clauses, ("text", "sentences"), "nlp_clauses"),
+            Step("riskPatterns", self._risk_pattern_score, ("text",), "nlp_risk_patterns"),
+            Step("overallRiskScore", self._clause_risk_score, ("riskPatterns", "clauses"),
+                 "nlp_risk_score", inline=True),
+            Step("summary", self._generate_summary, ("text", "clauses"), "nlp_summary", inline=True),
+            Step("recommendations", self._generate_recommendations, ("clauses", "overallRiskScore"),
+                 "nlp_recommendations", inline=True),
+            Step("expertSuggestions", self._generate_expert_suggestions,
+                 ("documentType", "clauses", "overallRiskScore"), "nlp_expert_suggestions", inline=True),
+            Step("parties", self._extract_parties, ("text",), "nlp_parties"),
+            Step("obligations", self._extract_obligations, ("text", "sentences"), "nlp_obligations"),
+            Step("penalties", self._extract_penalties, ("text", "sentences"), "nlp_penalties"),
+            Step("dates", self._extract_dates, ("text",), "nlp_dates"),
+        ], inputs=("text",))
+    
+    def _extraction_pool_for(self, text: str) -> Optional[Executor]:
+        """
+        Pick where local extraction runs (None = serially on this thread).
         
-        return {
-            "summary": summary,
-            "documentType": doc_type,
-            "clauses": clauses,
-            "keyTerms": key_terms,
-            "parties": parties,
-            "dates": dates,
-            "obligations": obligations,
-            "penalties": penalties,
-            "overallRiskScore": risk_score,
-            "recommendations": recommendations,
-            "expertSuggestions": expert_suggestions
-        }
+        Extractors are pure-Python regex work that holds the GIL, so only
+        processes make them faster; they pay off once a text is large
+        enough to outweigh shipping it to the workers. Threads are only
+        useful for extractors that release the GIL.
+        """
+        mode = self.extraction_mode
+        if mode == 'process' and self._in_pool_worker:
+            # Forking from inside a pool worker can deadlock
+            mode = 'serial'
+        if mode == 'auto':
+            parallel = (
+                len(text) >= self.parallel_min_chars and self.extraction_workers > 1
+                and (os.cpu_count() or 1) > 1 and not self._in_pool_worker
+            )
+            mode = 'process' if parallel else 'serial'
+        if mode not in ('thread', 'process'):
+            return None
+        return self._get_extraction_pool(mode)
+    
+    def _get_extraction_pool(self, mode: str) -> Executor:
+        """Return the shared extraction pool, creating it on first use."""
+        with self._extraction_pool_lock:
+            if self._extraction_pool is None:
+                if mode == 'thread' or multiprocessing.current_process().daemon:
+                    # Daemonic processes (multiprocessing.Pool workers) cannot spawn children
+                    self._extraction_pool = ThreadPoolExecutor(
+                        max_workers=self.extraction_workers, thread_name_prefix="nlp-extract"
+                    )
+                else:
+                    self._extraction_pool = ProcessPoolExecutor(max_workers=self.extraction_workers)
+            return self._extraction_pool
+    
+    def shutdown(self):
+        """Stop the extraction pool (it is recreated on next use)."""
+        with self._extraction_pool_lock:
+            if self._extraction_pool is not None:
+                self._extraction_pool.shutdown(wait=False, cancel_futures=True)
+                self._extraction_pool = None
+    
+    def _analyze_local(self, text: str, on_section: Optional[SectionCallback] = None) -> Dict[str, Any]:
+        """
+        Local regex-based analysis (fallback).
+        
+        Runs the extraction DAG (see _build_local_dag), on the extraction
+        pool for large texts. Every step is timed as its own nlp_* stage.
+        On a process pool the normalized text is published to shared
+        memory, so each worker receives it once rather than with every
+        step. on_section, if given, is called with each section as soon as
+        it is computed, from the calling thread.
+        """
+        def emit(name: str, value: Any):
+            if name in SECTIONS:
+                on_section(name, value, "local")
+        
+        pool = self._extraction_pool_for(text)
+        with timed("nlp_normalize"):
+            text = self._normalize_text(text)
+            if isinstance(pool, ProcessPoolExecutor):
+                text = SharedText.publish(text)
+        try:
+            results = self._local_dag.run(
+                {"text": text}, pool, on_result=emit if on_section is not None else None
+            )
+        finally:
+            if isinstance(text, SharedText):
+                text.close()
+        return {section: results[section] for section in SECTIONS}
         
     def _generate_expert_suggestions(self, doc_type: str, clauses: List[Dict], risk_score: int) -> Dict[str, List[str]]:
         """Generate expert legal suggestions based on document context."""
@@ -354,38 +664,41 @@ class NLPAnalyzer:
         text = text.replace(''', "'").replace(''', "'")
         return text.strip()
     
-    def _extract_clauses(self, text: str) -> List[Dict[str, str]]:
+    def _extract_clauses(self, text: str, sentence_index: Optional[SentenceIndex] = None) -> List[Dict[str, str]]:
         """Extract and classify clauses from the document."""
         clauses = []
         text_lower = text.lower()
         
-        # Split into sentences for analysis
-        sentences = self._split_sentences(text)
-        
-        for clause_type, patterns in self.CLAUSE_PATTERNS.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, text_lower)
-                for match in matches:
-                    # Find the sentence containing this match
-                    start_pos = match.start()
-                    containing_sentence = self._find_containing_sentence(text, start_pos, sentences)
+        # Sentence spans for locating matches
+        if sentence_index is None:
+            sentence_index = SentenceIndex(text)
+        
+        # One pass over the text collects match positions for every pattern
+        match_starts: List[List[int]] = [[] for _ in self._CLAUSE_PATTERN_TYPES]
+        for pattern_index, match in self._CLAUSE_MATCHER.finditer(text_lower):
+            match_starts[pattern_index].append(match.start())
+        
+        # Keep the first non-duplicate sentence per pattern, in pattern order
+        seen = set()
+        for pattern_index, clause_type in enumerate(self._CLAUSE_PATTERN_TYPES):
+            for start_pos in match_starts[pattern_index]:
+                # Find the sentence containing this match
+                containing_sentence = sentence_index.sentence_at(start_pos)
+                
+                # Avoid duplicates
+                if containing_sentence and containing_sentence[:50] not in seen:
+                    seen.add(containing_sentence[:50])
+                    
+                    # Determine risk level
+                    risk_level = self._assess_clause_risk(containing_sentence, clause_type)
                     
-                    if containing_sentence:
-                        # Determine risk level
-                        risk_level = self._assess_clause_risk(containing_sentence, clause_type)
-                        
-                        # Generate explanation
-                        explanation = self._explain_clause(clause_type, containing_sentence, risk_level)
-                        
-                        # Avoid duplicates
-                        if not any(c['content'][:50] == containing_sentence[:50] for c in clauses):
-                            clauses.append({
-                                "type": clause_type,
-                                "content": containing_sentence[:300],
-                                "riskLevel": risk_level,
-                                "explanation": explanation
-                            })
-                            break
+                    clauses.append({
+                        "type": clause_type,
+                        "content": containing_sentence[:300],
+                        "riskLevel": risk_level,
+                        "explanation": self._explain_clause(clause_type, containing_sentence, risk_level)
+                    })
+                    break
         
         # Ensure we have at least some clauses for demo
         if len(clauses) < 3:
@@ -395,39 +708,19 @@ class NLPAnalyzer:
     
     def _split_sentences(self, text: str) -> List[str]:
         """Split text into sentences."""
-        if NLTK_AVAILABLE:
-            try:
-                return sent_tokenize(text)
-            except Exception:
-                pass
-        
-        # Fallback: simple sentence splitting
-        sentences = re.split(r'(?<=[.!?])\s+', text)
-        return [s.strip() for s in sentences if s.strip()]
-    
-    def _find_containing_sentence(self, text: str, position: int, sentences: List[str]) -> Optional[str]:
-        """Find the sentence containing a given position."""
-        current_pos = 0
-        for sentence in sentences:
-            end_pos = current_pos + len(sentence)
-            if current_pos <= position <= end_pos:
-                return sentence
-            current_pos = end_pos + 1
-        return sentences[0] if sentences else None
+        return SentenceIndex(text).sentences
     
     def _assess_clause_risk(self, content: str, clause_type: str) -> str:
         """Assess the risk level of a clause."""
         content_lower = content.lower()
         
         # Check for high risk patterns
-        for pattern in self.HIGH_RISK_PATTERNS:
-            if re.search(pattern, content_lower):
-                return "high"
+        if self._HIGH_RISK_MATCHER.search(content_lower):
+            return "high"
         
         # Check for medium risk patterns
-        for pattern in self.MEDIUM_RISK_PATTERNS:
-            if re.search(pattern, content_lower):
-                return "medium"
+        if self._MEDIUM_RISK_MATCHER.search(content_lower):
+            return "medium"
         
         # Clause type based risk
         high_risk_types = ['Non-Compete', 'Liability Limitation', 'Indemnification']
@@ -535,10 +828,13 @@ class NLPAnalyzer:
         
         return dates_info
     
-    def _extract_obligations(self, text: str) -> List[Dict[str, str]]:
+    def _extract_obligations(self, text: str, sentence_index: Optional[SentenceIndex] = None) -> List[Dict[str, str]]:
         """Extract obligations from the document."""
         obligations = []
         
+        if sentence_index is None:
+            sentence_index = SentenceIndex(text)
+        
         obligation_patterns = [
             (r'(provider|service provider|consultant)\s+(?:shall|agrees?\s+to|will)\s+([^.]+\.)', 'Service Provider'),
             (r'(client|customer|company)\s+(?:shall|agrees?\s+to|will)\s+([^.]+\.)', 'Client'),
@@ -549,7 +845,10 @@ class NLPAnalyzer:
         for pattern, party in obligation_patterns:
             matches = re.finditer(pattern, text, re.IGNORECASE)
             for match in matches:
-                obligation_text = match.group(2) if len(match.groups()) > 1 else match.group(1)
+                group = 2 if len(match.groups()) > 1 else 1
+                # Never let an obligation run past the end of its sentence
+                sentence_end = sentence_index.sentence_end(match.start())
+                obligation_text = match.group(group)[:max(sentence_end - match.start(group), 0)]
                 if len(obligation_text) > 20 and len(obligation_text) < 200:
                     obligations.append({
                         "party": party,
@@ -566,10 +865,13 @@ class NLPAnalyzer:
         
         return obligations[:5]
     
-    def _extract_penalties(self, text: str) -> List[Dict[str, str]]:
+    def _extract_penalties(self, text: str, sentence_index: Optional[SentenceIndex] = None) -> List[Dict[str, str]]:
         """Extract penalty clauses from the document."""
         penalties = []
         
+        if sentence_index is None:
+            sentence_index = SentenceIndex(text)
+        
         penalty_patterns = [
             r'(late\s+payment)[^.]*(\d+%[^.]*interest[^.]*\.)',
             r'(early\s+termination)[^.]*(?:require|result\s+in)[^.]*(\d+[^.]*(?:month|fee|penalty)[^.]*\.)',
@@ -580,6 +882,11 @@ class NLPAnalyzer:
         for pattern in penalty_patterns:
             matches = re.finditer(pattern, text, re.IGNORECASE)
             for match in matches:
+                # Penalties are confined to the sentence they start in
+                sentence_end = sentence_index.sentence_end(match.start())
+                if match.end() > sentence_end:
+                    continue
+                
                 condition = match.group(1).strip()
                 consequence = match.group(2).strip() if len(match.groups()) > 1 else "Penalty applies"
                 
@@ -633,20 +940,24 @@ class NLPAnalyzer:
     
     def _calculate_risk_score(self, text: str, clauses: List[Dict]) -> int:
         """Calculate overall risk score (0-100)."""
+        return self._clause_risk_score(self._risk_pattern_score(text), clauses)
+    
+    def _risk_pattern_score(self, text: str) -> int:
+        """Base risk score plus the points for risky wording (no clause input needed)."""
         score = 30  # Base score
         
         text_lower = text.lower()
         
         # Add points for high-risk patterns
-        for pattern in self.HIGH_RISK_PATTERNS:
-            if re.search(pattern, text_lower):
-                score += 10
+        score += 10 * len(self._HIGH_RISK_MATCHER.matching(text_lower))
         
         # Add points for medium-risk patterns
-        for pattern in self.MEDIUM_RISK_PATTERNS:
-            if re.search(pattern, text_lower):
-                score += 5
+        score += 5 * len(self._MEDIUM_RISK_MATCHER.matching(text_lower))
         
+        return score
+    
+    def _clause_risk_score(self, score: int, clauses: List[Dict]) -> int:
+        """Add clause risk levels to a pattern score and clamp it to 10-95."""
         # Add points based on clause risks
         for clause in clauses:
             if clause.get('riskLevel') == 'high':
@@ -782,3 +1093,24 @@ class NLPAnalyzer:
                 "Ensure all deliverables are clearly defined"
             ]
         }
+
+
+# One analyzer per pool worker process, created on first use
+_worker_analyzer: Optional[NLPAnalyzer] = None
+_worker_analyzer_lock = threading.Lock()
+
+
+def _get_worker_analyzer() -> NLPAnalyzer:
+    """
+    Return this process's analyzer, creating it once.
+
+    Unpickled NLPAnalyzer instances (and bound methods sent to a process
+    pool) resolve to it. It runs extraction serially, since a pool worker
+    must not fork a pool of its own.
+    """
+    global _worker_analyzer
+    with _worker_analyzer_lock:
+        if _worker_analyzer is None:
+            _worker_analyzer = NLPAnalyzer()
+            _worker_analyzer._in_pool_worker = True
+        return _worker_analyzer
@@ -3,16 +3,26 @@ OCR Processor Module
 Handles text extraction from images and PDFs using Tesseract OCR
 """
 
+import io
 import os
-from typing import Optional
+import re
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 import pytesseract
 from PIL import Image
 import cv2
 import numpy as np
 
+from image_preprocessor import ImagePreprocessor
+from metrics import capture, replay, timed
+from tesseract_engine import create_engine
+
 # Try to import PDF processing libraries
 try:
-    from pdf2image import convert_from_path
+    from pdf2image import convert_from_bytes, convert_from_path, pdfinfo_from_path
     PDF_SUPPORT = True
 except ImportError:
     PDF_SUPPORT = False
@@ -24,9 +34,53 @@ except ImportError:
     PYPDF_SUPPORT = False
 
 
+# Called as progress(pages_done, pages_total) while a scanned PDF is OCR'd
+PageProgress = Callable[[int, int], None]
+
+_WORD = re.compile(r"\S+")
+_VALID_WORD = re.compile(r"^[(\[\"']*(?:[A-Za-z][A-Za-z'\-]*|\d[\d,./\-]*|[A-Za-z]\.)[)\]\"'.,;:!?%]*$")
+_GARBAGE_CHAR = re.compile(r"[^\w\s.,;:!?'\"()\[\]{}\-\u2010-\u2027/\\&%$#@*+=<>§¶₹€£]")
+
+
+def score_text_layer(text: str) -> Dict[str, float]:
+    """
+    Score a page's embedded text layer.
+
+    Returns the number of non-space characters, the share of characters
+    that are not letters, digits, whitespace or common punctuation
+    (broken encodings, (cid:N) glyph codes), and the share of tokens that
+    look like real words or numbers.
+    """
+    stripped = "".join(text.split())
+    chars = len(stripped)
+    if not chars:
+        return {"chars": 0, "garbageRatio": 1.0, "wordRatio": 0.0}
+
+    garbage = len(_GARBAGE_CHAR.findall(stripped)) + 5 * text.count("(cid:")
+    words = _WORD.findall(text)
+    valid = sum(1 for word in words if _VALID_WORD.match(word))
+
+    return {
+        "chars": chars,
+        "garbageRatio": min(garbage / chars, 1.0),
+        "wordRatio": valid / len(words) if words else 0.0
+    }
+
+
 class OCRProcessor:
     """Handles OCR processing for legal documents."""
     
+    # Rendering resolution for scanned PDF pages
+    PDF_DPI = 300
+    
+    # OCR configuration for legal documents
+    TESSERACT_CONFIG = r'--oem 3 --psm 6 -l eng'
+    
+    # A page's text layer is used as-is when it passes all of these
+    TEXT_LAYER_MIN_CHARS = 40
+    TEXT_LAYER_MAX_GARBAGE = 0.1
+    TEXT_LAYER_MIN_WORDS = 0.6
+    
     def __init__(self):
         """Initialize OCR processor with Tesseract configuration."""
         # Set Tesseract path if on Windows
@@ -34,146 +88,333 @@ class OCRProcessor:
         if tesseract_path and os.path.exists(tesseract_path):
             pytesseract.pytesseract.tesseract_cmd = tesseract_path
         
-        self._available = self._check_tesseract()
-    
-    def _check_tesseract(self) -> bool:
-        """Check if Tesseract is available."""
-        try:
-            pytesseract.get_tesseract_version()
-            return True
-        except Exception:
-            return False
+        self.preprocessor = ImagePreprocessor()
+        
+        # Page-level parallelism for scanned PDFs
+        self.page_workers = max(int(os.getenv('OCR_PAGE_WORKERS', os.cpu_count() or 2)), 1)
+        self.page_chunk_size = max(int(os.getenv('OCR_PAGE_CHUNK', self.page_workers * 2)), 1)
+        
+        # Persistent Tesseract handles when tesserocr is installed, one per
+        # page worker thread (process workers each build their own)
+        self.engine = create_engine(
+            self.TESSERACT_CONFIG,
+            int(os.getenv('OCR_ENGINE_HANDLES', self.page_workers)),
+            self.PDF_DPI
+        )
+        self._available = self.engine.is_available()
+        self._page_pool: Optional[Executor] = None
+        self._page_pool_lock = threading.Lock()
     
     def is_available(self) -> bool:
         """Return whether OCR is available."""
         return self._available
     
-    def preprocess_image(self, image_path: str) -> np.ndarray:
+    def preprocess_image(self, image: Union[str, bytes, np.ndarray]) -> np.ndarray:
         """
         Preprocess image for better OCR accuracy.
         
+        Accepts a file path, encoded image bytes, or an already decoded array
+        (grayscale, or RGB as produced by pdf2image), so uploads and rendered
+        PDF pages skip the disk round trip.
+        
         Steps:
         1. Convert to grayscale
-        2. Apply adaptive thresholding
-        3. Remove noise
-        4. Deskew if needed
-        """
-        # Read image
-        img = cv2.imread(image_path)
-        
-        if img is None:
-            raise ValueError(f"Could not read image: {image_path}")
-        
-        # Convert to grayscale
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Apply Gaussian blur to reduce noise
-        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-        
-        # Apply adaptive thresholding
-        thresh = cv2.adaptiveThreshold(
-            blurred, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY,
-            11, 2
-        )
+        2. Rescale so text is the height Tesseract reads best
+        3. Reduce noise and apply adaptive thresholding
         
-        # Noise removal with morphological operations
-        kernel = np.ones((1, 1), np.uint8)
-        processed = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        processed = cv2.morphologyEx(processed, cv2.MORPH_OPEN, kernel)
+        See ImagePreprocessor for the details.
+        """
+        return self._preprocess_scaled(image)[0]
+    
+    def _preprocess_scaled(self, image: Union[str, bytes, np.ndarray]) -> Tuple[np.ndarray, float]:
+        """preprocess_image() plus the resize factor it applied (for the engine's DPI)."""
+        if isinstance(image, np.ndarray):
+            gray = image if image.ndim == 2 else cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        elif isinstance(image, (bytes, bytearray, memoryview)):
+            # Decode straight from the upload buffer
+            gray = cv2.imdecode(np.frombuffer(image, np.uint8), cv2.IMREAD_GRAYSCALE)
+            
+            if gray is None:
+                raise ValueError("Could not decode image data")
+        else:
+            # Read image straight into grayscale
+            gray = cv2.imread(image, cv2.IMREAD_GRAYSCALE)
+            
+            if gray is None:
+                raise ValueError(f"Could not read image: {image}")
         
-        return processed
+        return self.preprocessor.preprocess_scaled(gray)
     
-    def extract_text_from_image(self, image_path: str) -> str:
-        """Extract text from an image file using Tesseract."""
+    def extract_text_from_image(self, image: Union[str, bytes]) -> str:
+        """Extract text from an image file or encoded image bytes using Tesseract."""
         try:
             # Preprocess image
-            processed_img = self.preprocess_image(image_path)
-            
-            # Convert numpy array to PIL Image
-            pil_image = Image.fromarray(processed_img)
-            
-            # OCR configuration for legal documents
-            custom_config = r'--oem 3 --psm 6 -l eng'
-            
-            # Extract text
-            text = pytesseract.image_to_string(pil_image, config=custom_config)
-            
-            return text.strip()
-            
+            with timed("opencv_preprocess"):
+                processed_img, scale = self._preprocess_scaled(image)
         except Exception as e:
-            print(f"OCR error: {str(e)}")
-            # Try without preprocessing
+            print(f"OCR preprocessing error: {str(e)}")
+            # Formats OpenCV cannot decode go to Tesseract as Pillow reads them
             try:
-                img = Image.open(image_path)
-                text = pytesseract.image_to_string(img)
-                return text.strip()
+                img = Image.open(io.BytesIO(image) if isinstance(image, bytes) else image)
+                processed_img, scale = np.asarray(img.convert("L")), 1.0
             except Exception:
                 return ""
+        
+        # A Tesseract failure is not retried; it would fail the same way
+        try:
+            with timed("tesseract_page"):
+                return self.engine.image_to_string(processed_img, scale).strip()
+        except Exception as e:
+            print(f"OCR error: {str(e)}")
+            return ""
     
-    def extract_text_from_pdf(self, pdf_path: str) -> str:
-        """Extract text from a PDF file."""
-        text = ""
+    def extract_text_from_pdf(self, pdf: Union[str, bytes],
+                              progress: Optional[PageProgress] = None) -> str:
+        """
+        Extract text from a PDF file path or in-memory PDF bytes.
         
-        # Try PyPDF2 first (for text-based PDFs)
-        if PYPDF_SUPPORT:
-            try:
-                with open(pdf_path, 'rb') as file:
-                    reader = PyPDF2.PdfReader(file)
-                    for page in reader.pages:
-                        page_text = page.extract_text()
-                        if page_text:
-                            text += page_text + "\n"
-                
-                # If we got meaningful text, return it
-                if len(text.strip()) > 100:
-                    return text.strip()
-            except Exception as e:
-                print(f"PyPDF2 error: {str(e)}")
+        Each page's embedded text layer is scored; only pages whose text
+        layer is missing or unusable are rendered and OCR'd. Results are
+        merged in page order.
+        """
+        page_texts = self._read_text_layer(pdf)
+        
+        if page_texts is None:
+            # No readable text layer: OCR everything
+            ocr_pages = None
+        else:
+            ocr_pages = [
+                number for number, page_text in enumerate(page_texts, start=1)
+                if not self.has_usable_text_layer(page_text)
+            ]
+            if ocr_pages:
+                print(f"[OCR] {len(ocr_pages)}/{len(page_texts)} PDF pages need OCR")
         
-        # Fall back to OCR for scanned PDFs
-        if PDF_SUPPORT:
+        if (ocr_pages is None or ocr_pages) and PDF_SUPPORT and self._available:
             try:
-                # Convert PDF pages to images
-                images = convert_from_path(pdf_path, dpi=300)
-                
-                for i, image in enumerate(images):
-                    # Save temporary image
-                    temp_path = f"{pdf_path}_page_{i}.png"
-                    image.save(temp_path, 'PNG')
-                    
-                    try:
-                        # Extract text from image
-                        page_text = self.extract_text_from_image(temp_path)
-                        text += page_text + "\n\n"
-                    finally:
-                        # Clean up temp file
-                        if os.path.exists(temp_path):
-                            os.remove(temp_path)
-                
-                return text.strip()
+                ocr_texts = self._ocr_pdf_pages(pdf, ocr_pages, progress)
+                if page_texts is None:
+                    page_texts = ocr_texts
+                else:
+                    for number, ocr_text in zip(ocr_pages, ocr_texts):
+                        # Keep a weak text layer rather than nothing
+                        if ocr_text.strip():
+                            page_texts[number - 1] = ocr_text
                 
             except Exception as e:
                 print(f"PDF to image error: {str(e)}")
         
-        return text.strip() if text else ""
+        return "\n\n".join(t.strip() for t in (page_texts or []) if t.strip())
+    
+    def has_usable_text_layer(self, page_text: str) -> bool:
+        """Return whether a page's embedded text is good enough to skip OCR."""
+        score = score_text_layer(page_text or "")
+        return (
+            score["chars"] >= self.TEXT_LAYER_MIN_CHARS
+            and score["garbageRatio"] <= self.TEXT_LAYER_MAX_GARBAGE
+            and score["wordRatio"] >= self.TEXT_LAYER_MIN_WORDS
+        )
+    
+    def _read_text_layer(self, pdf: Union[str, bytes]) -> Optional[List[str]]:
+        """Return each page's embedded text, or None if the PDF cannot be read."""
+        if not PYPDF_SUPPORT:
+            return None
+        
+        try:
+            with timed("pypdf_text_layer"), self._open_pdf(pdf) as file:
+                reader = PyPDF2.PdfReader(file)
+                page_texts = []
+                for page in reader.pages:
+                    try:
+                        page_texts.append(page.extract_text() or "")
+                    except Exception:
+                        page_texts.append("")
+                return page_texts
+        except Exception as e:
+            print(f"PyPDF2 error: {str(e)}")
+            return None
+    
+    def extract_text_from_array(self, image: np.ndarray) -> str:
+        """Extract text from a decoded page image (no temp files)."""
+        try:
+            with timed("opencv_preprocess"):
+                processed_img, scale = self._preprocess_scaled(image)
+            with timed("tesseract_page"):
+                return self.engine.image_to_string(processed_img, scale).strip()
+        except Exception as e:
+            print(f"OCR error: {str(e)}")
+            return ""
     
-    def extract_text(self, file_path: str, file_type: str) -> str:
+    def shutdown(self):
+        """Stop the page pool and release Tesseract handles (both are recreated on next use)."""
+        with self._page_pool_lock:
+            if self._page_pool is not None:
+                self._page_pool.shutdown(wait=True)
+                self._page_pool = None
+        self.engine.close()
+    
+    def _get_page_pool(self) -> Executor:
+        """Return the shared page pool, creating it on first use."""
+        with self._page_pool_lock:
+            if self._page_pool is None:
+                if multiprocessing.current_process().daemon:
+                    # Daemonic processes cannot spawn children
+                    self._page_pool = ThreadPoolExecutor(max_workers=self.page_workers)
+                else:
+                    self._page_pool = ProcessPoolExecutor(max_workers=self.page_workers)
+            return self._page_pool
+    
+    @staticmethod
+    def _open_pdf(pdf: Union[str, bytes]):
+        """Open a PDF path, or wrap PDF bytes without copying them."""
+        return io.BytesIO(pdf) if isinstance(pdf, bytes) else open(pdf, 'rb')
+    
+    def _count_pdf_pages(self, pdf: Union[str, bytes]) -> int:
+        """Return the number of pages in a PDF."""
+        if isinstance(pdf, bytes) and PYPDF_SUPPORT:
+            # Avoid pdfinfo_from_bytes, which writes a temporary copy
+            return len(PyPDF2.PdfReader(io.BytesIO(pdf)).pages)
+        try:
+            return int(pdfinfo_from_path(pdf)["Pages"])
+        except Exception:
+            if PYPDF_SUPPORT:
+                with self._open_pdf(pdf) as file:
+                    return len(PyPDF2.PdfReader(file).pages)
+            raise
+    
+    def _page_runs(self, pages: List[int]) -> Iterator[tuple]:
+        """Group sorted page numbers into consecutive runs of at most page_chunk_size."""
+        first = last = None
+        for number in pages:
+            if first is not None and number == last + 1 and number - first < self.page_chunk_size:
+                last = number
+                continue
+            if first is not None:
+                yield first, last
+            first = last = number
+        if first is not None:
+            yield first, last
+    
+    def _render_pdf_pages(self, pdf: Union[str, bytes], pages: List[int]) -> Iterator[np.ndarray]:
+        """
+        Lazily render the given PDF pages (1-based, sorted) as grayscale arrays.
+        
+        Consecutive pages are rasterized in chunks of page_chunk_size via
+        first_page/last_page, so only one chunk is decoded at a time.
+        """
+        convert = convert_from_bytes if isinstance(pdf, bytes) else convert_from_path
+        for first, last in self._page_runs(pages):
+            with timed("pdf2image_rasterize"):
+                images = convert(
+                    pdf,
+                    dpi=self.PDF_DPI,
+                    first_page=first,
+                    last_page=last,
+                    grayscale=True
+                )
+            for image in images:
+                yield np.asarray(image)
+            del images
+    
+    def _ocr_pdf_pages(self, pdf: Union[str, bytes], pages: Optional[List[int]] = None,
+                       progress: Optional[PageProgress] = None) -> list:
+        """
+        OCR pages of a scanned PDF in parallel (all pages if none are given).
+        
+        Rendering streams ahead of OCR, but at most two chunks of pages are
+        held in memory; results are returned in page order, and progress
+        (if given) is called as each page completes.
+        """
+        if pages is None:
+            pages = list(range(1, self._count_pdf_pages(pdf) + 1))
+        page_count = len(pages)
+        pool = self._get_page_pool()
+        max_pending = self.page_chunk_size * 2
+        
+        page_texts = []
+        pending = deque()
+        
+        def collect():
+            text, observations = pending.popleft().result()
+            replay(observations)
+            page_texts.append(text)
+            if progress is not None:
+                progress(len(page_texts), page_count)
+        
+        for page in self._render_pdf_pages(pdf, pages):
+            pending.append(pool.submit(ocr_page_in_worker, page))
+            while len(pending) >= max_pending:
+                collect()
+        
+        while pending:
+            collect()
+        
+        return page_texts
+    
+    def extract_text(self, source: Union[str, bytes], file_type: str,
+                     progress: Optional[PageProgress] = None) -> str:
         """
         Extract text from a file based on its type.
         
         Args:
-            file_path: Path to the file
+            source: Path to the file, or the file contents in memory
             file_type: Type of file ('pdf', 'image', etc.)
+            progress: Optional per-page callback for scanned PDFs
             
         Returns:
             Extracted text content
         """
+        if file_type == 'pdf':
+            # Text layers are readable without Tesseract
+            return self.extract_text_from_pdf(source, progress)
+        
         if not self._available:
             return ""
         
-        if file_type == 'pdf':
-            return self.extract_text_from_pdf(file_path)
-        else:
-            return self.extract_text_from_image(file_path)
+        return self.extract_text_from_image(source)
+
+
+# Per-process processor used by worker pools
+_worker_processor: Optional[OCRProcessor] = None
+_worker_processor_lock = threading.Lock()
+
+
+def _get_worker_processor() -> OCRProcessor:
+    """Return this process's OCRProcessor, creating it once."""
+    global _worker_processor
+    with _worker_processor_lock:
+        if _worker_processor is None:
+            _worker_processor = OCRProcessor()
+        return _worker_processor
+
+
+def shutdown_worker_processor():
+    """Shut down this process's worker OCRProcessor, if one was built."""
+    with _worker_processor_lock:
+        processor = _worker_processor
+    if processor is not None:
+        processor.shutdown()
+
+
+def extract_text_in_worker(source: Union[str, bytes], file_type: str,
+                           progress: Optional[PageProgress] = None) -> str:
+    """
+    Extract text from a file path or in-memory document inside a pool worker.
+
+    Module-level so it can be pickled for process pools; each worker
+    process builds its own OCRProcessor once and reuses it (thread pools
+    should call the service's shared processor directly instead). A progress callback
+    only works with thread pools, since it cannot be pickled.
+    """
+    return _get_worker_processor().extract_text(source, file_type, progress)
+
+
+def ocr_page_in_worker(page: np.ndarray) -> tuple:
+    """
+    OCR a single rendered page inside a page pool worker.
+
+    Returns (text, stage timings) so the timings survive a process boundary.
+    """
+    with capture() as observations:
+        text = _get_worker_processor().extract_text_from_array(page)
+    return text, observations
@@ -0,0 +1,221 @@
+"""
+Profiling Module
+Opt-in sampling profiler for individual requests, stored as collapsed stacks
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import asyncio
+import threading
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Any, AsyncIterator, Dict, Optional
+
+# Profiling is off unless explicitly enabled; requests then opt in individually
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0") == "1"
+
+_PROFILE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+# Leaf frames in these modules are threads blocked waiting for work
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py", "thread.py", "connection.py")
+
+
+def profiling_requested(headers, query_params) -> bool:
+    """Whether a request asked to be profiled (X-Profile header or ?profile=)."""
+    flag = headers.get("x-profile") or query_params.get("profile") or ""
+    return flag.lower() in ("1", "true", "yes")
+
+
+def _frame_label(code) -> str:
+    """Render a code object as 'function (file.py:line)'."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Samples the stacks of every thread at a fixed interval.
+
+    The analysis pipeline spans the event loop and the stage worker
+    threads, so a tracing profiler on one thread would miss most of the
+    work. Each sample is rooted at the thread name; idle threads (blocked
+    in a queue, lock or selector) are skipped. Work running in process
+    pools is not visible. Concurrent requests share the worker threads, so
+    profiles are clearest when taken with little other traffic.
+    """
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self.sample_count = 0
+        self.started = 0.0
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Start sampling in a background thread."""
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling and wait for the sampler thread."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.duration = time.perf_counter() - self.started
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if os.path.basename(frame.f_code.co_filename) in _IDLE_MODULES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                self.samples[";".join(reversed(stack))] += 1
+            self.sample_count += 1
+
+    def collapsed(self) -> str:
+        """Return samples in collapsed-stack format ('a;b;c count' per line)."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+def collapsed_to_speedscope(collapsed: str, name: str, interval: float) -> Dict[str, Any]:
+    """Convert collapsed stacks into a speedscope 'sampled' profile."""
+    frames: Dict[str, int] = {}
+    samples = []
+    weights = []
+    for line in collapsed.splitlines():
+        stack, _, count = line.rpartition(" ")
+        if not stack:
+            continue
+        samples.append([frames.setdefault(frame, len(frames)) for frame in stack.split(";")])
+        weights.append(int(count) * interval)
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": name,
+        "exporter": "legal-ai-service",
+        "shared": {"frames": [{"name": frame} for frame in frames]},
+        "profiles": [{
+            "type": "sampled",
+            "name": name,
+            "unit": "seconds",
+            "startValue": 0,
+            "endValue": sum(weights),
+            "samples": samples,
+            "weights": weights
+        }]
+    }
+
+
+class ProfileStore:
+    """
+    Runs profiled requests and keeps their profiles on disk.
+
+    Each profile is stored as <id>.folded (collapsed stacks) plus
+    <id>.json (metadata); only the newest PROFILES_MAX profiles are kept.
+    One request is profiled at a time; while a profile is being taken,
+    other requests asking for one run unprofiled.
+    """
+
+    def __init__(self, profiles_dir: Optional[str] = None, enabled: Optional[bool] = None):
+        self.enabled = PROFILING_ENABLED if enabled is None else enabled
+        self.profiles_dir = profiles_dir or os.getenv("PROFILES_DIR", "profiles")
+        self.interval = float(os.getenv("PROFILE_INTERVAL_SECONDS", 0.005))
+        self.max_profiles = max(int(os.getenv("PROFILES_MAX", 50)), 1)
+        self._busy = threading.Lock()
+
+    @asynccontextmanager
+    async def session(self, label: str, requested: bool) -> AsyncIterator[Optional[str]]:
+        """
+        Profile the body of an async with-block if requested and enabled.
+
+        Yields the profile id, or None when the block is not profiled.
+        """
+        if not (self.enabled and requested) or not self._busy.acquire(blocking=False):
+            yield None
+            return
+
+        profile_id = uuid.uuid4().hex
+        profiler = SamplingProfiler(self.interval)
+        profiler.start()
+        try:
+            yield profile_id
+        finally:
+            await asyncio.to_thread(profiler.stop)
+            self._busy.release()
+            await asyncio.to_thread(self._save, profile_id, label, profiler)
+
+    def _path(self, profile_id: str, extension: str) -> str:
+        return os.path.join(self.profiles_dir, f"{profile_id}.{extension}")
+
+    def _save(self, profile_id: str, label: str, profiler: SamplingProfiler):
+        """Write a finished profile and drop the oldest ones past the limit."""
+        try:
+            os.makedirs(self.profiles_dir, exist_ok=True)
+            with open(self._path(profile_id, "folded"), "w", encoding="utf-8") as f:
+                f.write(profiler.collapsed())
+            with open(self._path(profile_id, "json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "id": profile_id,
+                    "label": label,
+                    "createdAt": datetime.now().isoformat(),
+                    "durationSeconds": round(profiler.duration, 4),
+                    "intervalSeconds": profiler.interval,
+                    "samples": profiler.sample_count
+                }, f)
+            print(f"[PROFILE] Saved profile {profile_id} for {label} ({profiler.sample_count} samples)")
+            self._purge()
+        except OSError as e:
+            print(f"WARNING: Could not save profile {profile_id}: {e}")
+
+    def _purge(self):
+        """Keep only the newest max_profiles profiles."""
+        metadata = sorted(
+            (entry for entry in os.scandir(self.profiles_dir) if entry.name.endswith(".json")),
+            key=lambda entry: entry.stat().st_mtime,
+            reverse=True
+        )
+        for entry in metadata[self.max_profiles:]:
+            profile_id = entry.name[:-len(".json")]
+            for extension in ("json", "folded"):
+                try:
+                    os.remove(self._path(profile_id, extension))
+                except FileNotFoundError:
+                    pass
+
+    def get(self, profile_id: str, output_format: str = "collapsed") -> Optional[Any]:
+        """
+        Load a stored profile.
+
+        Returns the collapsed-stack text, a speedscope document
+        (output_format="speedscope"), or None if there is no such profile.
+        """
+        if not _PROFILE_ID.match(profile_id):
+            return None
+        try:
+            with open(self._path(profile_id, "folded"), encoding="utf-8") as f:
+                collapsed = f.read()
+            with open(self._path(profile_id, "json"), encoding="utf-8") as f:
+                metadata = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if output_format == "speedscope":
+            return collapsed_to_speedscope(
+                collapsed, f"{metadata['label']} ({profile_id})", metadata["intervalSeconds"]
+            )
+        return collapsed
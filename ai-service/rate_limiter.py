@@ -0,0 +1,237 @@
+"""
+Rate Limiter Module
+Token-bucket rate limiting with a fair queue, and coalescing of identical LLM calls
+"""
+
+import os
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+
+def _env_rate(name: str, default: float) -> float:
+    """Read a per-minute rate from the environment (0 disables the limit)."""
+    try:
+        value = float(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value >= 0 else default
+
+
+def _percentile(values, fraction: float) -> float:
+    """Nearest-rank percentile of a sequence (0.0 if empty)."""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(int(fraction * len(ordered)), len(ordered) - 1)]
+
+
+class TokenBucket:
+    """A bucket refilled continuously at `per_minute`, holding at most one minute's worth."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` can be taken (requests larger than the bucket wait for a full one)."""
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        """Remove `amount` (may go negative for oversized requests)."""
+        self._refill()
+        self.level -= amount
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute limits for one provider.
+
+    Callers wait in a fair queue: each fairness key (e.g. a document) has
+    its own FIFO and keys are served round-robin, so one long document split
+    into many chunks cannot starve other uploads. A single dispatcher task
+    releases waiters as the buckets allow. A 429 from the provider pauses
+    the queue for its Retry-After via throttle().
+    """
+
+    def __init__(self, name: str, requests_per_minute: float = 0, tokens_per_minute: float = 0):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._queues: "OrderedDict[str, Deque[Tuple[float, asyncio.Future]]]" = OrderedDict()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._paused_until = 0.0
+        self._waits: Deque[float] = deque(maxlen=1024)
+        self._wait_count = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @classmethod
+    def from_env(cls, name: str, default_rpm: float, default_tpm: float) -> "RateLimiter":
+        """Build a limiter from <NAME>_RPM and <NAME>_TPM."""
+        prefix = name.upper()
+        return cls(
+            name,
+            _env_rate(f"{prefix}_RPM", default_rpm),
+            _env_rate(f"{prefix}_TPM", default_tpm)
+        )
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any limit is configured."""
+        return self.requests is not None or self.tokens is not None
+
+    async def acquire(self, tokens: float = 0, key: str = "") -> float:
+        """Wait for capacity for one request of ~`tokens` tokens; returns the wait in seconds."""
+        if not self.enabled:
+            return 0.0
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        enqueued = time.monotonic()
+        self._queues.setdefault(key, deque()).append((tokens, future))
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            queue = self._queues.get(key)
+            if queue is not None:
+                for entry in list(queue):
+                    if entry[1] is future:
+                        queue.remove(entry)
+                if not queue:
+                    del self._queues[key]
+            raise
+
+        waited = time.monotonic() - enqueued
+        self._waits.append(waited)
+        self._wait_count += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return waited
+
+    def throttle(self, seconds: float):
+        """Hold all waiters for `seconds` (the provider asked us to back off)."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def _dispatch(self):
+        """Release queued waiters round-robin as capacity becomes available."""
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            tokens, future = queue[0]
+
+            if future.done():
+                # Cancelled while waiting
+                queue.popleft()
+                if not queue:
+                    del self._queues[key]
+                continue
+
+            delay = max(
+                self._paused_until - time.monotonic(),
+                self.requests.wait_time(1) if self.requests else 0.0,
+                self.tokens.wait_time(tokens) if self.tokens else 0.0
+            )
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+            queue.popleft()
+            future.set_result(None)
+
+            # Round-robin: this key goes to the back of the line
+            del self._queues[key]
+            if queue:
+                self._queues[key] = queue
+
+    def stats(self) -> Dict[str, Any]:
+        """Return limits, queue depth and queue wait statistics."""
+        recent = list(self._waits)
+        return {
+            "requestsPerMinute": self.requests.capacity if self.requests else None,
+            "tokensPerMinute": self.tokens.capacity if self.tokens else None,
+            "queued": sum(len(queue) for queue in self._queues.values()),
+            "queueWait": {
+                "count": self._wait_count,
+                "totalSeconds": round(self._wait_total, 4),
+                "meanSeconds": round(self._wait_total / self._wait_count, 4) if self._wait_count else 0.0,
+                "p50Seconds": round(_percentile(recent, 0.50), 4),
+                "p95Seconds": round(_percentile(recent, 0.95), 4),
+                "maxSeconds": round(self._wait_max, 4)
+            }
+        }
+
+
+class Coalescer:
+    """
+    Shares one upstream call among identical concurrent requests.
+
+    The first caller for a key starts the call as its own task; later
+    callers with the same key await the same result. The task is only
+    cancelled when every caller waiting on it has been cancelled.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, Tuple[asyncio.Task, list]] = {}
+        self.calls = 0
+        self.coalesced = 0
+
+    async def run(self, key: Optional[str], factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run factory() once per in-flight key and return its result."""
+        if key is None:
+            return await factory()
+
+        entry = self._inflight.get(key)
+        if entry is None:
+            self.calls += 1
+            task = asyncio.ensure_future(factory())
+            entry = (task, [0])
+            self._inflight[key] = entry
+            task.add_done_callback(lambda _, key=key, task=task: self._forget(key, task))
+        else:
+            self.coalesced += 1
+
+        task, waiters = entry
+        waiters[0] += 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if not task.done() and waiters[0] == 1:
+                task.cancel()
+            raise
+        finally:
+            waiters[0] -= 1
+
+    def _forget(self, key: str, task: asyncio.Task):
+        """Drop a finished call from the in-flight table."""
+        entry = self._inflight.get(key)
+        if entry is not None and entry[0] is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            # Mark the outcome as retrieved; waiters re-raise it themselves
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return upstream call and coalescing counters."""
+        return {
+            "inflight": len(self._inflight),
+            "upstreamCalls": self.calls,
+            "coalesced": self.coalesced
+        }
@@ -0,0 +1,181 @@
+"""
+Result Cache Module
+Content-addressed cache for document analysis results
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class AnalysisCache:
+    """
+    Two-tier cache for analysis results keyed by document hash.
+
+    Tiers:
+    1. In-process LRU (ANALYSIS_CACHE_SIZE entries)
+    2. Optional SQLite store (ANALYSIS_CACHE_DB path) with TTL and
+       size-based eviction (ANALYSIS_CACHE_MAX_BYTES)
+
+    Keys combine the SHA-256 of the raw document bytes with an analyzer
+    version string, so upgrading a model invalidates old entries.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        db_path: Optional[str] = None,
+        ttl_seconds: Optional[float] = None,
+        max_disk_bytes: Optional[int] = None
+    ):
+        """Initialize cache tiers from arguments or environment."""
+        self.max_entries = max_entries or int(os.getenv('ANALYSIS_CACHE_SIZE', 256))
+        self.ttl_seconds = ttl_seconds or float(os.getenv('ANALYSIS_CACHE_TTL', 7 * 24 * 3600))
+        self.max_disk_bytes = max_disk_bytes or int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+        self.db_path = db_path or os.getenv('ANALYSIS_CACHE_DB')
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        self._stats = {
+            "memoryHits": 0,
+            "diskHits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0
+        }
+
+        if self.db_path:
+            try:
+                self._db = sqlite3.connect(self.db_path, check_same_thread=False)
+                self._db.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS analysis_cache (
+                        key TEXT PRIMARY KEY,
+                        value TEXT NOT NULL,
+                        size INTEGER NOT NULL,
+                        created_at REAL NOT NULL,
+                        accessed_at REAL NOT NULL
+                    )
+                    """
+                )
+                self._db.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_cache_accessed ON analysis_cache (accessed_at)"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"WARNING: Analysis cache disk tier disabled: {e}")
+                self._db = None
+
+    @staticmethod
+    def key_for_digest(digest: str, version: str) -> str:
+        """Build a cache key from a precomputed SHA-256 hex digest."""
+        return f"{digest}:{version}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return a cached result or None."""
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memoryHits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value_json, created_at = row
+                    if created_at + self.ttl_seconds > now:
+                        self._db.execute(
+                            "UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key)
+                        )
+                        self._db.commit()
+                        value = json.loads(value_json)
+                        self._remember(key, value, created_at + self.ttl_seconds)
+                        self._stats["diskHits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]):
+        """Store a result in all tiers."""
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, value, now + self.ttl_seconds)
+            self._stats["stores"] += 1
+
+            if self._db is not None:
+                value_json = json.dumps(value)
+                self._db.execute(
+                    """
+                    INSERT OR REPLACE INTO analysis_cache (key, value, size, created_at, accessed_at)
+                    VALUES (?, ?, ?, ?, ?)
+                    """,
+                    (key, value_json, len(value_json), now, now)
+                )
+                self._evict_disk(now)
+                self._db.commit()
+
+    def _remember(self, key: str, value: Dict[str, Any], expires_at: float):
+        """Insert into the memory tier, evicting least recently used entries."""
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    def _evict_disk(self, now: float):
+        """Drop expired rows, then least recently used rows until under the size limit."""
+        self._db.execute(
+            "DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,)
+        )
+
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM analysis_cache").fetchone()[0]
+        if total <= self.max_disk_bytes:
+            return
+
+        rows = self._db.execute(
+            "SELECT key, size FROM analysis_cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        for key, size in rows:
+            if total <= self.max_disk_bytes:
+                break
+            self._db.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+            total -= size
+            self._stats["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memoryEntries"] = len(self._memory)
+            lookups = stats["memoryHits"] + stats["diskHits"] + stats["misses"]
+            stats["hitRate"] = round((stats["memoryHits"] + stats["diskHits"]) / lookups, 4) if lookups else 0.0
+
+            if self._db is not None:
+                count, size = self._db.execute(
+                    "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analysis_cache"
+                ).fetchone()
+                stats["diskEntries"] = count
+                stats["diskBytes"] = size
+            else:
+                stats["diskEntries"] = None
+                stats["diskBytes"] = None
+
+        return stats
@@ -0,0 +1,130 @@
+"""
+Sentence Index Module
+Offset-accurate sentence spans shared by the NLP and ML extractors
+"""
+
+import re
+from bisect import bisect_right
+from typing import Iterator, List, Optional, Tuple
+
+from lazy_init import module_available
+
+# nltk is slow to import; it is only loaded when the tokenizer is first needed
+NLTK_AVAILABLE = module_available("nltk")
+
+
+_SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+
+# Cached Punkt tokenizer; False once loading has failed
+_punkt_tokenizer = None
+
+
+def _get_punkt_tokenizer(retry: bool = False):
+    """
+    Load the pretrained English Punkt tokenizer once, or return None.
+    
+    A failed load is remembered; pass retry=True (e.g. after downloading
+    NLTK data) to try again.
+    """
+    global _punkt_tokenizer
+    if _punkt_tokenizer is None or (retry and _punkt_tokenizer is False):
+        _punkt_tokenizer = False
+        if NLTK_AVAILABLE:
+            import nltk
+            try:
+                # NLTK >= 3.8.2 ships punkt_tab
+                from nltk.tokenize import PunktTokenizer
+                _punkt_tokenizer = PunktTokenizer()
+            except Exception:
+                try:
+                    _punkt_tokenizer = nltk.data.load('tokenizers/punkt/english.pickle')
+                except Exception:
+                    pass
+    return _punkt_tokenizer or None
+
+
+class SentenceIndex:
+    """
+    Sentence spans for a document, built once and queried by position.
+
+    Spans are true character offsets into the original text (from Punkt's
+    span_tokenize, or a regex split when NLTK data is unavailable), so
+    lookups never drift when the tokenizer drops whitespace.
+    """
+
+    def __init__(self, text: str):
+        """Tokenize the text into sentence spans."""
+        self.text = text
+        self.spans: List[Tuple[int, int]] = self._tokenize_spans(text)
+        self._starts = [start for start, _ in self.spans]
+
+    @staticmethod
+    def _tokenize_spans(text: str) -> List[Tuple[int, int]]:
+        """Return (start, end) offsets of each non-empty sentence."""
+        tokenizer = _get_punkt_tokenizer()
+        if tokenizer is not None:
+            try:
+                return list(tokenizer.span_tokenize(text))
+            except Exception:
+                pass
+
+        # Fallback: simple sentence splitting
+        spans = []
+        cursor = 0
+        for separator in _SENTENCE_BREAK.finditer(text):
+            spans.append((cursor, separator.start()))
+            cursor = separator.end()
+        spans.append((cursor, len(text)))
+
+        stripped = []
+        for start, end in spans:
+            segment = text[start:end]
+            if segment.strip():
+                start += len(segment) - len(segment.lstrip())
+                end -= len(segment) - len(segment.rstrip())
+                stripped.append((start, end))
+        return stripped
+
+    def __getstate__(self):
+        # Offsets only; the text pickles as a shared memory reference when
+        # it is a SharedText, and the start list is rebuilt on arrival
+        return {"text": self.text, "spans": self.spans}
+
+    def __setstate__(self, state):
+        self.text = state["text"]
+        self.spans = state["spans"]
+        self._starts = [start for start, _ in self.spans]
+
+    def __len__(self) -> int:
+        return len(self.spans)
+
+    def __iter__(self) -> Iterator[str]:
+        for start, end in self.spans:
+            yield self.text[start:end]
+
+    @property
+    def sentences(self) -> List[str]:
+        """All sentences in document order."""
+        return list(self)
+
+    def index_at(self, position: int) -> int:
+        """
+        Return the index of the sentence containing a position.
+
+        Positions in the gap between two sentences belong to the earlier
+        one; positions before the first sentence belong to the first.
+        """
+        return max(bisect_right(self._starts, position) - 1, 0)
+
+    def sentence_at(self, position: int) -> Optional[str]:
+        """Return the sentence containing a position, or None if there are none."""
+        if not self.spans:
+            return None
+        start, end = self.spans[self.index_at(position)]
+        return self.text[start:end]
+
+    def sentence_end(self, position: int) -> int:
+        """Return the end offset of the sentence containing a position."""
+        if not self.spans:
+            return len(self.text)
+        return self.spans[self.index_at(position)][1]
@@ -0,0 +1,121 @@
+"""
+Shared Text Module
+Documents placed in shared memory once for process pool workers
+"""
+
+import sys
+import uuid
+import threading
+from collections import OrderedDict
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional
+
+# Documents each worker process keeps decoded (a DAG run reads one at a time)
+ATTACHED_TEXT_LIMIT = 4
+
+# Texts published by this process, by segment name
+_published: Dict[str, "SharedText"] = {}
+
+# Texts decoded from other processes' segments, most recently used last
+_attached: "OrderedDict[str, SharedText]" = OrderedDict()
+
+_lock = threading.Lock()
+
+# Serializes the resource tracker patch in _open_untracked
+_untracked_lock = threading.Lock()
+
+
+class SharedText(str):
+    """
+    A str that pickles as a reference to a shared memory copy of itself.
+
+    publish() encodes the text into a shared memory segment once; pickling
+    the result (e.g. as an argument of a ProcessPoolExecutor task) then
+    sends only the segment name. Each worker process decodes a segment the
+    first time it sees it and reuses that copy for later tasks, so a large
+    document crosses the process boundary once per worker rather than once
+    per task. The publisher must close() it once the workers are done.
+    """
+
+    _segment: Optional[shared_memory.SharedMemory] = None
+    _name = ""
+    _nbytes = 0
+
+    @classmethod
+    def publish(cls, text: str) -> "SharedText":
+        """Copy text into a new shared memory segment."""
+        data = text.encode("utf-8")
+        segment = shared_memory.SharedMemory(
+            name=f"legalai-{uuid.uuid4().hex}", create=True, size=max(len(data), 1)
+        )
+        segment.buf[:len(data)] = data
+
+        shared = cls(text)
+        shared._segment = segment
+        shared._name = segment.name
+        shared._nbytes = len(data)
+        with _lock:
+            _published[shared._name] = shared
+        return shared
+
+    def close(self):
+        """Release the segment (publisher only; a no-op for attached copies)."""
+        segment, self._segment = self._segment, None
+        if segment is None:
+            return
+        with _lock:
+            _published.pop(self._name, None)
+        segment.close()
+        segment.unlink()
+
+    def __reduce__(self):
+        if not self._name:
+            return (str, (str(self),))
+        return (_attach, (self._name, self._nbytes))
+
+
+def _open_untracked(name: str) -> shared_memory.SharedMemory:
+    """
+    Attach to another process's segment without claiming it.
+
+    Attaching registers the segment with this process's resource tracker,
+    which unlinks it when the process exits (bpo-39959): a recycled worker
+    would delete a segment its publisher still uses and warn about a leak.
+    Only the publisher may unlink, so the registration is skipped (track=False
+    from Python 3.13; before that by briefly disabling registration).
+    Unregistering afterwards is not enough, since a tracker shared with the
+    publisher would then lose the publisher's own registration.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    with _untracked_lock:
+        register = resource_tracker.register
+        resource_tracker.register = lambda name, rtype: None
+        try:
+            return shared_memory.SharedMemory(name=name)
+        finally:
+            resource_tracker.register = register
+
+
+def _attach(name: str, nbytes: int) -> SharedText:
+    """Resolve a pickled SharedText, decoding its segment once per process."""
+    with _lock:
+        text = _published.get(name) or _attached.get(name)
+        if text is not None:
+            if name in _attached:
+                _attached.move_to_end(name)
+            return text
+
+    segment = _open_untracked(name)
+    try:
+        text = SharedText(bytes(segment.buf[:nbytes]).decode("utf-8"))
+    finally:
+        segment.close()
+    text._name = name
+    text._nbytes = nbytes
+
+    with _lock:
+        _attached[name] = text
+        while len(_attached) > ATTACHED_TEXT_LIMIT:
+            _attached.popitem(last=False)
+    return text
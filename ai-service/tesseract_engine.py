@@ -0,0 +1,175 @@
+"""
+Tesseract Engine Module
+Long-lived Tesseract API handles (tesserocr) with a pytesseract fallback
+"""
+
+import os
+import re
+import queue
+import threading
+from typing import List
+
+import numpy as np
+from PIL import Image
+import pytesseract
+
+try:
+    import tesserocr
+    TESSEROCR_AVAILABLE = True
+except ImportError:
+    TESSEROCR_AVAILABLE = False
+
+
+def parse_tesseract_config(config: str) -> dict:
+    """
+    Split a pytesseract config string into language, OEM, PSM and -c variables.
+
+    '--oem 3 --psm 6 -l eng -c preserve_interword_spaces=1' ->
+    {'lang': 'eng', 'oem': 3, 'psm': 6, 'variables': {'preserve_interword_spaces': '1'}}
+    """
+    parsed = {"lang": "eng", "oem": 3, "psm": 3, "variables": {}}
+    for flag, value in re.findall(r"(--oem|--psm|-l|-c)\s+(\S+)", config):
+        if flag == "-l":
+            parsed["lang"] = value
+        elif flag == "-c":
+            name, _, setting = value.partition("=")
+            parsed["variables"][name] = setting
+        else:
+            parsed[flag[2:]] = int(value)
+    return parsed
+
+
+class PytesseractEngine:
+    """
+    Runs the tesseract CLI once per image via pytesseract.
+
+    Every call starts a process, writes the image to a temp file and
+    reloads the language model, so this is only the fallback.
+    """
+
+    name = "pytesseract"
+
+    def __init__(self, config: str):
+        self.config = config
+
+    def is_available(self) -> bool:
+        try:
+            pytesseract.get_tesseract_version()
+            return True
+        except Exception:
+            return False
+
+    def image_to_string(self, image: np.ndarray, scale: float = 1.0) -> str:
+        # The CLI estimates the resolution of an image without DPI metadata itself
+        return pytesseract.image_to_string(Image.fromarray(image), config=self.config)
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """
+    A pool of initialized tesserocr API handles.
+
+    A handle loads the traineddata once and is then reused for every page,
+    and images are handed over as raw pixel buffers instead of temp files.
+    Handles are not thread-safe, so each call borrows one for the duration
+    of a page. The pool is LIFO, so a thread doing back-to-back pages keeps
+    getting the same warm handle. Up to `size` handles are created lazily;
+    callers beyond that wait for one to be returned. tesserocr releases the
+    GIL while recognizing, so threads OCR pages in parallel.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, config: str, size: int, dpi: int = 300):
+        settings = parse_tesseract_config(config)
+        self.lang = settings["lang"]
+        self.oem = settings["oem"]
+        self.psm = settings["psm"]
+        self.variables = settings["variables"]
+        self.dpi = dpi
+        self.size = max(size, 1)
+        self.tessdata = os.getenv("TESSDATA_PREFIX")
+
+        self._idle: "queue.LifoQueue" = queue.LifoQueue()
+        self._handles: List = []
+        self._lock = threading.Lock()
+
+    def _create_handle(self):
+        kwargs = {"lang": self.lang, "oem": tesserocr.OEM(self.oem), "psm": tesserocr.PSM(self.psm)}
+        if self.tessdata:
+            kwargs["path"] = self.tessdata
+        api = tesserocr.PyTessBaseAPI(**kwargs)
+        for name, value in self.variables.items():
+            api.SetVariable(name, value)
+        return api
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if len(self._handles) < self.size:
+                api = self._create_handle()
+                self._handles.append(api)
+                return api
+        return self._idle.get()
+
+    def is_available(self) -> bool:
+        """Create the first handle, which also loads the language model."""
+        try:
+            self._idle.put(self._acquire())
+            return True
+        except Exception as e:
+            print(f"WARNING: tesserocr could not be initialized: {e}")
+            return False
+
+    def image_to_string(self, image: np.ndarray, scale: float = 1.0) -> str:
+        """
+        Recognize a page. scale is how much the page was resized after being
+        rendered or scanned at `dpi`, so Tesseract is told the resolution the
+        image actually has.
+        """
+        image = np.ascontiguousarray(image)
+        height, width = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+
+        api = self._acquire()
+        try:
+            api.SetImageBytes(image.tobytes(), width, height, channels, width * channels)
+            api.SetSourceResolution(max(int(round(self.dpi * scale)), 1))
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+            self._idle.put(api)
+
+    def close(self):
+        """End the idle handles; borrowed ones return to the pool, and new ones are created on next use."""
+        with self._lock:
+            while True:
+                try:
+                    api = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                self._handles.remove(api)
+                api.End()
+
+
+def create_engine(config: str, size: int, dpi: int = 300):
+    """
+    Pick the OCR backend.
+
+    OCR_ENGINE=auto (default) uses tesserocr when it is installed and can
+    load its model, else pytesseract; tesserocr or pytesseract force one.
+    """
+    choice = os.getenv("OCR_ENGINE", "auto").lower()
+    if choice in ("auto", "tesserocr"):
+        if TESSEROCR_AVAILABLE:
+            engine = TesserocrEngine(config, size, dpi)
+            if engine.is_available():
+                return engine
+        elif choice == "tesserocr":
+            print("WARNING: OCR_ENGINE=tesserocr but tesserocr is not installed, using pytesseract")
+    return PytesseractEngine(config)
@@ -0,0 +1,11 @@
+"""
+Test configuration for the AI service.
+
+Run from ai-service/ with: python -m pytest tests
+"""
+
+import os
+import sys
+
+# The service modules live flat in ai-service/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
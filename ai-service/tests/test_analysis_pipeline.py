@@ -0,0 +1,126 @@
+"""Tests for which analysis results the pipeline caches."""
+
+import asyncio
+
+import pytest
+
+import main
+from document_source import DocumentSource
+from llm_providers import GeminiProvider
+from result_cache import AnalysisCache
+
+PDF = DocumentSource.from_bytes(b"%PDF-1.4 test document", "contract.pdf")
+
+LOCAL_ANALYSIS = {"summary": "local", "overallRiskScore": 40}
+GEMINI_ANALYSIS = {"summary": "gemini", "overallRiskScore": 60}
+
+
+class FakeComponent:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """main with a fresh in-memory cache and a strategy call log."""
+    monkeypatch.delenv("ANALYSIS_CACHE_DB", raising=False)
+    monkeypatch.setattr(main, "analysis_cache", AnalysisCache(max_entries=8))
+    calls = []
+
+    async def analyze_with_ocr_nlp(*args, **kwargs):
+        calls.append("ocr+nlp")
+        return {"success": True, "ocrText": "text", "analysis": dict(LOCAL_ANALYSIS)}, True
+
+    monkeypatch.setattr(main, "analyze_with_ocr_nlp", analyze_with_ocr_nlp)
+    return calls
+
+
+def use_gemini(monkeypatch, calls, succeed: bool):
+    """Configure Gemini, answering with GEMINI_ANALYSIS or failing."""
+    monkeypatch.setattr(main, "gemini_component", FakeComponent(object()))
+    monkeypatch.setattr(GeminiProvider, "enabled", property(lambda self: True))
+
+    async def analyze_with_gemini(*args, **kwargs):
+        calls.append("gemini")
+        if not succeed:
+            raise RuntimeError("Gemini unavailable")
+        return {"success": True, "ocrText": main.GEMINI_OCR_TEXT, "analysis": dict(GEMINI_ANALYSIS)}, True
+
+    monkeypatch.setattr(main, "analyze_with_gemini", analyze_with_gemini)
+
+
+def analyze_twice():
+    async def run():
+        first = await main.run_analysis_pipeline(PDF, "pdf", True)
+        second = await main.run_analysis_pipeline(PDF, "pdf", True)
+        return first, second
+    return asyncio.run(run())
+
+
+def test_gemini_without_api_key_is_not_in_the_version(monkeypatch):
+    monkeypatch.setattr(main, "gemini_component", FakeComponent(object()))
+    monkeypatch.setattr(GeminiProvider, "enabled", property(lambda self: False))
+    assert "|gemini=none|" in main.analysis_version("pdf")
+
+    monkeypatch.setattr(GeminiProvider, "enabled", property(lambda self: True))
+    assert f"|gemini={main.GeminiPDFAnalyzer.MODEL_NAME}|" in main.analysis_version("pdf")
+
+
+def test_local_result_is_cached_when_gemini_is_not_configured(monkeypatch, pipeline):
+    monkeypatch.setattr(main, "gemini_component", FakeComponent(object()))
+    monkeypatch.setattr(GeminiProvider, "enabled", property(lambda self: False))
+
+    first, second = analyze_twice()
+
+    assert pipeline == ["ocr+nlp"]
+    assert second["analysis"] == first["analysis"] == LOCAL_ANALYSIS
+    assert main.analysis_cache.stats()["memoryHits"] == 1
+
+
+def test_gemini_result_is_cached(monkeypatch, pipeline):
+    use_gemini(monkeypatch, pipeline, succeed=True)
+
+    first, second = analyze_twice()
+
+    assert pipeline == ["gemini"]
+    assert second["analysis"] == GEMINI_ANALYSIS
+
+
+def test_fallback_for_failed_gemini_is_not_cached(monkeypatch, pipeline):
+    use_gemini(monkeypatch, pipeline, succeed=False)
+
+    first, second = analyze_twice()
+
+    assert first["analysis"] == LOCAL_ANALYSIS
+    assert pipeline == ["gemini", "ocr+nlp", "gemini", "ocr+nlp"]
+    assert main.analysis_cache.stats()["stores"] == 0
+
+
+class FakeOCR:
+    def is_available(self):
+        return True
+
+    def extract_text(self, source, file_type, progress=None):
+        return "This Agreement is entered into by the parties named below. " * 4
+
+
+class FakeNLP:
+    openai_enabled = True
+
+    def __init__(self, engine: str):
+        self.engine = engine
+
+    async def analyze_async(self, text, run_local=None, on_section=None):
+        return dict(LOCAL_ANALYSIS), self.engine
+
+
+@pytest.mark.parametrize("engine, cacheable", [("openai", True), ("local", False)])
+def test_local_nlp_standing_in_for_openai_is_not_cacheable(engine, cacheable):
+    result, is_cacheable = asyncio.run(main.analyze_with_ocr_nlp(
+        FakeOCR(), FakeNLP(engine), PDF, "pdf", True, main._ignore_progress
+    ))
+    assert result["analysis"] == LOCAL_ANALYSIS
+    assert is_cacheable is cacheable
@@ -0,0 +1,141 @@
+"""Tests for batch path resolution, micro-batching and summaries."""
+
+import asyncio
+import os
+
+import pytest
+
+from batch_analysis import BatchPathError, BatchSummary, MicroBatcher, resolve_batch_paths
+
+
+@pytest.fixture
+def upload_root(tmp_path):
+    """An upload root with nested documents and a file outside it."""
+    root = tmp_path / "uploads"
+    (root / "deals" / "b").mkdir(parents=True)
+    (root / "deals" / "a").mkdir()
+    for name in ("deals/b/two.pdf", "deals/a/one.PDF", "deals/a/scan.png", "deals/a/notes.txt", "top.pdf"):
+        (root / name).write_bytes(b"x")
+    (tmp_path / "secret.pdf").write_bytes(b"x")
+    return root
+
+
+def relative(resolved):
+    return [name for _, name in resolved]
+
+
+def test_directory_expands_to_supported_files_in_order(upload_root):
+    resolved = resolve_batch_paths(["deals"], str(upload_root))
+    assert relative(resolved) == [
+        os.path.join("deals", "a", "one.PDF"),
+        os.path.join("deals", "a", "scan.png"),
+        os.path.join("deals", "b", "two.pdf"),
+    ]
+    assert all(os.path.isabs(path) for path, _ in resolved)
+
+
+def test_paths_are_relative_to_root_and_deduplicated(upload_root):
+    resolved = resolve_batch_paths(["/top.pdf", "deals/b/two.pdf", "deals/b"], str(upload_root))
+    assert relative(resolved) == ["top.pdf", os.path.join("deals", "b", "two.pdf")]
+
+
+@pytest.mark.parametrize("path", ["../secret.pdf", "deals/../../secret.pdf"])
+def test_dot_dot_cannot_escape_root(upload_root, path):
+    with pytest.raises(BatchPathError, match="outside"):
+        resolve_batch_paths([path], str(upload_root))
+
+
+def test_symlinks_cannot_escape_root(upload_root, tmp_path):
+    (upload_root / "link.pdf").symlink_to(tmp_path / "secret.pdf")
+    (upload_root / "deals" / "a" / "link.pdf").symlink_to(tmp_path / "secret.pdf")
+    (upload_root / "outside").symlink_to(tmp_path)
+
+    with pytest.raises(BatchPathError, match="outside"):
+        resolve_batch_paths(["link.pdf"], str(upload_root))
+    with pytest.raises(BatchPathError, match="outside"):
+        resolve_batch_paths(["outside/secret.pdf"], str(upload_root))
+    # Inside a requested directory, escaping links are skipped
+    assert os.path.join("deals", "a", "link.pdf") not in relative(
+        resolve_batch_paths(["deals"], str(upload_root))
+    )
+
+
+@pytest.mark.parametrize("paths", [["missing.pdf"], [""], ["a\x00b"]])
+def test_invalid_paths_are_rejected(upload_root, paths):
+    with pytest.raises(BatchPathError):
+        resolve_batch_paths(paths, str(upload_root))
+
+
+def test_paths_disabled_without_root():
+    with pytest.raises(BatchPathError, match="disabled"):
+        resolve_batch_paths(["top.pdf"], None)
+
+
+def run_batcher(items, run_batch, **kwargs):
+    """Submit items concurrently; returns (results or exceptions, batches seen)."""
+    batches = []
+
+    async def record(batch):
+        batches.append(list(batch))
+        return await run_batch(batch)
+
+    async def main():
+        batcher = MicroBatcher(record, **kwargs)
+        try:
+            return await asyncio.gather(*(batcher.submit(item) for item in items), return_exceptions=True)
+        finally:
+            batcher.close()
+
+    return asyncio.run(main()), batches
+
+
+async def double(batch):
+    return [item * 2 for item in batch]
+
+
+def test_full_batches_flush_without_waiting():
+    # max_wait is a minute, so the test only finishes promptly if full batches start at once
+    results, batches = run_batcher([1, 2, 3, 4], double, max_size=2, max_wait=60)
+    assert batches == [[1, 2], [3, 4]]
+    assert results == [2, 4, 6, 8]
+
+
+def test_partial_batch_flushes_after_max_wait():
+    results, batches = run_batcher([1, 2, 3], double, max_size=10, max_wait=0.01)
+    assert batches == [[1, 2, 3]]
+    assert results == [2, 4, 6]
+
+
+def test_batch_error_reaches_every_caller():
+    async def fail(batch):
+        raise RuntimeError("model unavailable")
+
+    results, batches = run_batcher([1, 2, 3], fail, max_size=3, max_wait=60)
+    assert len(batches) == 1
+    assert all(isinstance(result, RuntimeError) and str(result) == "model unavailable" for result in results)
+
+
+def test_batcher_stats():
+    async def main():
+        batcher = MicroBatcher(double, max_size=2, max_wait=0.01)
+        await asyncio.gather(*(batcher.submit(item) for item in range(3)))
+        return batcher.stats()
+
+    assert asyncio.run(main()) == {"batches": 2, "documents": 3, "meanBatchSize": 1.5}
+
+
+def test_summary_counts_results_and_errors():
+    summary = BatchSummary(4)
+    summary.add_result(0, "a.pdf", {"overallRiskScore": 80, "documentType": "Lease"})
+    summary.add_result(1, "b.pdf", {"overallRiskScore": 40, "documentType": "Lease"})
+    summary.add_error("ValueError")
+    summary.add_ml_error("RuntimeError")
+
+    result = summary.as_dict()
+    assert (result["succeeded"], result["failed"]) == (2, 1)
+    assert result["riskDistribution"] == {"high": 1, "low": 1}
+    assert result["documentTypes"] == {"Lease": 2}
+    assert result["averageRiskScore"] == 60.0
+    assert [item["fileName"] for item in result["highestRisk"]] == ["a.pdf", "b.pdf"]
+    assert result["errors"] == {"ValueError": 1}
+    assert result["mlErrors"] == {"RuntimeError": 1}
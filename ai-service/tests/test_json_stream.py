@@ -0,0 +1,112 @@
+"""Tests for incremental and truncated LLM JSON parsing."""
+
+import pytest
+
+from json_stream import LLMSectionStream, ParseEvent, TopLevelFieldParser, fill_missing_sections, recover_json
+
+RESPONSE = (
+    'Here is the analysis:\n```json\n'
+    '{"summary": "A lease, with \\"quotes\\" and {braces}.", "overallRiskScore": 55,\n'
+    ' "clauses": [{"type": "termination", "riskLevel": "high"}, {"type": "payment"}],\n'
+    ' "dates": {"start": "2024-01-01"}, "keyTerms": []}\n```'
+)
+
+EXPECTED_EVENTS = [
+    ParseEvent("summary", 'A lease, with "quotes" and {braces}.'),
+    ParseEvent("overallRiskScore", 55),
+    ParseEvent("clauses", {"type": "termination", "riskLevel": "high"}, 0),
+    ParseEvent("clauses", {"type": "payment"}, 1),
+    ParseEvent("clauses", [{"type": "termination", "riskLevel": "high"}, {"type": "payment"}]),
+    ParseEvent("dates", {"start": "2024-01-01"}),
+    ParseEvent("keyTerms", []),
+]
+
+
+def feed_in_chunks(text: str, size: int):
+    parser = TopLevelFieldParser(["clauses"])
+    events = []
+    for start in range(0, len(text), size):
+        events.extend(parser.feed(text[start:start + size]))
+    return events, parser.closed
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 16, 64, len(RESPONSE)])
+def test_parser_events_do_not_depend_on_chunking(size):
+    events, closed = feed_in_chunks(RESPONSE, size)
+    assert events == EXPECTED_EVENTS
+    assert closed
+
+
+def test_parser_waits_for_numbers_that_may_still_grow():
+    parser = TopLevelFieldParser()
+    assert parser.feed('{"score": 5') == []
+    assert parser.feed('5,') == [ParseEvent("score", 55)]
+    assert parser.feed(' "done": true}') == [ParseEvent("done", True)]
+    assert parser.closed
+    assert parser.feed('{"ignored": 1}') == []
+
+
+def test_section_stream_restarts_on_retry():
+    seen = []
+    stream = LLMSectionStream(lambda *args: seen.append(args), "openai")
+    stream('{"summary": "first", "unknownField": 1, "over', 1)
+    stream('{"summary": "second"}', 2)
+    assert seen == [("summary", "first", "openai"), ("summary", "second", "openai")]
+
+
+def test_recover_complete_object_around_fences():
+    assert recover_json(RESPONSE) == ({
+        "summary": 'A lease, with "quotes" and {braces}.',
+        "overallRiskScore": 55,
+        "clauses": [{"type": "termination", "riskLevel": "high"}, {"type": "payment"}],
+        "dates": {"start": "2024-01-01"},
+        "keyTerms": []
+    }, True)
+
+
+def test_recover_drops_trailing_commas():
+    assert recover_json('{"a": [1, 2,], "b": 3,}') == ({"a": [1, 2], "b": 3}, True)
+
+
+@pytest.mark.parametrize("text, expected", [
+    # Cut inside a list item: only whole items are kept
+    ('{"a": 1, "clauses": [{"t": 1}, {"t": 2, "d": "cu', {"a": 1, "clauses": [{"t": 1}]}),
+    # Cut inside a nested object: it is dropped entirely
+    ('{"a": 1, "dates": {"start": "2024", "end": "20', {"a": 1}),
+    # A trailing number may be missing digits
+    ('{"a": 1, "n": 12', {"a": 1}),
+    # Malformed part way
+    ('{"a": 1, "b": tru e}', {"a": 1}),
+])
+def test_recover_truncated_keeps_last_complete_values(text, expected):
+    assert recover_json(text) == (expected, False)
+
+
+@pytest.mark.parametrize("text", ["no json here", ""])
+def test_recover_without_object(text):
+    assert recover_json(text) == (None, False)
+
+
+def test_recover_every_prefix_is_safe():
+    # Every cut of a valid response recovers a subset of the full object
+    full, _ = recover_json(RESPONSE)
+    for end in range(len(RESPONSE)):
+        value, complete = recover_json(RESPONSE[:end])
+        if value is None:
+            continue
+        assert set(value) <= set(full)
+        for key, item in value.items():
+            if isinstance(item, list) and key == "clauses":
+                assert all(clause in full[key] for clause in item)
+            else:
+                assert item == full[key]
+
+
+def test_fill_missing_sections_estimates_risk_from_clauses():
+    analysis = {"summary": "x", "clauses": [{"riskLevel": "high"}, {"riskLevel": "medium"}]}
+    missing = fill_missing_sections(analysis)
+
+    assert "summary" not in missing and "clauses" not in missing
+    assert {"parties", "dates", "overallRiskScore"} <= set(missing)
+    assert analysis["dates"] == {} and analysis["parties"] == []
+    assert analysis["overallRiskScore"] == 30 + 8 + 4
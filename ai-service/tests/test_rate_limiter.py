@@ -0,0 +1,123 @@
+"""Tests for the fair-queue rate limiter and call coalescing."""
+
+import asyncio
+import time
+
+import pytest
+
+from rate_limiter import Coalescer, RateLimiter, TokenBucket
+
+
+def drained(limiter: RateLimiter) -> RateLimiter:
+    """Empty the limiter's buckets so every waiter has to queue."""
+    for bucket in (limiter.requests, limiter.tokens):
+        if bucket is not None:
+            bucket.level = 0
+    return limiter
+
+
+async def acquire_all(limiter: RateLimiter, requests, order):
+    """Queue (key, label) requests in the given order and record when each is released."""
+    async def one(key, label):
+        await limiter.acquire(key=key)
+        order.append(label)
+
+    tasks = []
+    for key, label in requests:
+        tasks.append(asyncio.create_task(one(key, label)))
+        await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+
+
+def test_keys_are_served_round_robin():
+    # 6000 requests per minute: one every 10ms once the bucket is empty
+    limiter = drained(RateLimiter("test", requests_per_minute=6000))
+    order = []
+    requests = [("long", f"long{i}") for i in range(4)] + [("short", "short0"), ("other", "other0")]
+
+    asyncio.run(acquire_all(limiter, requests, order))
+
+    # The long document's chunks do not hold up the other documents
+    assert order == ["long0", "short0", "other0", "long1", "long2", "long3"]
+    assert limiter.stats()["queueWait"]["count"] == 6
+    assert limiter.stats()["queued"] == 0
+
+
+def test_token_limit_delays_large_requests():
+    limiter = drained(RateLimiter("test", tokens_per_minute=60_000))
+
+    async def main():
+        return await limiter.acquire(tokens=50)
+
+    # 1000 tokens a second, so 50 tokens take about 50ms
+    assert asyncio.run(main()) == pytest.approx(0.05, abs=0.04)
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    limiter = drained(RateLimiter("test", requests_per_minute=600))
+    order = []
+
+    async def main():
+        waiter = asyncio.create_task(limiter.acquire(key="gone"))
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await acquire_all(limiter, [("kept", "kept0")], order)
+
+    asyncio.run(main())
+    assert order == ["kept0"]
+    assert limiter.stats()["queued"] == 0
+
+
+def test_throttle_pauses_the_queue():
+    limiter = RateLimiter("test", requests_per_minute=6000)
+    limiter.throttle(0.05)
+
+    async def main():
+        return await limiter.acquire()
+
+    assert asyncio.run(main()) >= 0.04
+
+
+def test_disabled_limiter_never_waits():
+    limiter = RateLimiter("test")
+    assert not limiter.enabled
+    assert asyncio.run(limiter.acquire(tokens=10**9)) == 0.0
+
+
+def test_bucket_refills_up_to_capacity(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(60)
+    bucket.take(60)
+    assert bucket.wait_time(1) == pytest.approx(1.0)
+
+    now[0] += 30
+    assert bucket.wait_time(30) == 0.0
+    now[0] += 600
+    bucket.wait_time(1)
+    assert bucket.level == 60
+    # Requests larger than the bucket wait for a full one instead of forever
+    bucket.take(60)
+    assert bucket.wait_time(1000) == pytest.approx(60.0)
+
+
+def test_coalescer_shares_one_call_per_key():
+    coalescer = Coalescer()
+    calls = []
+
+    async def upstream():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(
+            coalescer.run("doc", upstream), coalescer.run("doc", upstream), coalescer.run(None, upstream)
+        )
+
+    assert asyncio.run(main()) == ["result"] * 3
+    assert len(calls) == 2
+    assert coalescer.stats() == {"inflight": 0, "upstreamCalls": 1, "coalesced": 1}
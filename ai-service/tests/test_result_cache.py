@@ -0,0 +1,109 @@
+"""Tests for AnalysisCache keying, TTL and eviction."""
+
+import pytest
+
+import result_cache
+from result_cache import AnalysisCache
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(result_cache.time, "time", clock)
+    return clock
+
+
+@pytest.fixture(autouse=True)
+def no_env_db(monkeypatch):
+    # An ANALYSIS_CACHE_DB in the environment must not leak into these tests
+    monkeypatch.delenv("ANALYSIS_CACHE_DB", raising=False)
+
+
+def test_key_combines_digest_and_version():
+    assert AnalysisCache.key_for_digest("abc", "1.0|gemini=none") == "abc:1.0|gemini=none"
+    assert AnalysisCache.key_for_digest("abc", "v1") != AnalysisCache.key_for_digest("abc", "v2")
+
+
+def test_hit_only_for_same_digest_and_version():
+    cache = AnalysisCache(max_entries=8)
+    cache.put(AnalysisCache.key_for_digest("abc", "v1"), {"analysis": 1})
+
+    assert cache.get(AnalysisCache.key_for_digest("abc", "v1")) == {"analysis": 1}
+    assert cache.get(AnalysisCache.key_for_digest("abc", "v2")) is None
+    assert cache.get(AnalysisCache.key_for_digest("abd", "v1")) is None
+
+    stats = cache.stats()
+    assert (stats["memoryHits"], stats["misses"], stats["stores"]) == (1, 2, 1)
+    assert stats["hitRate"] == pytest.approx(1 / 3, abs=1e-4)
+
+
+def test_memory_entries_expire_after_ttl(clock):
+    cache = AnalysisCache(max_entries=8, ttl_seconds=60)
+    cache.put("key", {"analysis": 1})
+
+    clock.now += 59
+    assert cache.get("key") == {"analysis": 1}
+    clock.now += 2
+    assert cache.get("key") is None
+    assert cache.stats()["memoryEntries"] == 0
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = AnalysisCache(max_entries=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1}
+    assert cache.get("c") == {"n": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    db_path = str(tmp_path / "cache.db")
+    AnalysisCache(max_entries=8, db_path=db_path).put("key", {"analysis": [1, 2]})
+
+    cache = AnalysisCache(max_entries=8, db_path=db_path)
+    assert cache.get("key") == {"analysis": [1, 2]}
+    assert cache.get("key") == {"analysis": [1, 2]}
+    stats = cache.stats()
+    assert (stats["diskHits"], stats["memoryHits"], stats["diskEntries"]) == (1, 1, 1)
+
+
+def test_disk_entries_expire_after_ttl(tmp_path, clock):
+    db_path = str(tmp_path / "cache.db")
+    AnalysisCache(max_entries=8, db_path=db_path, ttl_seconds=60).put("key", {"analysis": 1})
+
+    clock.now += 61
+    cache = AnalysisCache(max_entries=8, db_path=db_path, ttl_seconds=60)
+    assert cache.get("key") is None
+    assert cache.stats()["diskEntries"] == 0
+
+
+def test_disk_tier_evicts_least_recently_accessed_past_size_limit(tmp_path, clock):
+    db_path = str(tmp_path / "cache.db")
+    value = {"text": "x" * 100}
+    cache = AnalysisCache(max_entries=1, db_path=db_path, max_disk_bytes=250)
+
+    cache.put("a", value)
+    clock.now += 1
+    cache.put("b", value)
+    clock.now += 1
+    cache.get("a")  # memory miss (max_entries=1), disk hit refreshes its access time
+    clock.now += 1
+    cache.put("c", value)
+
+    survivors = AnalysisCache(max_entries=8, db_path=db_path)
+    assert survivors.get("b") is None
+    assert survivors.get("a") == value
+    assert survivors.get("c") == value
@@ -0,0 +1,221 @@
+"""
+Worker Pool Module
+Runs blocking OCR, NLP and ML work off the event loop with bounded queues
+"""
+
+import os
+import asyncio
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from metrics import replay, run_captured
+
+
+class StageSaturatedError(Exception):
+    """Raised when a stage (or the service as a whole) cannot accept more work."""
+
+    def __init__(self, stage: str, status_code: int = 503, retry_after: int = 5):
+        super().__init__(f"Stage '{stage}' is saturated, retry later")
+        self.stage = stage
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read a positive integer from the environment."""
+    try:
+        value = int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+    return value if value > 0 else default
+
+
+class _Stage:
+    """A single pipeline stage: one pool plus a bounded admission counter."""
+
+    def __init__(self, name: str, kind: str, workers: int, queue_limit: int):
+        self.name = name
+        self.kind = kind
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.pool: Optional[Executor] = None
+        self.inflight = 0
+        self.completed = 0
+        self.rejected = 0
+        self._lock = threading.Lock()
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of running plus queued jobs."""
+        return self.workers + self.queue_limit
+
+    def start(self):
+        """Create the underlying pool."""
+        if self.pool is not None:
+            return
+        if self.kind == "process":
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            self.pool = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix=f"{self.name}-worker"
+            )
+
+    def shutdown(self):
+        """Stop the underlying pool, cancelling queued jobs."""
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def try_acquire(self) -> bool:
+        """Reserve a slot for a job; returns False when the queue is full."""
+        with self._lock:
+            if self.inflight >= self.capacity:
+                self.rejected += 1
+                return False
+            self.inflight += 1
+            return True
+
+    def release(self):
+        """Free a slot reserved with try_acquire."""
+        with self._lock:
+            self.inflight -= 1
+            self.completed += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return a snapshot of stage utilisation."""
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "workers": self.workers,
+                "queueLimit": self.queue_limit,
+                "inflight": self.inflight,
+                "queued": max(self.inflight - self.workers, 0),
+                "completed": self.completed,
+                "rejected": self.rejected
+            }
+
+
+class StageExecutor:
+    """
+    Execution layer for the analysis pipeline.
+
+    Each stage owns its own pool so a burst of scanned PDFs cannot starve
+    local analysis (and vice versa):
+    - ocr: threads that drive OCRProcessor, which fans CPU-bound
+      Tesseract/OpenCV page work out to its own process pool
+    - nlp: thread pool for local analysis
+    - ml: thread pool for batched model predictions (/analyze/batch)
+
+    LLM calls need no stage: they are async and bounded by the provider
+    layer's connection pools and rate limiters (see llm_providers).
+
+    Sizes and queue depths are configurable through the environment
+    (e.g. OCR_WORKERS, OCR_QUEUE_LIMIT, OCR_POOL_KIND). When a stage queue is
+    full, work is rejected with StageSaturatedError (HTTP 503). When the
+    total number of in-flight requests exceeds MAX_INFLIGHT_REQUESTS,
+    requests are rejected with HTTP 429.
+    """
+
+    DEFAULT_STAGES = {
+        "ocr": {"kind": "thread", "workers": 2},
+        "nlp": {"kind": "thread", "workers": 4},
+        "ml": {"kind": "thread", "workers": 2},
+    }
+
+    def __init__(self, stages: Optional[Dict[str, Dict[str, Any]]] = None):
+        """Build stages from defaults overridden by environment variables."""
+        self._stages: Dict[str, _Stage] = {}
+        for name, defaults in (stages or self.DEFAULT_STAGES).items():
+            prefix = name.upper()
+            workers = _env_int(f"{prefix}_WORKERS", defaults["workers"])
+            kind = os.getenv(f"{prefix}_POOL_KIND", defaults["kind"]).lower()
+            queue_limit = _env_int(f"{prefix}_QUEUE_LIMIT", workers * 4)
+            self._stages[name] = _Stage(name, kind, workers, queue_limit)
+
+        self.max_inflight_requests = _env_int("MAX_INFLIGHT_REQUESTS", 64)
+        self._inflight_requests = 0
+        self._rejected_requests = 0
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Create all stage pools."""
+        for stage in self._stages.values():
+            stage.start()
+
+    def shutdown(self):
+        """Shut down all stage pools."""
+        for stage in self._stages.values():
+            stage.shutdown()
+
+    def stage_kind(self, name: str) -> str:
+        """Return 'thread' or 'process' for a stage."""
+        return self._stages[name].kind
+
+    async def run(self, stage_name: str, fn: Callable[..., Any], *args: Any) -> Any:
+        """
+        Run a blocking callable on a stage pool without blocking the event loop.
+
+        Stage timings recorded inside a process pool worker are shipped back
+        with the result and recorded here.
+
+        The slot is held until the job itself finishes, not until the caller
+        stops waiting: a job whose awaiting task is cancelled (a lost hedge,
+        an SLA timeout, a client disconnect) keeps running on its worker and
+        still counts against the stage until it is done.
+
+        Raises:
+            StageSaturatedError: if the stage queue is full
+        """
+        stage = self._stages[stage_name]
+        if not stage.try_acquire():
+            raise StageSaturatedError(stage_name, status_code=503)
+
+        try:
+            stage.start()
+            if stage.kind != "process":
+                future = stage.pool.submit(fn, *args)
+            else:
+                future = stage.pool.submit(run_captured, fn, *args)
+        except BaseException:
+            stage.release()
+            raise
+        future.add_done_callback(lambda _: stage.release())
+
+        if stage.kind != "process":
+            return await asyncio.wrap_future(future)
+        result, observations = await asyncio.wrap_future(future)
+        replay(observations)
+        return result
+
+    def admit_request(self):
+        """
+        Reserve a request slot.
+
+        Raises:
+            StageSaturatedError: (HTTP 429) if too many requests are in flight
+        """
+        with self._lock:
+            if self._inflight_requests >= self.max_inflight_requests:
+                self._rejected_requests += 1
+                raise StageSaturatedError("admission", status_code=429, retry_after=1)
+            self._inflight_requests += 1
+
+    def release_request(self):
+        """Free a request slot reserved with admit_request."""
+        with self._lock:
+            self._inflight_requests -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return utilisation for all stages and request admission."""
+        with self._lock:
+            requests = {
+                "inflight": self._inflight_requests,
+                "limit": self.max_inflight_requests,
+                "rejected": self._rejected_requests
+            }
+        return {
+            "requests": requests,
+            "stages": {name: stage.stats() for name, stage in self._stages.items()}
+        }
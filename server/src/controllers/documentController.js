@@ -75,15 +75,18 @@ exports.analyzeDocument = async (req, res) => {
             // Call AI service
             const aiServiceUrl = process.env.AI_SERVICE_URL || 'http://localhost:8000';
 
-            // Read file and send to AI service
-            const fileBuffer = fs.readFileSync(document.filePath);
-            const base64File = fileBuffer.toString('base64');
-
-            const response = await axios.post(`${aiServiceUrl}/analyze`, {
-                file: base64File,
-                fileName: document.originalName,
-                fileType: document.fileType
-            }, {
+            // Stream the file to the AI service (no base64 copy in memory)
+            const { size } = await fs.promises.stat(document.filePath);
+
+            const response = await axios.post(`${aiServiceUrl}/analyze/upload`, fs.createReadStream(document.filePath), {
+                headers: {
+                    'Content-Type': 'application/octet-stream',
+                    'Content-Length': size,
+                    'X-File-Name': encodeURIComponent(document.originalName),
+                    'X-File-Type': document.fileType
+                },
+                maxBodyLength: Infinity,
+                maxContentLength: Infinity,
                 timeout: 120000 // 2 minute timeout for processing
             });
 